@@ -0,0 +1,41 @@
+"""unique (indicador, chave, periodo) on stage ref/calc for bulk upsert
+
+Revision ID: 0004_unique_indicador_chave
+Revises: 0003_add_stage_indicadores
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_unique_indicador_chave'
+down_revision = '0003_add_stage_indicadores'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    schema = None if dialect == 'sqlite' else 'stage'
+
+    for table in ('ref_indicador', 'calc_indicador'):
+        qualified = table if schema is None else f'{schema}.{table}'
+        # mantém apenas a linha mais recente (maior id) por chave antes de criar a restrição
+        op.execute(
+            f"DELETE FROM {qualified} WHERE id NOT IN ("
+            f"SELECT MAX(id) FROM {qualified} GROUP BY indicador, chave, periodo)"
+        )
+
+    op.create_index('uq_stage_ref_indicador_chave', 'ref_indicador', ['indicador', 'chave', 'periodo'], unique=True, schema=schema)
+    op.create_index('uq_stage_calc_indicador_chave', 'calc_indicador', ['indicador', 'chave', 'periodo'], unique=True, schema=schema)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    schema = None if dialect == 'sqlite' else 'stage'
+    op.drop_index('uq_stage_calc_indicador_chave', table_name='calc_indicador', schema=schema)
+    op.drop_index('uq_stage_ref_indicador_chave', table_name='ref_indicador', schema=schema)
@@ -0,0 +1,34 @@
+"""index artefato_execucao by (tipo, fonte, periodo, created_at) for ingest dedup
+
+Revision ID: 0005_artefato_lookup_index
+Revises: 0004_unique_indicador_chave
+Create Date: 2026-10-18 00:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_artefato_lookup_index'
+down_revision = '0004_unique_indicador_chave'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    op.create_index(
+        'ix_artefato_execucao_tipo_fonte_periodo',
+        'artefato_execucao',
+        ['tipo', 'fonte', 'periodo', 'created_at'],
+        unique=False,
+        schema=None if dialect == 'sqlite' else 'dw',
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    op.drop_index('ix_artefato_execucao_tipo_fonte_periodo', table_name='artefato_execucao', schema=None if dialect == 'sqlite' else 'dw')
@@ -0,0 +1,76 @@
+"""add dw.fato_rag_* tables with (periodo, territorio_id) partition index
+
+Revision ID: 0006_add_fato_rag
+Revises: 0005_artefato_lookup_index
+Create Date: 2026-10-18 00:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_add_fato_rag'
+down_revision = '0005_artefato_lookup_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    schema = None if dialect == 'sqlite' else 'dw'
+    fk_territorio = ['dw.dim_territorio.id'] if dialect != 'sqlite' else ['dim_territorio.id']
+    extract_ts = lambda: sa.Column('extract_ts', sa.DateTime(timezone=True), server_default=sa.text('now()') if dialect != 'sqlite' else None, nullable=False)  # noqa: E731
+
+    op.create_table(
+        'fato_rag_financeiro',
+        sa.Column('id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('periodo', sa.Text(), nullable=False),
+        sa.Column('territorio_id', sa.BigInteger(), nullable=False),
+        sa.Column('dotacao_atualizada', sa.Numeric(18, 2), nullable=True),
+        sa.Column('receita_realizada', sa.Numeric(18, 2), nullable=True),
+        sa.Column('empenhado', sa.Numeric(18, 2), nullable=True),
+        sa.Column('liquidado', sa.Numeric(18, 2), nullable=True),
+        sa.Column('pago', sa.Numeric(18, 2), nullable=True),
+        extract_ts(),
+        sa.ForeignKeyConstraint(['territorio_id'], fk_territorio),
+        schema=schema
+    )
+    op.create_index('ix_fato_rag_financeiro_particao', 'fato_rag_financeiro', ['periodo', 'territorio_id'], unique=False, schema=schema)
+
+    op.create_table(
+        'fato_rag_producao',
+        sa.Column('id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('periodo', sa.Text(), nullable=False),
+        sa.Column('territorio_id', sa.BigInteger(), nullable=False),
+        sa.Column('tipo', sa.Text(), nullable=False),
+        sa.Column('quantidade', sa.BigInteger(), nullable=True),
+        extract_ts(),
+        sa.ForeignKeyConstraint(['territorio_id'], fk_territorio),
+        schema=schema
+    )
+    op.create_index('ix_fato_rag_producao_particao', 'fato_rag_producao', ['periodo', 'territorio_id'], unique=False, schema=schema)
+
+    op.create_table(
+        'fato_rag_meta',
+        sa.Column('id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('periodo', sa.Text(), nullable=False),
+        sa.Column('territorio_id', sa.BigInteger(), nullable=False),
+        sa.Column('indicador', sa.Text(), nullable=False),
+        sa.Column('meta_planejada', sa.Numeric(), nullable=True),
+        sa.Column('meta_executada', sa.Numeric(), nullable=True),
+        extract_ts(),
+        sa.ForeignKeyConstraint(['territorio_id'], fk_territorio),
+        schema=schema
+    )
+    op.create_index('ix_fato_rag_meta_particao', 'fato_rag_meta', ['periodo', 'territorio_id'], unique=False, schema=schema)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    schema = None if dialect == 'sqlite' else 'dw'
+    for table in ('fato_rag_meta', 'fato_rag_producao', 'fato_rag_financeiro'):
+        op.drop_index(f'ix_{table}_particao', table_name=table, schema=schema)
+        op.drop_table(table, schema=schema)
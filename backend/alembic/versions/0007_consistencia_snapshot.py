@@ -0,0 +1,57 @@
+"""add stage.consistencia_erro / stage.consistencia_resumo snapshot tables
+
+Revision ID: 0007_consistencia_snapshot
+Revises: 0006_add_fato_rag
+Create Date: 2026-10-18 00:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_consistencia_snapshot'
+down_revision = '0006_add_fato_rag'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    schema = None if dialect == 'sqlite' else 'stage'
+
+    op.create_table(
+        'consistencia_erro',
+        sa.Column('indicador', sa.Text(), nullable=False),
+        sa.Column('chave', sa.Text(), nullable=False),
+        sa.Column('periodo', sa.Text(), nullable=False),
+        sa.Column('ref', sa.Float(), nullable=False),
+        sa.Column('calc', sa.Float(), nullable=True),
+        sa.Column('erro_abs', sa.Float(), nullable=True),
+        sa.Column('erro_pct', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('indicador', 'chave', 'periodo'),
+        schema=schema
+    )
+    op.create_index('ix_consistencia_erro_drill', 'consistencia_erro', ['indicador', 'periodo', 'erro_pct'], unique=False, schema=schema)
+
+    op.create_table(
+        'consistencia_resumo',
+        sa.Column('indicador', sa.Text(), nullable=False),
+        sa.Column('periodo', sa.Text(), nullable=False),
+        sa.Column('soma_erro_pct', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('pares', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('mape', sa.Float(), nullable=True),
+        sa.Column('atualizado_em', sa.DateTime(timezone=True), server_default=sa.text('now()') if dialect != 'sqlite' else None, nullable=False),
+        sa.PrimaryKeyConstraint('indicador', 'periodo'),
+        schema=schema
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    schema = None if dialect == 'sqlite' else 'stage'
+    op.drop_table('consistencia_resumo', schema=schema)
+    op.drop_index('ix_consistencia_erro_drill', table_name='consistencia_erro', schema=schema)
+    op.drop_table('consistencia_erro', schema=schema)
@@ -0,0 +1,97 @@
+"""add dw.rag_resumo pre-aggregated summary keyed by (periodo, territorio_id), backfilled from the facts
+
+Revision ID: 0008_rag_resumo
+Revises: 0007_consistencia_snapshot
+Create Date: 2026-10-18 00:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_rag_resumo'
+down_revision = '0007_consistencia_snapshot'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    schema = None if dialect == 'sqlite' else 'dw'
+
+    op.create_table(
+        'rag_resumo',
+        sa.Column('periodo', sa.Text(), nullable=False),
+        sa.Column('territorio_id', sa.BigInteger(), nullable=False),
+        sa.Column('dotacao_atualizada', sa.Numeric(18, 2), nullable=False, server_default='0'),
+        sa.Column('receita_realizada', sa.Numeric(18, 2), nullable=False, server_default='0'),
+        sa.Column('empenhado', sa.Numeric(18, 2), nullable=False, server_default='0'),
+        sa.Column('liquidado', sa.Numeric(18, 2), nullable=False, server_default='0'),
+        sa.Column('pago', sa.Numeric(18, 2), nullable=False, server_default='0'),
+        sa.Column('execucao_percentual', sa.Float(), nullable=True),
+        sa.Column('producao_total', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('metas_cumpridas', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('metas_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('atualizado_em', sa.DateTime(timezone=True), server_default=sa.text('now()') if dialect != 'sqlite' else None, nullable=False),
+        sa.PrimaryKeyConstraint('periodo', 'territorio_id'),
+        schema=schema
+    )
+
+    # backfill com o mesmo agregado de RAGService.reconstruir_resumo: a leitura do resumo
+    # trata "tem linhas" como pronto, e a ingestão só recalcula as partições que toca
+    p = '' if schema is None else f'{schema}.'
+    op.execute(sa.text(f"""
+        INSERT INTO {p}rag_resumo (
+            periodo, territorio_id, dotacao_atualizada, receita_realizada, empenhado, liquidado, pago,
+            execucao_percentual, producao_total, metas_cumpridas, metas_total, atualizado_em
+        )
+        SELECT
+            c.periodo,
+            c.territorio_id,
+            COALESCE(f.dotacao_atualizada, 0),
+            COALESCE(f.receita_realizada, 0),
+            COALESCE(f.empenhado, 0),
+            COALESCE(f.liquidado, 0),
+            COALESCE(f.pago, 0),
+            CASE WHEN COALESCE(f.dotacao_atualizada, 0) > 0
+                 THEN COALESCE(f.pago, 0) * 100.0 / f.dotacao_atualizada END,
+            COALESCE(pr.producao_total, 0),
+            COALESCE(m.metas_cumpridas, 0),
+            COALESCE(m.metas_total, 0),
+            CURRENT_TIMESTAMP
+        FROM (
+            SELECT territorio_id, periodo FROM {p}fato_rag_financeiro
+            UNION SELECT territorio_id, periodo FROM {p}fato_rag_producao
+            UNION SELECT territorio_id, periodo FROM {p}fato_rag_meta
+        ) c
+        LEFT JOIN (
+            SELECT territorio_id, periodo,
+                   SUM(dotacao_atualizada) AS dotacao_atualizada,
+                   SUM(receita_realizada) AS receita_realizada,
+                   SUM(empenhado) AS empenhado,
+                   SUM(liquidado) AS liquidado,
+                   SUM(pago) AS pago
+            FROM {p}fato_rag_financeiro GROUP BY territorio_id, periodo
+        ) f ON f.territorio_id = c.territorio_id AND f.periodo = c.periodo
+        LEFT JOIN (
+            SELECT territorio_id, periodo, SUM(quantidade) AS producao_total
+            FROM {p}fato_rag_producao GROUP BY territorio_id, periodo
+        ) pr ON pr.territorio_id = c.territorio_id AND pr.periodo = c.periodo
+        LEFT JOIN (
+            SELECT territorio_id, periodo,
+                   COUNT(*) AS metas_total,
+                   SUM(CASE WHEN meta_planejada IS NOT NULL AND meta_executada IS NOT NULL
+                             AND meta_planejada <> 0 AND meta_executada >= meta_planejada
+                            THEN 1 ELSE 0 END) AS metas_cumpridas
+            FROM {p}fato_rag_meta GROUP BY territorio_id, periodo
+        ) m ON m.territorio_id = c.territorio_id AND m.periodo = c.periodo
+    """))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    schema = None if dialect == 'sqlite' else 'dw'
+    op.drop_table('rag_resumo', schema=schema)
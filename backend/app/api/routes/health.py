@@ -1,6 +1,10 @@
 from datetime import datetime
 from fastapi import APIRouter
 
+from app.core.config import get_settings
+from app.repositories.dimensao_cache import CACHES
+from app.services.rdqa_export_service import RDQAExportService
+
 
 router = APIRouter()
 
@@ -10,5 +14,10 @@ def health():
     return {
         "status": "ok",
         "time": datetime.utcnow().isoformat(),
+        "cache_dimensoes": {nome: cache.estatisticas() for nome, cache in CACHES.items()},
+        "pdf": {
+            "startup": get_settings().pdf_startup,
+            "pool": RDQAExportService._pool.estatisticas() if RDQAExportService._pool else None,
+        },
     }
 
@@ -1,7 +1,10 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
+import json
 import uuid
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
 from sqlmodel import Session
 
 from app.core.db import get_session
@@ -13,8 +16,12 @@ from app.schemas.rag import (
     RAGProducaoOut,
     RAGResumoOut,
 )
-from app.services.rag_service import RAGService
+from app.schemas.rdqa import ExportJobOut
+from app.services.rag_service import DEFAULT_LIMIT_DETALHES, RAGService, parse_campos
+from app.services.browser_pool import PoolIndisponivel
+from app.services.pdf_jobs import FilaCheia, get_jobs
 from app.services.rdqa_export_service import RDQAExportService
+from app.services.relatorio_service import RelatorioService
 from app.services.artefato_service import ArtefatoService
 
 
@@ -23,43 +30,121 @@ router = APIRouter(prefix="/rag", tags=["rag"])
 service = RAGService()
 exporter = RDQAExportService()
 artefatos = ArtefatoService()
+relatorios = RelatorioService()
 
 
 @router.get("/resumo", response_model=RAGResumoOut, summary="Painel consolidado do RAG por território")
 def obter_resumo(
     periodo: Optional[str] = Query(None, description="Período (ex.: 2024)"),
     territorio_id: Optional[int] = Query(None, description="Filtrar por ID do território"),
+    fresh: bool = Query(False, description="Recalcula a partir dos fatos em vez de ler o resumo pré-agregado"),
     session: Session = Depends(get_session),
 ):
-    data = service.resumo(session, periodo=periodo, territorio_id=territorio_id)
+    data = service.resumo(session, periodo=periodo, territorio_id=territorio_id, fresh=fresh)
     return data
 
 
-@router.get("/financeiro", response_model=List[RAGFinanceiroOut], summary="Detalhes financeiros do RAG")
+_RESPOSTAS_DETALHES = {
+    200: {
+        "headers": {
+            "X-Next-Cursor": {"description": "Cursor da próxima página (ausente na última)", "schema": {"type": "string"}},
+            "X-Total-Count": {"description": "Total de linhas do filtro (só na primeira página)", "schema": {"type": "integer"}},
+            "X-Total-Count-Estimated": {"description": "true quando o total vem da estimativa do banco", "schema": {"type": "boolean"}},
+        },
+    }
+}
+
+
+def _detalhes(
+    secao: str,
+    response: Response,
+    session: Session,
+    *,
+    periodo: Optional[str],
+    territorio_id: Optional[int],
+    limit: int,
+    cursor: Optional[str],
+    fields: Optional[str],
+):
+    try:
+        campos = parse_campos(secao, fields)
+        pagina = service.detalhes(
+            session,
+            secao,
+            periodo=periodo,
+            territorio_id=territorio_id,
+            limit=limit,
+            cursor=cursor,
+            campos=campos,
+            contar=cursor is None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    headers = {}
+    if pagina.proximo_cursor:
+        headers["X-Next-Cursor"] = pagina.proximo_cursor
+    if pagina.total is not None:
+        headers["X-Total-Count"] = str(pagina.total)
+        headers["X-Total-Count-Estimated"] = "true" if pagina.total_estimado else "false"
+    if campos:
+        # projeção parcial: não passa pelo response_model, que exige todos os campos
+        return JSONResponse(content=jsonable_encoder(pagina.itens), headers=headers)
+    response.headers.update(headers)
+    return pagina.itens
+
+
+@router.get(
+    "/financeiro",
+    response_model=List[RAGFinanceiroOut],
+    summary="Detalhes financeiros do RAG",
+    responses=_RESPOSTAS_DETALHES,
+)
 def listar_financeiro(
+    response: Response,
     periodo: Optional[str] = Query(None, description="Período (ex.: 2024)"),
     territorio_id: Optional[int] = Query(None, description="Filtrar por ID do território"),
+    limit: int = Query(DEFAULT_LIMIT_DETALHES, ge=1, le=5000, description="Máximo de linhas por página"),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: periodo,territorio_id,pago)"),
     session: Session = Depends(get_session),
 ):
-    return service.financeiro(session, periodo=periodo, territorio_id=territorio_id)
+    return _detalhes("financeiro", response, session, periodo=periodo, territorio_id=territorio_id, limit=limit, cursor=cursor, fields=fields)
 
 
-@router.get("/producao", response_model=List[RAGProducaoOut], summary="Dados de produção assistencial do RAG")
+@router.get(
+    "/producao",
+    response_model=List[RAGProducaoOut],
+    summary="Dados de produção assistencial do RAG",
+    responses=_RESPOSTAS_DETALHES,
+)
 def listar_producao(
+    response: Response,
     periodo: Optional[str] = Query(None, description="Período (ex.: 2024)"),
     territorio_id: Optional[int] = Query(None, description="Filtrar por ID do território"),
+    limit: int = Query(DEFAULT_LIMIT_DETALHES, ge=1, le=5000, description="Máximo de linhas por página"),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: periodo,tipo,quantidade)"),
     session: Session = Depends(get_session),
 ):
-    return service.producao(session, periodo=periodo, territorio_id=territorio_id)
+    return _detalhes("producao", response, session, periodo=periodo, territorio_id=territorio_id, limit=limit, cursor=cursor, fields=fields)
 
 
-@router.get("/metas", response_model=List[RAGMetaOut], summary="Indicadores de metas do RAG")
+@router.get(
+    "/metas",
+    response_model=List[RAGMetaOut],
+    summary="Indicadores de metas do RAG",
+    responses=_RESPOSTAS_DETALHES,
+)
 def listar_metas(
+    response: Response,
     periodo: Optional[str] = Query(None, description="Período (ex.: 2024)"),
     territorio_id: Optional[int] = Query(None, description="Filtrar por ID do território"),
+    limit: int = Query(DEFAULT_LIMIT_DETALHES, ge=1, le=5000, description="Máximo de linhas por página"),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: indicador,cumprida)"),
     session: Session = Depends(get_session),
 ):
-    return service.metas(session, periodo=periodo, territorio_id=territorio_id)
+    return _detalhes("meta", response, session, periodo=periodo, territorio_id=territorio_id, limit=limit, cursor=cursor, fields=fields)
 
 
 @router.post(
@@ -72,6 +157,7 @@ def listar_metas(
                 "X-Exec-Id": {"description": "Identificador da execução", "schema": {"type": "string"}},
                 "X-Hash": {"description": "SHA-256 do conteúdo PDF", "schema": {"type": "string"}},
                 "Content-Disposition": {"description": "Sugestão de nome do arquivo", "schema": {"type": "string"}},
+                "X-Cache": {"description": "HIT quando o PDF veio do cache de renderização", "schema": {"type": "string"}},
             },
         }
     },
@@ -84,10 +170,9 @@ async def exportar_pdf(
     if not payload.html and not payload.url:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="informe 'html' ou 'url'")
     try:
-        if payload.html:
-            pdf_bytes = await exporter.render_pdf_from_html(payload.html, format_=payload.format, margin_mm=payload.margin_mm)
-        else:
-            pdf_bytes = await exporter.render_pdf_from_url(payload.url or "", format_=payload.format, margin_mm=payload.margin_mm)
+        pdf_bytes, cache_hit = await exporter.render_pdf(
+            html=payload.html, url=payload.url, format_=payload.format, margin_mm=payload.margin_mm
+        )
         exec_id = str(uuid.uuid4())
         pdf_hash = exporter.sha256_hex(pdf_bytes)
         try:
@@ -96,6 +181,7 @@ async def exportar_pdf(
                 exec_id=exec_id,
                 hash_sha256=pdf_hash,
                 tipo="rag_pdf",
+                metadados=json.dumps({"cache": "hit" if cache_hit else "miss"}),
             )
         except Exception:
             pass
@@ -103,9 +189,145 @@ async def exportar_pdf(
             "X-Exec-Id": exec_id,
             "X-Hash": pdf_hash,
             "Content-Disposition": 'inline; filename="rag.pdf"',
+            "X-Cache": "HIT" if cache_hit else "MISS",
         }
         return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
     except HTTPException:
         raise
+    except PoolIndisponivel as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"})
     except Exception as exc:  # pragma: no cover
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"erro ao gerar PDF: {exc}")
+
+
+def _job_out(resumo: dict) -> dict:
+    return {
+        **resumo,
+        "status_url": f"/rag/export/jobs/{resumo['exec_id']}",
+        "download_url": f"/rag/export/jobs/{resumo['exec_id']}/pdf",
+    }
+
+
+@router.post(
+    "/export/pdf/jobs",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=ExportJobOut,
+    summary="Enfileira a geração do PDF em segundo plano",
+)
+async def submeter_export_pdf(
+    payload: RAGExportIn,
+    response: Response,
+    _: None = Depends(require_api_key),
+):
+    if not payload.html and not payload.url:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="informe 'html' ou 'url'")
+    try:
+        job = await get_jobs().submeter(
+            tipo="rag_pdf", html=payload.html, url=payload.url, format_=payload.format, margin_mm=payload.margin_mm
+        )
+    except (FilaCheia, PoolIndisponivel) as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"})
+    out = _job_out(job.resumo())
+    response.headers["Location"] = out["status_url"]
+    return out
+
+
+@router.get("/export/jobs/{exec_id}", response_model=ExportJobOut, summary="Status de um job de exportação PDF")
+def status_export_pdf(exec_id: str, session: Session = Depends(get_session)):
+    resumo = get_jobs().status(session, exec_id, tipo="rag_pdf")
+    if resumo is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="job não encontrado")
+    return _job_out(resumo)
+
+
+@router.get(
+    "/export/jobs/{exec_id}/pdf",
+    responses={
+        200: {"content": {"application/pdf": {}}, "description": "PDF gerado pelo job"},
+        409: {"description": "Job ainda não concluído (ou com erro)"},
+        410: {"description": "PDF removido após o prazo de retenção"},
+    },
+)
+def baixar_export_pdf(exec_id: str, session: Session = Depends(get_session)):
+    jobs = get_jobs()
+    resumo = jobs.status(session, exec_id, tipo="rag_pdf")
+    if resumo is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="job não encontrado")
+    path = jobs.arquivo(exec_id)
+    if resumo["status"] == "expirado" or (resumo["status"] == "concluido" and not path.exists()):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="PDF expirado")
+    if resumo["status"] != "concluido":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=resumo["erro"] or f"job {resumo['status']}")
+    headers = {
+        "X-Exec-Id": exec_id,
+        "X-Hash": resumo["hash"] or "",
+        "Content-Disposition": 'inline; filename="rag.pdf"',
+    }
+    return FileResponse(path, media_type="application/pdf", headers=headers)
+
+
+@router.get(
+    "/relatorios/{relatorio}",
+    response_class=HTMLResponse,
+    summary="Relatório RAG em HTML estático (CSS embutido, sem recursos externos)",
+)
+def relatorio_html(
+    relatorio: Literal["resumo", "financeiro", "metas"],
+    periodo: Optional[str] = Query(None, description="Período (ex.: 2025-01)"),
+    territorio_id: Optional[int] = Query(None, description="Filtrar por ID do território"),
+    session: Session = Depends(get_session),
+):
+    return HTMLResponse(relatorios.html(session, f"rag_{relatorio}", periodo=periodo, territorio_id=territorio_id))
+
+
+@router.post(
+    "/relatorios/{relatorio}/pdf",
+    responses={
+        200: {
+            "content": {"application/pdf": {}},
+            "description": "PDF do relatório montado no servidor a partir do DW",
+            "headers": {
+                "X-Exec-Id": {"description": "Identificador da execução", "schema": {"type": "string"}},
+                "X-Hash": {"description": "SHA-256 do conteúdo PDF", "schema": {"type": "string"}},
+                "Content-Disposition": {"description": "Sugestão de nome do arquivo", "schema": {"type": "string"}},
+                "X-Cache": {"description": "HIT quando o PDF veio do cache de renderização", "schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def relatorio_pdf(
+    relatorio: Literal["resumo", "financeiro", "metas"],
+    periodo: Optional[str] = Query(None, description="Período (ex.: 2025-01)"),
+    territorio_id: Optional[int] = Query(None, description="Filtrar por ID do território"),
+    format: str = Query("A4"),
+    margin_mm: int = Query(12),
+    session: Session = Depends(get_session),
+    _: None = Depends(require_api_key),
+):
+    html = relatorios.html(session, f"rag_{relatorio}", periodo=periodo, territorio_id=territorio_id)
+    try:
+        pdf_bytes, cache_hit = await exporter.render_pdf(html=html, format_=format, margin_mm=margin_mm)
+    except PoolIndisponivel as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"erro ao gerar PDF: {e}")
+    exec_id = str(uuid.uuid4())
+    pdf_hash = exporter.sha256_hex(pdf_bytes)
+    try:
+        artefatos.registrar_execucao(
+            session,
+            exec_id=exec_id,
+            hash_sha256=pdf_hash,
+            tipo="rag_pdf",
+            periodo=periodo,
+            metadados=json.dumps({"relatorio": relatorio, "territorio_id": territorio_id, "cache": "hit" if cache_hit else "miss"}),
+        )
+    except Exception:
+        pass
+    headers = {
+        "X-Exec-Id": exec_id,
+        "X-Hash": pdf_hash,
+        "Content-Disposition": f'inline; filename="rag-{relatorio}.pdf"',
+        "X-Cache": "HIT" if cache_hit else "MISS",
+    }
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
@@ -1,20 +1,31 @@
-from typing import Optional, List
+from typing import Literal, Optional, List
+import asyncio
+import itertools
+import json
+import logging
 import uuid
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, HTMLResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from sqlmodel import Session, select
+from starlette.background import BackgroundTask
+from sqlmodel import Session
 
+from app.core.config import get_settings
 from app.core.db import get_session
 from app.core.security import require_api_key
+from app.services.browser_pool import PoolIndisponivel
+from app.services.pdf_jobs import FilaCheia, get_jobs
 from app.services.rdqa_export_service import RDQAExportService
+from app.services.relatorio_service import RelatorioService
 from app.services.artefato_service import ArtefatoService
 from app.services.consistencia_service import ConsistenciaService
-from app.services.rdqa_cobertura_service import RDQACoberturaService
+from app.services.rdqa_cobertura_service import DEFAULT_LIMIT_FALTANTES, RDQACoberturaService, parse_niveis
 from app.services.rdqa_diff_service import RDQADiffService
+from app.services.rdqa_series_service import RDQASeriesService
 from app.services.reproducibilidade_service import ReproducibilidadeService
 from app.services.rdqa_cobertura_service import RDQACoberturaService
+from app.schemas.rdqa import ExportJobOut
 
 
 router = APIRouter(prefix="/rdqa")
@@ -27,12 +38,29 @@ class ExportPDFIn(BaseModel):
     margin_mm: int = 12
 
 
+class DocumentoPDFIn(BaseModel):
+    nome: Optional[str] = None
+    html: Optional[str] = None
+    url: Optional[str] = None
+
+
+class ExportLoteIn(BaseModel):
+    documentos: List[DocumentoPDFIn]
+    format: str = 'A4'
+    margin_mm: int = 12
+
+
+# bytes por bloco ao enviar o ZIP de um lote
+_BLOCO_ZIP = 1024 * 1024
+
 exporter = RDQAExportService()
 artefatos = ArtefatoService()
 consistencia = ConsistenciaService()
 rdqa_cobertura = RDQACoberturaService()
 rdqa_diff = RDQADiffService()
+rdqa_series = RDQASeriesService()
 repro_pkg = ReproducibilidadeService()
+relatorios = RelatorioService()
 
 
 @router.post(
@@ -45,6 +73,7 @@ repro_pkg = ReproducibilidadeService()
                 "X-Exec-Id": {"description": "Identificador da execução", "schema": {"type": "string"}},
                 "X-Hash": {"description": "SHA-256 do conteúdo PDF", "schema": {"type": "string"}},
                 "Content-Disposition": {"description": "Sugestão de nome do arquivo", "schema": {"type": "string"}},
+                "X-Cache": {"description": "HIT quando o PDF veio do cache de renderização", "schema": {"type": "string"}},
             },
         }
     },
@@ -57,10 +86,9 @@ async def export_pdf(
     try:
         if not payload.html and not payload.url:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="informe 'html' ou 'url'")
-        if payload.html:
-            pdf_bytes = await exporter.render_pdf_from_html(payload.html, format_=payload.format, margin_mm=payload.margin_mm)
-        else:
-            pdf_bytes = await exporter.render_pdf_from_url(payload.url or '', format_=payload.format, margin_mm=payload.margin_mm)
+        pdf_bytes, cache_hit = await exporter.render_pdf(
+            html=payload.html, url=payload.url, format_=payload.format, margin_mm=payload.margin_mm
+        )
         exec_id = str(uuid.uuid4())
         pdf_hash = exporter.sha256_hex(pdf_bytes)
         # registrar execução/artefato
@@ -70,6 +98,7 @@ async def export_pdf(
                 exec_id=exec_id,
                 hash_sha256=pdf_hash,
                 tipo="rdqa_pdf",
+                metadados=json.dumps({"cache": "hit" if cache_hit else "miss"}),
             )
         except Exception:
             # Não falhar geração de PDF por erro de registro
@@ -78,39 +107,311 @@ async def export_pdf(
             'X-Exec-Id': exec_id,
             'X-Hash': pdf_hash,
             'Content-Disposition': 'inline; filename="rdqa.pdf"',
+            'X-Cache': 'HIT' if cache_hit else 'MISS',
         }
         return Response(content=pdf_bytes, media_type='application/pdf', headers=headers)
     except HTTPException:
         raise
+    except PoolIndisponivel as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"erro ao gerar PDF: {e}")
 
 
+@router.post(
+    "/export/pdf/lote",
+    responses={
+        200: {
+            "content": {"application/zip": {}},
+            "description": "ZIP com um PDF por documento e MANIFEST.json (hash de cada documento)",
+            "headers": {
+                "X-Exec-Id": {"description": "Identificador da execução do lote", "schema": {"type": "string"}},
+                "X-Hash": {"description": "SHA-256 do conteúdo ZIP", "schema": {"type": "string"}},
+                "X-Documentos-Erro": {"description": "Quantidade de documentos que falharam", "schema": {"type": "integer"}},
+                "Content-Disposition": {"description": "Sugestão de nome do arquivo", "schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def export_pdf_lote(
+    payload: ExportLoteIn,
+    session: Session = Depends(get_session),
+    _: None = Depends(require_api_key),
+):
+    docs = payload.documentos
+    if not docs:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="informe ao menos um documento")
+    limite = get_settings().pdf_lote_max
+    if len(docs) > limite:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"no máximo {limite} documentos por lote")
+    sem_conteudo = [i for i, d in enumerate(docs) if not d.html and not d.url]
+    if sem_conteudo:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"informe 'html' ou 'url' (documentos {sem_conteudo[:10]})",
+        )
+    lote_id = str(uuid.uuid4())
+    usados: set = set()
+    documentos = [
+        {
+            'html': d.html,
+            'url': d.url,
+            'arquivo': exporter.nome_arquivo(d.nome, i, usados),
+            'exec_id': str(uuid.uuid4()),
+        }
+        for i, d in enumerate(docs)
+    ]
+    # os PDFs vão direto para o ZIP em arquivo temporário, que é enviado em blocos
+    try:
+        arquivo, manifest = await exporter.empacotar_lote(
+            lote_id, documentos, format_=payload.format, margin_mm=payload.margin_mm
+        )
+    except PoolIndisponivel as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"})
+    zip_hash = await asyncio.to_thread(exporter.sha256_arquivo, arquivo)
+    erros = sum(1 for doc in manifest['documentos'] if not doc['ok'])
+    # um artefato por documento (mais o do lote), gravados em um único commit
+    execucoes = [
+        {
+            'exec_id': doc['exec_id'],
+            'hash_sha256': doc.get('hash', ''),
+            'tipo': 'rdqa_pdf',
+            'metadados': json.dumps({'lote': lote_id, 'arquivo': doc['arquivo'], 'cache': doc.get('cache')}),
+            'ok': doc['ok'],
+            'mensagem': doc.get('erro'),
+        }
+        for doc in manifest['documentos']
+    ]
+    execucoes.append({
+        'exec_id': lote_id,
+        'hash_sha256': zip_hash,
+        'tipo': 'rdqa_pdf_lote',
+        'metadados': json.dumps({'documentos': len(documentos), 'erros': erros}),
+        'ok': erros == 0,
+    })
+    try:
+        artefatos.registrar_lote(session, execucoes)
+    except Exception:
+        # Não falhar a exportação por erro de registro
+        session.rollback()
+    headers = {
+        'X-Exec-Id': lote_id,
+        'X-Hash': zip_hash,
+        'X-Documentos-Erro': str(erros),
+        'Content-Disposition': 'attachment; filename="rdqa-lote.zip"',
+    }
+    return StreamingResponse(
+        iter(lambda: arquivo.read(_BLOCO_ZIP), b''),
+        media_type='application/zip',
+        headers=headers,
+        # fecha (e apaga) o temporário mesmo se o cliente desistir antes do fim
+        background=BackgroundTask(arquivo.close),
+    )
+
+
+def _job_out(resumo: dict) -> dict:
+    return {
+        **resumo,
+        "status_url": f"/rdqa/export/jobs/{resumo['exec_id']}",
+        "download_url": f"/rdqa/export/jobs/{resumo['exec_id']}/pdf",
+    }
+
+
+@router.post(
+    "/export/pdf/jobs",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=ExportJobOut,
+    summary="Enfileira a geração do PDF em segundo plano",
+)
+async def submeter_export_pdf(
+    payload: ExportPDFIn,
+    response: Response,
+    _: None = Depends(require_api_key),
+):
+    if not payload.html and not payload.url:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="informe 'html' ou 'url'")
+    try:
+        job = await get_jobs().submeter(
+            tipo="rdqa_pdf", html=payload.html, url=payload.url, format_=payload.format, margin_mm=payload.margin_mm
+        )
+    except (FilaCheia, PoolIndisponivel) as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"})
+    out = _job_out(job.resumo())
+    response.headers["Location"] = out["status_url"]
+    return out
+
+
+@router.get("/export/jobs/{exec_id}", response_model=ExportJobOut, summary="Status de um job de exportação PDF")
+def status_export_pdf(exec_id: str, session: Session = Depends(get_session)):
+    resumo = get_jobs().status(session, exec_id, tipo="rdqa_pdf")
+    if resumo is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="job não encontrado")
+    return _job_out(resumo)
+
+
+@router.get(
+    "/export/jobs/{exec_id}/pdf",
+    responses={
+        200: {"content": {"application/pdf": {}}, "description": "PDF gerado pelo job"},
+        409: {"description": "Job ainda não concluído (ou com erro)"},
+        410: {"description": "PDF removido após o prazo de retenção"},
+    },
+)
+def baixar_export_pdf(exec_id: str, session: Session = Depends(get_session)):
+    jobs = get_jobs()
+    resumo = jobs.status(session, exec_id, tipo="rdqa_pdf")
+    if resumo is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="job não encontrado")
+    path = jobs.arquivo(exec_id)
+    if resumo["status"] == "expirado" or (resumo["status"] == "concluido" and not path.exists()):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="PDF expirado")
+    if resumo["status"] != "concluido":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=resumo["erro"] or f"job {resumo['status']}")
+    headers = {
+        'X-Exec-Id': exec_id,
+        'X-Hash': resumo["hash"] or "",
+        'Content-Disposition': 'inline; filename="rdqa.pdf"',
+    }
+    return FileResponse(path, media_type='application/pdf', headers=headers)
+
+
 from app.schemas.rdqa import (
     ConsistenciaResumoOut,
     ConsistenciaDetalheOut,
     CoberturaOut,
+    CoberturaBreakdownOut,
     DiffRowOut,
+    SeriesOut,
 )
 
 
 @router.get("/consistencia", response_model=List[ConsistenciaResumoOut], summary="Lista MAPE por indicador")
-def listar_consistencia(periodo: Optional[str] = Query(None, description="Período (ex.: 2025-01)"), session: Session = Depends(get_session)):
-    res = consistencia.listar_indicadores(session, periodo)
+def listar_consistencia(
+    periodo: Optional[str] = Query(None, description="Período (ex.: 2025-01)"),
+    materializado: bool = Query(False, description="Lê o snapshot mantido pela ingestão em vez de recalcular"),
+    metricas: bool = Query(False, description="Inclui MAE, RMSE, viés e percentis do erro percentual"),
+    session: Session = Depends(get_session),
+):
+    if materializado:
+        res = consistencia.listar_materializado(session, periodo, metricas=metricas)
+    else:
+        res = consistencia.listar_indicadores(session, periodo, metricas=metricas)
     return [
-        {"indicador": r.indicador, "periodo": r.periodo, "mape": r.mape, "pares": r.pares}
+        {
+            "indicador": r.indicador,
+            "periodo": r.periodo,
+            "mape": r.mape,
+            "pares": r.pares,
+            "mae": r.mae,
+            "rmse": r.rmse,
+            "vies": r.vies,
+            "p50": r.p50,
+            "p90": r.p90,
+            "p95": r.p95,
+        }
         for r in res
     ]
 
 
-@router.get("/consistencia/{indicador}/detalhes", response_model=List[ConsistenciaDetalheOut], summary="Drill-down de divergências")
-def detalhes_consistencia(indicador: str, periodo: Optional[str] = Query(None, description="Período"), session: Session = Depends(get_session)):
-    return consistencia.drill_down(session, indicador, periodo)
+@router.get(
+    "/consistencia/{indicador}/detalhes",
+    response_model=List[ConsistenciaDetalheOut],
+    summary="Drill-down de divergências",
+    responses={
+        200: {
+            "headers": {
+                "X-Next-Cursor": {"description": "Cursor da próxima página (ausente na última)", "schema": {"type": "string"}},
+            },
+        }
+    },
+)
+def detalhes_consistencia(
+    indicador: str,
+    response: Response,
+    periodo: Optional[str] = Query(None, description="Período"),
+    materializado: bool = Query(False, description="Lê o snapshot mantido pela ingestão em vez de recalcular"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Máximo de linhas (top-k por erro_pct)"),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    min_erro_pct: Optional[float] = Query(None, ge=0, description="Somente pares com erro_pct >= limiar"),
+    session: Session = Depends(get_session),
+):
+    buscar = consistencia.drill_down_materializado if materializado else consistencia.drill_down_pagina
+    try:
+        pagina = buscar(session, indicador, periodo, limit=limit, cursor=cursor, min_erro_pct=min_erro_pct)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if pagina.proximo_cursor:
+        response.headers["X-Next-Cursor"] = pagina.proximo_cursor
+    return pagina.itens
+
+
+@router.get(
+    "/cobertura",
+    response_model=CoberturaOut,
+    summary="Cobertura de quadros RDQA gerados",
+    responses={
+        200: {
+            "headers": {
+                "X-Next-Cursor": {"description": "Cursor da próxima página de faltantes (ausente na última)", "schema": {"type": "string"}},
+            },
+        }
+    },
+)
+def obter_cobertura(
+    response: Response,
+    periodo: Optional[str] = Query(None, description="Período"),
+    indicador: Optional[str] = Query(None, description="Restringe a um indicador"),
+    limit: int = Query(DEFAULT_LIMIT_FALTANTES, ge=1, le=5000, description="Máximo de faltantes por página"),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor da página anterior"),
+    session: Session = Depends(get_session),
+):
+    try:
+        res = rdqa_cobertura.cobertura(session, periodo, indicador=indicador, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if res["proximo_cursor"]:
+        response.headers["X-Next-Cursor"] = res["proximo_cursor"]
+    return res
+
+
+@router.get("/cobertura/breakdown", response_model=CoberturaBreakdownOut, summary="Matriz de cobertura com rollups")
+def obter_cobertura_breakdown(
+    periodo: Optional[str] = Query(None, description="Período"),
+    indicador: Optional[str] = Query(None, description="Restringe a um indicador"),
+    niveis: Optional[List[str]] = Query(
+        None,
+        description="Níveis de agrupamento (repetível), ex.: 'indicador,periodo', 'territorio', 'total'. "
+        "Padrão: indicador+territorio+periodo, indicador, territorio, periodo e total",
+    ),
+    session: Session = Depends(get_session),
+):
+    try:
+        parsed = parse_niveis(niveis) if niveis else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return rdqa_cobertura.breakdown(session, periodo, indicador=indicador, niveis=parsed)
+
 
+def _json_array_stream(linhas, lote: int = 500):
+    """Serializa um iterável de dicts como array JSON, em blocos de `lote` linhas.
 
-@router.get("/cobertura", response_model=CoberturaOut, summary="Cobertura de quadros RDQA gerados")
-def obter_cobertura(periodo: Optional[str] = Query(None, description="Período"), session: Session = Depends(get_session)):
-    return rdqa_cobertura.cobertura(session, periodo)
+    Se a iteração falhar depois do status 200 já enviado, o array é fechado com um
+    registro final `{"erro": ...}` em vez de terminar com um JSON truncado.
+    """
+    yield "["
+    bloco, primeiro = [], True
+    try:
+        for linha in linhas:
+            bloco.append(json.dumps(linha, ensure_ascii=False))
+            if len(bloco) >= lote:
+                yield ("" if primeiro else ",") + ",".join(bloco)
+                bloco, primeiro = [], False
+    except Exception as e:
+        logging.error("[rdqa] resposta interrompida durante o streaming: %s", e)
+        bloco.append(json.dumps({"erro": f"resposta incompleta: {e}"}, ensure_ascii=False))
+    if bloco:
+        yield ("" if primeiro else ",") + ",".join(bloco)
+    yield "]"
 
 
 @router.get("/diff", response_model=List[DiffRowOut], summary="Comparação entre períodos (diff)")
@@ -120,12 +421,44 @@ def diff(
     indicadores: Optional[str] = Query(None, description="Lista separada por vírgula"),
     session: Session = Depends(get_session),
 ):
+    # a sessão da dependência só é fechada depois que o corpo em streaming termina
     inds = [s.strip() for s in (indicadores.split(",") if indicadores else []) if s.strip()]
+    linhas = rdqa_diff.iter_comparar(
+        session,
+        indicadores=inds or None,
+        periodo_atual=periodo_atual,
+        periodo_anterior=periodo_anterior,
+    )
+    # executa a consulta antes de responder: erros dela ainda viram 500, não um 200 truncado
+    primeira = next(linhas, None)
+    if primeira is not None:
+        linhas = itertools.chain([primeira], linhas)
+    return StreamingResponse(_json_array_stream(linhas), media_type="application/json")
+
+
+@router.get("/series", response_model=SeriesOut, summary="Séries temporais de indicadores (formato colunar)")
+def series(
+    indicadores: str = Query(..., description="Lista separada por vírgula"),
+    chaves: Optional[str] = Query(None, description="Lista separada por vírgula (padrão: todas)"),
+    periodo_inicio: Optional[str] = Query(None, description="Primeiro período exibido"),
+    periodo_fim: Optional[str] = Query(None, description="Último período exibido"),
+    janela: int = Query(3, ge=1, le=36, description="Tamanho da média móvel (observações)"),
+    fonte: Literal["calculado", "referencia"] = Query("calculado", description="Tabela de origem dos valores"),
+    session: Session = Depends(get_session),
+):
+    inds = [s.strip() for s in indicadores.split(",") if s.strip()]
     if not inds:
-        Model = rdqa_diff._model(session)
-        rows = session.exec(select(Model.indicador).where(Model.periodo == periodo_atual).distinct()).all()
-        inds = [row[0] if isinstance(row, tuple) else row for row in rows]
-    return rdqa_diff.comparar(session, indicadores=inds, periodo_atual=periodo_atual, periodo_anterior=periodo_anterior)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="informe ao menos um indicador")
+    chs = [s.strip() for s in (chaves.split(",") if chaves else []) if s.strip()]
+    return rdqa_series.series(
+        session,
+        indicadores=inds,
+        chaves=chs or None,
+        periodo_inicio=periodo_inicio,
+        periodo_fim=periodo_fim,
+        janela=janela,
+        fonte=fonte,
+    )
 
 
 @router.post(
@@ -133,10 +466,13 @@ def diff(
     responses={
         200: {
             "content": {"application/zip": {}},
-            "description": "Pacote de reprodutibilidade (ZIP)",
+            "description": (
+                "Pacote de reprodutibilidade (ZIP, tabelas em NDJSON), enviado em streaming. "
+                "O SHA-256 é calculado durante o envio e registrado ao fim; confira em /public/verificar."
+            ),
             "headers": {
                 "X-Exec-Id": {"description": "Identificador da execução", "schema": {"type": "string"}},
-                "X-Hash": {"description": "SHA-256 do conteúdo ZIP", "schema": {"type": "string"}},
+                "X-Verificacao": {"description": "Endpoint de verificação do hash (após o download)", "schema": {"type": "string"}},
                 "Content-Disposition": {"description": "Sugestão de nome do arquivo", "schema": {"type": "string"}},
             },
         }
@@ -147,18 +483,98 @@ def export_pacote(
     session: Session = Depends(get_session),
     _: None = Depends(require_api_key),
 ):
+    # a sessão da dependência só fecha depois do envio (e da tarefa de fim), mesmo se o cliente desistir
+    pacote = repro_pkg.pacote_stream(session, periodo=periodo)
+    # registrado já como pendente: /public/verificar reconhece o exec_id durante o envio
     try:
-        zip_bytes, exec_id, pkg_hash = repro_pkg.gerar_pacote(session, periodo=periodo)
-        # registrar artefato
+        artefatos.registrar_execucao(
+            session, exec_id=pacote.exec_id, hash_sha256="", tipo="rdqa_package", periodo=periodo,
+            mensagem="pacote em geração",
+        )
+    except Exception:
+        session.rollback()
+
+    def _finalizar():
+        # o hash só existe ao fim do envio; sem ele, o envio foi interrompido
         try:
-            artefatos.registrar_execucao(session, exec_id=exec_id, hash_sha256=pkg_hash, tipo="rdqa_package")
+            artefatos.registrar_execucao(
+                session, exec_id=pacote.exec_id, hash_sha256=pacote.sha256 or "", tipo="rdqa_package",
+                periodo=periodo, ok=pacote.sha256 is not None,
+                mensagem=None if pacote.sha256 else "envio interrompido antes do fim",
+            )
         except Exception:
-            pass
-        headers = {
-            'X-Exec-Id': exec_id,
-            'X-Hash': pkg_hash,
-            'Content-Disposition': 'attachment; filename="rdqa-package.zip"',
+            session.rollback()
+
+    headers = {
+        'X-Exec-Id': pacote.exec_id,
+        'X-Verificacao': f'/public/verificar?exec_id={pacote.exec_id}',
+        'Content-Disposition': 'attachment; filename="rdqa-package.zip"',
+    }
+    return StreamingResponse(
+        iter(pacote), media_type='application/zip', headers=headers, background=BackgroundTask(_finalizar)
+    )
+
+
+@router.get(
+    "/relatorios/{relatorio}",
+    response_class=HTMLResponse,
+    summary="Relatório RDQA em HTML estático (CSS embutido, sem recursos externos)",
+)
+def relatorio_html(
+    relatorio: Literal["consistencia", "cobertura"],
+    periodo: Optional[str] = Query(None, description="Período (ex.: 2025-01)"),
+    session: Session = Depends(get_session),
+):
+    return HTMLResponse(relatorios.html(session, f"rdqa_{relatorio}", periodo=periodo))
+
+
+@router.post(
+    "/relatorios/{relatorio}/pdf",
+    responses={
+        200: {
+            "content": {"application/pdf": {}},
+            "description": "PDF do relatório montado no servidor a partir do DW",
+            "headers": {
+                "X-Exec-Id": {"description": "Identificador da execução", "schema": {"type": "string"}},
+                "X-Hash": {"description": "SHA-256 do conteúdo PDF", "schema": {"type": "string"}},
+                "Content-Disposition": {"description": "Sugestão de nome do arquivo", "schema": {"type": "string"}},
+                "X-Cache": {"description": "HIT quando o PDF veio do cache de renderização", "schema": {"type": "string"}},
+            },
         }
-        return Response(content=zip_bytes, media_type='application/zip', headers=headers)
+    },
+)
+async def relatorio_pdf(
+    relatorio: Literal["consistencia", "cobertura"],
+    periodo: Optional[str] = Query(None, description="Período (ex.: 2025-01)"),
+    format: str = Query('A4'),
+    margin_mm: int = Query(12),
+    session: Session = Depends(get_session),
+    _: None = Depends(require_api_key),
+):
+    html = relatorios.html(session, f"rdqa_{relatorio}", periodo=periodo)
+    try:
+        pdf_bytes, cache_hit = await exporter.render_pdf(html=html, format_=format, margin_mm=margin_mm)
+    except PoolIndisponivel as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"erro ao gerar pacote: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"erro ao gerar PDF: {e}")
+    exec_id = str(uuid.uuid4())
+    pdf_hash = exporter.sha256_hex(pdf_bytes)
+    try:
+        artefatos.registrar_execucao(
+            session,
+            exec_id=exec_id,
+            hash_sha256=pdf_hash,
+            tipo="rdqa_pdf",
+            periodo=periodo,
+            metadados=json.dumps({"relatorio": relatorio, "cache": "hit" if cache_hit else "miss"}),
+        )
+    except Exception:
+        pass
+    headers = {
+        'X-Exec-Id': exec_id,
+        'X-Hash': pdf_hash,
+        'Content-Disposition': f'inline; filename="rdqa-{relatorio}.pdf"',
+        'X-Cache': 'HIT' if cache_hit else 'MISS',
+    }
+    return Response(content=pdf_bytes, media_type='application/pdf', headers=headers)
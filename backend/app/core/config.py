@@ -1,9 +1,13 @@
 import os
+import tempfile
 from functools import lru_cache
 from dataclasses import dataclass
 from dotenv import load_dotenv, find_dotenv
 
 
+PDF_STARTUP_MODOS = ("lazy", "warm", "off")
+
+
 @dataclass
 class Settings:
     app_name: str = "Saúde API"
@@ -12,6 +16,30 @@ class Settings:
         o.strip() for o in os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(",")
     )
     api_key: str | None = os.getenv("API_KEY")
+    # inicialização da exportação PDF: lazy (pyppeteer/Chromium só no primeiro export),
+    # warm (pool lançado no startup) ou off (instância sem exportação PDF)
+    pdf_startup: str = os.getenv("PDF_STARTUP", "lazy").strip().lower()
+    # pool de navegadores da exportação PDF
+    pdf_navegadores: int = int(os.getenv("PDF_NAVEGADORES", "1"))
+    pdf_paginas_por_navegador: int = int(os.getenv("PDF_PAGINAS_POR_NAVEGADOR", "4"))
+    pdf_fila_max: int = int(os.getenv("PDF_FILA_MAX", "16"))
+    pdf_espera_s: float = float(os.getenv("PDF_ESPERA_S", "30"))
+    pdf_render_timeout_s: float = float(os.getenv("PDF_RENDER_TIMEOUT_S", "60"))
+    # cache em disco dos PDFs renderizados (PDF_CACHE_MAX_MB=0 desliga)
+    pdf_cache_dir: str = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "saude-api-pdf"))
+    pdf_cache_max_mb: int = int(os.getenv("PDF_CACHE_MAX_MB", "256"))
+    pdf_cache_ttl_s: float = float(os.getenv("PDF_CACHE_TTL_S", "86400"))
+    # jobs de exportação PDF em segundo plano
+    pdf_jobs_dir: str = os.getenv("PDF_JOBS_DIR", os.path.join(tempfile.gettempdir(), "saude-api-pdf-jobs"))
+    pdf_jobs_trabalhadores: int = int(os.getenv("PDF_JOBS_TRABALHADORES", "2"))
+    pdf_jobs_fila_max: int = int(os.getenv("PDF_JOBS_FILA_MAX", "100"))
+    pdf_jobs_retencao_s: float = float(os.getenv("PDF_JOBS_RETENCAO_S", "86400"))
+    # máximo de documentos por exportação em lote
+    pdf_lote_max: int = int(os.getenv("PDF_LOTE_MAX", "500"))
+
+    def __post_init__(self):
+        if self.pdf_startup not in PDF_STARTUP_MODOS:
+            raise ValueError(f"PDF_STARTUP inválido: {self.pdf_startup!r} (use {', '.join(PDF_STARTUP_MODOS)})")
 
 
 @lru_cache(maxsize=1)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Optional
 from datetime import date, datetime
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -82,6 +83,9 @@ class DevArtefatoExecucao(SQLModel, table=True):
 
 
 class DevRefIndicador(SQLModel, table=True):
+    # chave natural do upsert da ingestão (INSERT ... ON CONFLICT)
+    __table_args__ = (Index("ux_devrefindicador_chave", "indicador", "chave", "periodo", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     indicador: str
     chave: str  # dimensão/escopo (ex.: municipio=4300000; equipe=123)
@@ -90,6 +94,8 @@ class DevRefIndicador(SQLModel, table=True):
 
 
 class DevCalcIndicador(SQLModel, table=True):
+    __table_args__ = (Index("ux_devcalcindicador_chave", "indicador", "chave", "periodo", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     indicador: str
     chave: str
@@ -97,7 +103,32 @@ class DevCalcIndicador(SQLModel, table=True):
     valor: float
 
 
+class DevConsistenciaErro(SQLModel, table=True):
+    # mesmo índice da migração 0007: drill-down e leituras por (indicador, periodo)
+    __table_args__ = (Index("ix_devconsistenciaerro_drill", "indicador", "periodo", "erro_pct"),)
+
+    indicador: str = Field(primary_key=True)
+    chave: str = Field(primary_key=True)
+    periodo: str = Field(primary_key=True)
+    ref: float
+    calc: Optional[float] = None
+    erro_abs: Optional[float] = None
+    erro_pct: Optional[float] = None
+
+
+class DevConsistenciaResumo(SQLModel, table=True):
+    indicador: str = Field(primary_key=True)
+    periodo: str = Field(primary_key=True)
+    soma_erro_pct: float = 0.0
+    pares: int = 0
+    mape: Optional[float] = None
+    atualizado_em: datetime = Field(default_factory=datetime.utcnow)
+
+
 class DevFatoRAGFinanceiro(SQLModel, table=True):
+    # partição substituída por inteiro na ingestão RAG (mesmo índice da migração 0006)
+    __table_args__ = (Index("ix_devfatoragfinanceiro_particao", "periodo", "territorio_id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     periodo: str
     territorio_id: int
@@ -109,6 +140,8 @@ class DevFatoRAGFinanceiro(SQLModel, table=True):
 
 
 class DevFatoRAGProducao(SQLModel, table=True):
+    __table_args__ = (Index("ix_devfatoragproducao_particao", "periodo", "territorio_id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     periodo: str
     territorio_id: int
@@ -117,9 +150,26 @@ class DevFatoRAGProducao(SQLModel, table=True):
 
 
 class DevFatoRAGMeta(SQLModel, table=True):
+    __table_args__ = (Index("ix_devfatoragmeta_particao", "periodo", "territorio_id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     periodo: str
     territorio_id: int
     indicador: str
     meta_planejada: Optional[float] = None
     meta_executada: Optional[float] = None
+
+
+class DevRAGResumo(SQLModel, table=True):
+    periodo: str = Field(primary_key=True)
+    territorio_id: int = Field(primary_key=True)
+    dotacao_atualizada: float = 0.0
+    receita_realizada: float = 0.0
+    empenhado: float = 0.0
+    liquidado: float = 0.0
+    pago: float = 0.0
+    execucao_percentual: Optional[float] = None
+    producao_total: int = 0
+    metas_cumpridas: int = 0
+    metas_total: int = 0
+    atualizado_em: datetime = Field(default_factory=datetime.utcnow)
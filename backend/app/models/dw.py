@@ -176,6 +176,23 @@ class FatoRAGMeta(DWBase, table=True):
     extract_ts: datetime = Field(default_factory=datetime.utcnow)
 
 
+class RAGResumo(DWBase, table=True):
+    """Resumo do RAG por (periodo, territorio_id), mantido pela carga dos fatos."""
+
+    periodo: str = Field(primary_key=True)
+    territorio_id: int = Field(primary_key=True)
+    dotacao_atualizada: float = 0.0
+    receita_realizada: float = 0.0
+    empenhado: float = 0.0
+    liquidado: float = 0.0
+    pago: float = 0.0
+    execucao_percentual: Optional[float] = None
+    producao_total: int = 0
+    metas_cumpridas: int = 0
+    metas_total: int = 0
+    atualizado_em: datetime = Field(default_factory=datetime.utcnow)
+
+
 __all__ = [
     "DemoItem",
     "DimTerritorio",
@@ -194,4 +211,5 @@ __all__ = [
         "FatoRAGFinanceiro",
         "FatoRAGProducao",
         "FatoRAGMeta",
+        "RAGResumo",
 ]
@@ -2,9 +2,9 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
-from sqlalchemy import JSON
+from sqlalchemy import JSON, Index
 from sqlmodel import Field, SQLModel
 
 
@@ -29,6 +29,11 @@ __all__ = ["RawIngest"]
 
 
 class RefIndicador(StageBase, table=True):
+    __table_args__ = (
+        Index("uq_stage_ref_indicador_chave", "indicador", "chave", "periodo", unique=True),
+        {"schema": "stage"},
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     indicador: str
     chave: str
@@ -37,6 +42,11 @@ class RefIndicador(StageBase, table=True):
 
 
 class CalcIndicador(StageBase, table=True):
+    __table_args__ = (
+        Index("uq_stage_calc_indicador_chave", "indicador", "chave", "periodo", unique=True),
+        {"schema": "stage"},
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     indicador: str
     chave: str
@@ -45,3 +55,34 @@ class CalcIndicador(StageBase, table=True):
 
 
 __all__ += ["RefIndicador", "CalcIndicador"]
+
+
+class ConsistenciaErro(StageBase, table=True):
+    """Snapshot do erro por par ref/calc, mantido pela ingestão RDQA."""
+
+    __table_args__ = (
+        Index("ix_consistencia_erro_drill", "indicador", "periodo", "erro_pct"),
+        {"schema": "stage"},
+    )
+
+    indicador: str = Field(primary_key=True)
+    chave: str = Field(primary_key=True)
+    periodo: str = Field(primary_key=True)
+    ref: float
+    calc: Optional[float] = None
+    erro_abs: Optional[float] = None
+    erro_pct: Optional[float] = None
+
+
+class ConsistenciaResumo(StageBase, table=True):
+    """Snapshot do MAPE por (indicador, periodo); `soma_erro_pct` permite reagregar entre períodos."""
+
+    indicador: str = Field(primary_key=True)
+    periodo: str = Field(primary_key=True)
+    soma_erro_pct: float = 0.0
+    pares: int = 0
+    mape: Optional[float] = None
+    atualizado_em: datetime = Field(default_factory=datetime.utcnow)
+
+
+__all__ += ["ConsistenciaErro", "ConsistenciaResumo"]
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlmodel import Session, select
+
+
+DEFAULT_MAX_ITENS = 20_000
+# `invalidar()` só vale para o processo que escreveu: escritas de outros workers/réplicas,
+# cargas e seeds aparecem no máximo após este prazo
+DEFAULT_TTL_S = 300.0
+# ids por consulta ao buscar os faltantes (limite de parâmetros do SQLite)
+_IDS_POR_CONSULTA = 500
+
+Atributos = Dict[str, Any]
+
+
+class DimensaoCache:
+    """Cache de processo id -> atributos de uma dimensão, com LRU limitado a `max_itens`.
+
+    Versionado: `invalidar()` incrementa `versao` e descarta as entradas, e uma leitura
+    iniciada antes da invalidação não repovoa o cache com dados antigos. A chave inclui
+    a tabela, então modelos Dev* (SQLite) e DW não se misturam.
+    """
+
+    def __init__(self, nome: str, *, max_itens: int = DEFAULT_MAX_ITENS, ttl_s: float = DEFAULT_TTL_S):
+        self.nome = nome
+        self.max_itens = max_itens
+        self.ttl_s = ttl_s
+        self.versao = 0
+        self.hits = 0
+        self.misses = 0
+        self._itens: "OrderedDict[Tuple[str, int], Tuple[float, Atributos]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, session: Session, Model, ids: Iterable[int]) -> Dict[int, Atributos]:
+        """Atributos (colunas) de cada id encontrado; ids inexistentes ficam de fora e não são cacheados."""
+        tabela = Model.__table__.fullname
+        agora = time.monotonic()
+        out: Dict[int, Atributos] = {}
+        faltantes: List[int] = []
+        with self._lock:
+            versao = self.versao
+            for id_ in {i for i in ids if i is not None}:
+                entrada = self._itens.get((tabela, id_))
+                if entrada is not None and agora - entrada[0] < self.ttl_s:
+                    self._itens.move_to_end((tabela, id_))
+                    out[id_] = entrada[1]
+                    self.hits += 1
+                else:
+                    faltantes.append(id_)
+                    self.misses += 1
+        if not faltantes:
+            return out
+
+        colunas = list(Model.__table__.columns)
+        lidos: Dict[int, Atributos] = {}
+        for i in range(0, len(faltantes), _IDS_POR_CONSULTA):
+            stmt = select(*colunas).where(Model.id.in_(faltantes[i:i + _IDS_POR_CONSULTA]))
+            for row in session.exec(stmt).all():
+                attrs = dict(row._mapping)
+                lidos[attrs["id"]] = attrs
+        with self._lock:
+            if self.versao == versao:
+                for id_, attrs in lidos.items():
+                    self._itens[(tabela, id_)] = (agora, attrs)
+                    self._itens.move_to_end((tabela, id_))
+                while len(self._itens) > self.max_itens:
+                    self._itens.popitem(last=False)
+        out.update(lidos)
+        return out
+
+    def atributo(self, session: Session, Model, ids: Iterable[int], campo: str) -> Dict[int, Any]:
+        """Atalho para um único atributo, ex.: `territorios.atributo(session, Terr, ids, "nome")`."""
+        return {id_: attrs.get(campo) for id_, attrs in self.obter(session, Model, ids).items()}
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self.versao += 1
+            self._itens.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "versao": self.versao,
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# caches compartilhados pelo processo; o repositório da dimensão os invalida nas escritas
+territorios = DimensaoCache("territorio")
+
+CACHES = {c.nome: c for c in (territorios,)}
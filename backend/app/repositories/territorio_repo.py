@@ -5,6 +5,7 @@ from sqlmodel import Session
 
 from app.models.dw import DimTerritorio
 from app.models.dev_lite import DevDimTerritorio
+from app.repositories import dimensao_cache as dim_cache
 
 
 class TerritorioRepository:
@@ -66,6 +67,7 @@ class TerritorioRepository:
         )
         session.add(row)
         session.commit()
+        dim_cache.territorios.invalidar()
         session.refresh(row)
         return row
 
@@ -102,6 +104,7 @@ class TerritorioRepository:
             row.pop_estim_2024 = pop_estim_2024
         session.add(row)
         session.commit()
+        dim_cache.territorios.invalidar()
         session.refresh(row)
         return row
 
@@ -112,4 +115,5 @@ class TerritorioRepository:
             return False
         session.delete(row)
         session.commit()
+        dim_cache.territorios.invalidar()
         return True
@@ -10,6 +10,12 @@ class ConsistenciaResumoOut(BaseModel):
     periodo: Optional[str] = None
     mape: Optional[float] = Field(None, description="Erro Percentual Absoluto Médio (0-100)")
     pares: int
+    mae: Optional[float] = Field(None, description="Erro Absoluto Médio (com metricas=true)")
+    rmse: Optional[float] = Field(None, description="Raiz do Erro Quadrático Médio (com metricas=true)")
+    vies: Optional[float] = Field(None, description="Viés médio (calc - ref) (com metricas=true)")
+    p50: Optional[float] = Field(None, description="Mediana do erro percentual (com metricas=true)")
+    p90: Optional[float] = Field(None, description="Percentil 90 do erro percentual (com metricas=true)")
+    p95: Optional[float] = Field(None, description="Percentil 95 do erro percentual (com metricas=true)")
 
 
 class ConsistenciaDetalheOut(BaseModel):
@@ -24,15 +30,58 @@ class ConsistenciaDetalheOut(BaseModel):
 
 class CoberturaFaltanteItem(BaseModel):
     quadro: str
+    indicador: Optional[str] = None
+    chave: Optional[str] = None
     periodo: str
     motivo: str
 
 
+class CoberturaIndicadorOut(BaseModel):
+    indicador: str
+    total: int
+    gerados: int
+    faltantes: int
+    percent: float
+
+
 class CoberturaOut(BaseModel):
     percent: float
     total: int
     gerados: int
+    faltantes_total: int = 0
     faltantes: List[CoberturaFaltanteItem]
+    por_indicador: List[CoberturaIndicadorOut] = []
+
+
+class CoberturaGrupoOut(BaseModel):
+    nivel: str = Field(..., description="Dimensões agrupadas (ex.: indicador+periodo) ou 'total'")
+    indicador: Optional[str] = None
+    territorio: Optional[str] = None
+    periodo: Optional[str] = None
+    total: int
+    gerados: int
+    faltantes: int
+    percent: float
+
+
+class CoberturaBreakdownOut(BaseModel):
+    niveis: List[str]
+    grupos: List[CoberturaGrupoOut]
+
+
+class SerieOut(BaseModel):
+    indicador: str
+    chave: str
+    valores: List[Optional[float]] = Field(..., description="Um valor por item de `periodos` (null quando ausente)")
+    delta: List[Optional[float]] = Field(..., description="Diferença para a observação anterior da série")
+    media_movel: List[Optional[float]] = Field(..., description="Média das últimas `janela` observações")
+
+
+class SeriesOut(BaseModel):
+    fonte: Literal["calculado", "referencia"]
+    janela: int
+    periodos: List[str]
+    series: List[SerieOut]
 
 
 class DiffRowOut(BaseModel):
@@ -59,3 +108,15 @@ class VerificacaoOut(BaseModel):
     mensagem: Optional[str] = None
     created_at: Optional[str] = None
 
+
+class ExportJobOut(BaseModel):
+    exec_id: str
+    tipo: str
+    status: Literal["pendente", "processando", "concluido", "erro", "expirado"]
+    hash: Optional[str] = None
+    erro: Optional[str] = None
+    criado_em: Optional[str] = None
+    iniciado_em: Optional[str] = None
+    concluido_em: Optional[str] = None
+    status_url: str
+    download_url: str
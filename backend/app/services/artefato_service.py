@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from sqlmodel import Session, select
 
@@ -9,6 +9,10 @@ from app.models.dev_lite import DevArtefatoExecucao
 
 
 class ArtefatoService:
+    def modelo(self, session: Session):
+        """Modelo de `ArtefatoExecucao` para o dialeto da sessão (Dev ou dw)."""
+        return self._model(session)
+
     def _model(self, session: Session):
         dialect = session.get_bind().dialect.name if session.get_bind() else ''
         return DevArtefatoExecucao if dialect == 'sqlite' else DWArtefatoExecucao
@@ -61,6 +65,31 @@ class ArtefatoService:
         session.refresh(row)
         return row
 
+    def registrar_lote(self, session: Session, execucoes: List[Dict[str, Any]]) -> int:
+        """Insere várias execuções novas (campos de `registrar_execucao`, com `exec_id`) em um único commit."""
+        Model = self._model(session)
+        session.add_all([Model(id=e["exec_id"], **{k: v for k, v in e.items() if k != "exec_id"}) for e in execucoes])
+        session.commit()
+        return len(execucoes)
+
+    def ultima_execucao(
+        self,
+        session: Session,
+        *,
+        tipo: str,
+        fonte: Optional[str],
+        periodo: Optional[str],
+    ):
+        """Execução bem-sucedida mais recente de um `tipo` para a mesma fonte/período."""
+        Model = self._model(session)
+        stmt = (
+            select(Model)
+            .where(Model.tipo == tipo, Model.fonte == fonte, Model.periodo == periodo, Model.ok == True)  # noqa: E712
+            .order_by(Model.created_at.desc())
+            .limit(1)
+        )
+        return session.exec(stmt).first()
+
     def verificar(self, session: Session, *, exec_id: Optional[str], hash_value: Optional[str]) -> Dict[str, Any]:
         Model = self._model(session)
         if not exec_id or not hash_value:
@@ -81,11 +110,17 @@ class ArtefatoService:
                 "message": "execucao nao localizada",
             }
         ok = (row.hash_sha256 == hash_value)
+        if ok:
+            situacao = "valido"
+        elif not row.hash_sha256 and row.ok:
+            situacao = "pendente"  # execução registrada, hash ainda não calculado (ex.: pacote em envio)
+        else:
+            situacao = "hash_divergente"
         return {
             "ok": ok,
             "exec_id": exec_id,
             "hash": hash_value,
-            "status": "valido" if ok else "hash_divergente",
+            "status": situacao,
             "tipo": getattr(row, 'tipo', None),
             "fonte": getattr(row, 'fonte', None),
             "periodo": getattr(row, 'periodo', None),
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class PoolIndisponivel(Exception):
+    """Fila de espera cheia ou tempo de espera esgotado; a requisição deve ser repetida depois."""
+
+
+@dataclass
+class _Navegador:
+    browser: Any
+    livres: List[Any] = field(default_factory=list)
+    em_uso: int = 0
+    usos: Dict[int, int] = field(default_factory=dict)
+    vivo: bool = True
+    verificado_em: float = 0.0
+
+
+class BrowserPool:
+    """Pool de navegadores headless com páginas reaproveitáveis.
+
+    - `navegadores` instâncias, cada uma com até `paginas_por_navegador` páginas em uso;
+      o total de renderizações simultâneas é o produto dos dois.
+    - Quem chega com o pool ocupado espera até `espera_s`; com `fila_max` requisições
+      já esperando, a próxima recebe `PoolIndisponivel` na hora (sem fila ilimitada).
+    - Navegadores são verificados (`version()`, com `verificar_s` de intervalo) e
+      relançados quando caem; páginas são descartadas após erro ou `max_usos` usos e,
+      antes de voltar ao pool, perdem cookies e documento (`about:blank`).
+
+    `lancar` é uma corrotina que devolve um navegador (pyppeteer `Browser` ou compatível).
+    """
+
+    def __init__(
+        self,
+        lancar: Callable[[], Awaitable[Any]],
+        *,
+        navegadores: int = 1,
+        paginas_por_navegador: int = 4,
+        fila_max: int = 16,
+        espera_s: float = 30.0,
+        max_usos: int = 50,
+        verificar_s: float = 10.0,
+    ):
+        if navegadores < 1 or paginas_por_navegador < 1:
+            raise ValueError("navegadores e paginas_por_navegador devem ser >= 1")
+        self._lancar = lancar
+        self.navegadores = navegadores
+        self.paginas_por_navegador = paginas_por_navegador
+        self.fila_max = fila_max
+        self.espera_s = espera_s
+        self.max_usos = max_usos
+        self.verificar_s = verificar_s
+        self._slots: List[Optional[_Navegador]] = [None] * navegadores
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._aguardando = 0
+        self.relancamentos = 0
+
+    @property
+    def capacidade(self) -> int:
+        return self.navegadores * self.paginas_por_navegador
+
+    async def _primitivas(self) -> None:
+        # semáforo/lock pertencem ao loop em execução; recriados se o loop mudar (ex.: testes)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._sem = asyncio.Semaphore(self.capacidade)
+            self._lock = asyncio.Lock()
+            # os navegadores do loop anterior não seriam mais usados: fecha em vez de deixar o processo órfão
+            antigos, self._slots = self._slots, [None] * self.navegadores
+            self._aguardando = 0
+            for nav in antigos:
+                if nav is not None:
+                    await self._descartar(nav)
+
+    async def _novo(self) -> _Navegador:
+        browser = await self._lancar()
+        nav = _Navegador(browser=browser, verificado_em=time.monotonic())
+
+        def _caiu(*_):
+            nav.vivo = False
+
+        try:
+            browser.on("disconnected", _caiu)
+        except Exception:
+            pass
+        return nav
+
+    async def _saudavel(self, nav: _Navegador) -> bool:
+        if not nav.vivo:
+            return False
+        if time.monotonic() - nav.verificado_em < self.verificar_s:
+            return True
+        try:
+            await asyncio.wait_for(nav.browser.version(), timeout=5)
+            nav.verificado_em = time.monotonic()
+            return True
+        except Exception:
+            nav.vivo = False
+            return False
+
+    async def _descartar(self, nav: _Navegador) -> None:
+        nav.vivo = False
+        try:
+            await asyncio.wait_for(nav.browser.close(), timeout=5)
+        except Exception:
+            pass
+
+    async def _escolher(self) -> _Navegador:
+        """Navegador saudável com menos páginas em uso, lançando/relançando os que faltam."""
+        async with self._lock:
+            for i, nav in enumerate(self._slots):
+                if nav is not None and not await self._saudavel(nav):
+                    # com páginas em uso, o fechamento fica para a devolução da última delas
+                    if nav.em_uso == 0:
+                        await self._descartar(nav)
+                    logging.warning("[pdf] navegador %d indisponível; relançando", i)
+                    self._slots[i] = None
+                    self.relancamentos += 1
+                if self._slots[i] is None:
+                    self._slots[i] = await self._novo()
+            candidatos = [n for n in self._slots if n is not None and n.em_uso < self.paginas_por_navegador]
+            nav = min(candidatos, key=lambda n: n.em_uso)
+            nav.em_uso += 1
+            return nav
+
+    async def _obter_pagina(self, nav: _Navegador):
+        while nav.livres:
+            page = nav.livres.pop()
+            try:
+                if not page.isClosed():
+                    return page
+            except Exception:
+                pass
+            nav.usos.pop(id(page), None)
+        return await nav.browser.newPage()
+
+    @staticmethod
+    async def _limpar(page) -> bool:
+        """Apaga o estado deixado pela renderização anterior (cookies e documento); False se falhar."""
+        try:
+            cookies = await page.cookies()
+            if cookies:
+                await page.deleteCookie(*cookies)
+            await page.goto("about:blank")
+            return True
+        except Exception:
+            return False
+
+    async def _devolver(self, nav: _Navegador, page, ok: bool) -> None:
+        nav.em_uso -= 1
+        usos = nav.usos.get(id(page), 0) + 1
+        if ok and nav.vivo and usos < self.max_usos and await self._limpar(page):
+            nav.usos[id(page)] = usos
+            nav.livres.append(page)
+            return
+        nav.usos.pop(id(page), None)
+        try:
+            await page.close()
+        except Exception:
+            pass
+        if not nav.vivo and nav.em_uso == 0 and nav not in self._slots:
+            await self._descartar(nav)
+
+    @asynccontextmanager
+    async def pagina(self):
+        """Empresta uma página; em caso de erro durante o uso, ela é descartada."""
+        await self._primitivas()
+        if not self._sem.locked():
+            await self._sem.acquire()  # há vaga: não passa pela fila
+        else:
+            if self._aguardando >= self.fila_max:
+                raise PoolIndisponivel("fila de renderização cheia")
+            self._aguardando += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), timeout=self.espera_s)
+            except asyncio.TimeoutError:
+                raise PoolIndisponivel("tempo de espera por um navegador esgotado")
+            finally:
+                self._aguardando -= 1
+        try:
+            nav = await self._escolher()
+            ok = False
+            page = None
+            try:
+                page = await self._obter_pagina(nav)
+                yield page
+                ok = True
+            except BaseException:
+                # erro de CDP/conexão pode indicar navegador travado: força verificação no próximo uso
+                nav.verificado_em = 0.0
+                raise
+            finally:
+                if page is None:
+                    nav.em_uso -= 1
+                else:
+                    await self._devolver(nav, page, ok)
+        finally:
+            self._sem.release()
+
+    async def aquecer(self) -> int:
+        """Lança os navegadores que faltam, já com uma página aberta em cada; devolve quantos estão ativos."""
+        await self._primitivas()
+        async with self._lock:
+            for i, nav in enumerate(self._slots):
+                if nav is None or not nav.vivo:
+                    if nav is not None and nav.em_uso == 0:
+                        await self._descartar(nav)
+                    nav = self._slots[i] = await self._novo()
+                if not nav.livres:
+                    nav.livres.append(await nav.browser.newPage())
+        return sum(1 for n in self._slots if n is not None)
+
+    async def fechar(self) -> None:
+        for i, nav in enumerate(self._slots):
+            if nav is not None:
+                await self._descartar(nav)
+                self._slots[i] = None
+
+    def estatisticas(self) -> Dict[str, Any]:
+        ativos = [n for n in self._slots if n is not None]
+        return {
+            "capacidade": self.capacidade,
+            "em_uso": sum(n.em_uso for n in ativos),
+            "aguardando": self._aguardando,
+            "navegadores": len(ativos),
+            "paginas_livres": sum(len(n.livres) for n in ativos),
+            "relancamentos": self.relancamentos,
+        }
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:  # NumPy é opcional: sem ele, o motor usa o caminho em Python puro
+    import numpy as np
+except Exception:  # pragma: no cover - depende do ambiente
+    np = None
+
+
+PERCENTIS = (50, 90, 95)
+_SEP = "\x1f"
+
+# (indicador, chave, periodo, valor)
+Linha = Tuple[str, str, str, float]
+
+
+@dataclass
+class MetricasIndicador:
+    """Métricas de consistência de um indicador.
+
+    `pares` e o MAPE/percentis consideram apenas pares com referência diferente
+    de zero (erro percentual definido); MAE, RMSE e viés (média de calc - ref)
+    consideram todos os pares com cálculo.
+    """
+
+    indicador: str
+    pares: int = 0
+    mape: Optional[float] = None
+    mae: Optional[float] = None
+    rmse: Optional[float] = None
+    vies: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+
+    def extras(self) -> Dict[str, Optional[float]]:
+        return {"mae": self.mae, "rmse": self.rmse, "vies": self.vies, "p50": self.p50, "p90": self.p90, "p95": self.p95}
+
+
+def vetorizado() -> bool:
+    return np is not None
+
+
+def _percentil(ordenados: Sequence[float], q: float) -> float:
+    """Percentil com interpolação linear (mesma definição do `numpy.percentile`)."""
+    pos = (len(ordenados) - 1) * q / 100.0
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(ordenados) - 1)
+    return ordenados[lo] + (ordenados[hi] - ordenados[lo]) * (pos - lo)
+
+
+# --- NumPy ------------------------------------------------------------------
+
+def _chaves(rows: Sequence[Linha]):
+    return np.array([f"{i}{_SEP}{c}{_SEP}{p}" for i, c, p, _ in rows], dtype=str)
+
+
+def _ultimas(keys):
+    """Ordena as chaves (estável) mantendo só a última ocorrência de cada uma, como um dict."""
+    ordem = np.argsort(keys, kind="stable")
+    ks = keys[ordem]
+    ultimo = np.ones(len(ks), dtype=bool)
+    ultimo[:-1] = ks[1:] != ks[:-1]
+    return ordem[ultimo], ks[ultimo]
+
+
+def _alinhar_np(ref_rows: Sequence[Linha], calc_rows: Sequence[Linha]):
+    ref_keys = _chaves(ref_rows)
+    ref_idx, ref_keys = _ultimas(ref_keys)
+    ref = np.array([r[3] for r in ref_rows], dtype=float)[ref_idx]
+    indicadores = np.array([r[0] for r in ref_rows], dtype=object)[ref_idx]
+    calc = np.full(len(ref_keys), np.nan)
+    if calc_rows:
+        calc_idx, calc_keys = _ultimas(_chaves(calc_rows))
+        calc_vals = np.array([c[3] for c in calc_rows], dtype=float)[calc_idx]
+        # junção por chave ordenada: posição de cada chave de ref entre as chaves de calc
+        pos = np.searchsorted(calc_keys, ref_keys)
+        pos_ok = np.minimum(pos, len(calc_keys) - 1)
+        casou = (pos < len(calc_keys)) & (calc_keys[pos_ok] == ref_keys)
+        calc[casou] = calc_vals[pos_ok[casou]]
+    return indicadores, ref, calc
+
+
+def _agregar_np(indicadores, ref, calc) -> List[MetricasIndicador]:
+    if len(ref) == 0:
+        return []
+    nomes, grupo = np.unique(indicadores.astype(str), return_inverse=True)
+    n_grupos = len(nomes)
+    com_calc = ~np.isnan(calc)
+    diff = np.where(com_calc, calc - ref, 0.0)
+    com_pct = com_calc & (ref != 0)
+    pct = np.zeros(len(ref))
+    np.divide(np.abs(diff), np.abs(ref), out=pct, where=com_pct)
+    pct *= 100.0
+
+    n_calc = np.bincount(grupo, weights=com_calc, minlength=n_grupos)
+    n_pct = np.bincount(grupo, weights=com_pct, minlength=n_grupos)
+    soma_abs = np.bincount(grupo, weights=np.abs(diff), minlength=n_grupos)
+    soma_quad = np.bincount(grupo, weights=diff * diff, minlength=n_grupos)
+    soma_diff = np.bincount(grupo, weights=diff, minlength=n_grupos)
+    soma_pct = np.bincount(grupo, weights=pct, minlength=n_grupos)
+
+    # percentis de todos os grupos de uma vez: ordena por (grupo, erro) e interpola por posição
+    g_pct, v_pct = grupo[com_pct], pct[com_pct]
+    ordem = np.lexsort((v_pct, g_pct))
+    g_pct, v_pct = g_pct[ordem], v_pct[ordem]
+    inicio = np.searchsorted(g_pct, np.arange(n_grupos))
+    n = n_pct.astype(int)
+    percentis: Dict[int, Any] = {}
+    for q in PERCENTIS:
+        pos = inicio + (np.maximum(n, 1) - 1) * (q / 100.0)
+        lo = np.floor(pos).astype(int)
+        hi = np.minimum(lo + 1, inicio + np.maximum(n, 1) - 1)
+        lo, hi = np.minimum(lo, len(v_pct) - 1), np.minimum(hi, len(v_pct) - 1)
+        if len(v_pct):
+            percentis[q] = v_pct[lo] + (v_pct[hi] - v_pct[lo]) * (pos - np.floor(pos))
+        else:
+            percentis[q] = np.zeros(n_grupos)
+
+    out: List[MetricasIndicador] = []
+    for g, nome in enumerate(nomes):
+        m = MetricasIndicador(indicador=str(nome), pares=int(n[g]))
+        if n_calc[g] > 0:
+            m.mae = float(soma_abs[g] / n_calc[g])
+            m.rmse = float(math.sqrt(soma_quad[g] / n_calc[g]))
+            m.vies = float(soma_diff[g] / n_calc[g])
+        if n[g] > 0:
+            m.mape = float(soma_pct[g] / n[g])
+            m.p50, m.p90, m.p95 = (float(percentis[q][g]) for q in PERCENTIS)
+        out.append(m)
+    return out
+
+
+# --- Python puro -------------------------------------------------------------
+
+def _alinhar_py(ref_rows: Sequence[Linha], calc_rows: Sequence[Linha]):
+    ref_map = {(i, c, p): v for i, c, p, v in ref_rows}
+    calc_map = {(i, c, p): v for i, c, p, v in calc_rows}
+    chaves = sorted(ref_map)
+    return (
+        [k[0] for k in chaves],
+        [float(ref_map[k]) for k in chaves],
+        [float(calc_map[k]) if k in calc_map else None for k in chaves],
+    )
+
+
+def _agregar_py(indicadores, ref, calc) -> List[MetricasIndicador]:
+    grupos: Dict[str, List[Tuple[float, Optional[float]]]] = {}
+    for ind, r, c in zip(indicadores, ref, calc):
+        if c is not None and isinstance(c, float) and math.isnan(c):
+            c = None
+        grupos.setdefault(ind, []).append((r, c))
+    out: List[MetricasIndicador] = []
+    for ind in sorted(grupos):
+        diffs = [c - r for r, c in grupos[ind] if c is not None]
+        pcts = sorted(abs((c - r) / r) * 100.0 for r, c in grupos[ind] if c is not None and r != 0)
+        m = MetricasIndicador(indicador=ind, pares=len(pcts))
+        if diffs:
+            m.mae = sum(abs(d) for d in diffs) / len(diffs)
+            m.rmse = math.sqrt(sum(d * d for d in diffs) / len(diffs))
+            m.vies = sum(diffs) / len(diffs)
+        if pcts:
+            m.mape = sum(pcts) / len(pcts)
+            m.p50, m.p90, m.p95 = (_percentil(pcts, q) for q in PERCENTIS)
+        out.append(m)
+    return out
+
+
+# --- API ---------------------------------------------------------------------
+
+def agregar(indicadores: Sequence[str], ref: Sequence[float], calc: Sequence[Optional[float]]) -> List[MetricasIndicador]:
+    """Métricas por indicador a partir de pares já alinhados (calc None/NaN = sem cálculo)."""
+    if np is not None:
+        return _agregar_np(
+            np.asarray(indicadores, dtype=object),
+            np.asarray(ref, dtype=float),
+            np.array([np.nan if c is None else c for c in calc], dtype=float),
+        )
+    return _agregar_py(indicadores, ref, calc)
+
+
+def calcular(ref_rows: Sequence[Linha], calc_rows: Sequence[Linha]) -> List[MetricasIndicador]:
+    """Alinha ref/calc pela chave (indicador, chave, periodo) e agrega as métricas por indicador.
+
+    Indicadores com referência e sem nenhum par calculado aparecem com `pares=0`.
+    Com NumPy, o alinhamento é uma junção por chaves ordenadas (`searchsorted`) e
+    as agregações são operações em lote sobre os arrays.
+    """
+    if np is not None:
+        return _agregar_np(*_alinhar_np(ref_rows, calc_rows))
+    return _agregar_py(*_alinhar_py(ref_rows, calc_rows))
@@ -1,13 +1,72 @@
 from __future__ import annotations
 
+import heapq
+import logging
 from collections import defaultdict
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from sqlalchemy import Float, and_, case, cast, delete, func, insert, literal, or_, tuple_
+from sqlalchemy.exc import NotSupportedError, OperationalError, ProgrammingError, SQLAlchemyError
 from sqlmodel import Session, select
 
-from app.models.dev_lite import DevRefIndicador, DevCalcIndicador
-from app.models.stage import RefIndicador, CalcIndicador
+from app.models.dev_lite import DevRefIndicador, DevCalcIndicador, DevConsistenciaErro, DevConsistenciaResumo
+from app.models.stage import RefIndicador, CalcIndicador, ConsistenciaErro, ConsistenciaResumo
+from app.services import consistencia_metricas
+from app.services.consistencia_metricas import MetricasIndicador
+from app.services.cursor import codificar_cursor, decodificar_cursor
+
+
+# dialetos em que a agregação é feita inteiramente no banco
+_DIALETOS_SQL = {"sqlite", "postgresql"}
+
+# erros de dialeto/recurso (ex.: SQLite sem funções de janela) que levam ao caminho Python
+_ERROS_DIALETO = (OperationalError, ProgrammingError, NotSupportedError)
+
+# chaves por comando ao atualizar o snapshot (limite de parâmetros do SQLite)
+_FATIA_SNAPSHOT = 300
+
+Chave = Tuple[str, str, str]
+Detalhe = Dict[str, float | str]
+
+
+def _float_ou_none(v) -> Optional[float]:
+    return None if v is None else float(v)
+
+
+@dataclass(frozen=True)
+class CursorDetalhe:
+    """Posição da última linha entregue no drill-down (ordem: erro_pct desc, chave, periodo)."""
+
+    erro_pct: Optional[float]
+    chave: str
+    periodo: str
+
+    def codificar(self) -> str:
+        return codificar_cursor((self.erro_pct, self.chave, self.periodo))
+
+    @classmethod
+    def decodificar(cls, cursor: str) -> "CursorDetalhe":
+        return cls(*decodificar_cursor(cursor, (_float_ou_none, str, str)))
+
+    @classmethod
+    def de_linha(cls, row: Detalhe) -> "CursorDetalhe":
+        return cls(row.get("erro_pct"), row["chave"], row["periodo"])
+
+    def ordem(self) -> Tuple[bool, float, str, str]:
+        return _ordem_detalhe(self.erro_pct, self.chave, self.periodo)
+
+
+def _ordem_detalhe(erro_pct: Optional[float], chave: str, periodo: str) -> Tuple[bool, float, str, str]:
+    """Chave de ordenação do drill-down: maiores erros primeiro, pares sem erro no fim."""
+    return (erro_pct is None, -(erro_pct or 0.0), chave, periodo)
+
+
+@dataclass
+class PaginaDetalhes:
+    itens: List[Detalhe]
+    proximo_cursor: Optional[str] = None
 
 
 @dataclass
@@ -16,6 +75,17 @@ class IndicadorMAPE:
     periodo: Optional[str]
     mape: Optional[float]
     pares: int
+    # métricas estendidas (preenchidas com `metricas=True`)
+    mae: Optional[float] = None
+    rmse: Optional[float] = None
+    vies: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+
+    @classmethod
+    def de_metricas(cls, m: MetricasIndicador, periodo: Optional[str]) -> "IndicadorMAPE":
+        return cls(indicador=m.indicador, periodo=periodo, mape=m.mape, pares=m.pares, **m.extras())
 
 
 class ConsistenciaService:
@@ -25,6 +95,12 @@ class ConsistenciaService:
             return DevRefIndicador, DevCalcIndicador
         return RefIndicador, CalcIndicador
 
+    def _snapshot_models(self, session: Session):
+        dialect = session.get_bind().dialect.name if session.get_bind() else ''
+        if dialect == 'sqlite':
+            return DevConsistenciaErro, DevConsistenciaResumo
+        return ConsistenciaErro, ConsistenciaResumo
+
     def calcular_mape(self, session: Session, indicador: str, periodo: Optional[str] = None) -> IndicadorMAPE:
         Ref, Calc = self._models(session)
         stmt_ref = select(Ref).where(Ref.indicador == indicador)
@@ -46,50 +122,388 @@ class ConsistenciaService:
         mape = sum(errors) / len(errors) if errors else None
         return IndicadorMAPE(indicador=indicador, periodo=periodo, mape=mape, pares=len(errors))
 
-    def listar_indicadores(self, session: Session, periodo: Optional[str] = None) -> List[IndicadorMAPE]:
+    def _erro_pct_expr(self, Ref, Calc):
+        """Erro percentual por par; NULL quando não há cálculo ou a referência é zero."""
+        ref_val = cast(Ref.valor, Float)
+        calc_val = cast(Calc.valor, Float)
+        return case(
+            (and_(Calc.valor.is_not(None), Ref.valor != 0), func.abs((calc_val - ref_val) / ref_val) * 100.0),
+            else_=None,
+        )
+
+    def _erro_abs_expr(self, Ref, Calc):
+        return case(
+            (and_(Calc.valor.is_not(None), Ref.valor != 0), func.abs(cast(Calc.valor, Float) - cast(Ref.valor, Float))),
+            else_=None,
+        )
+
+    def _listar_sql(self, session: Session, periodo: Optional[str]) -> List[IndicadorMAPE]:
+        """MAPE e pares de todos os indicadores numa única consulta agregada (ref LEFT JOIN calc)."""
+        Ref, Calc = self._models(session)
+        erro = self._erro_pct_expr(Ref, Calc)
+        stmt = (
+            select(Ref.indicador, func.avg(erro), func.count(erro))
+            .select_from(Ref)
+            .outerjoin(
+                Calc,
+                and_(Calc.indicador == Ref.indicador, Calc.chave == Ref.chave, Calc.periodo == Ref.periodo),
+            )
+            .group_by(Ref.indicador)
+            .order_by(Ref.indicador)
+        )
+        if periodo:
+            stmt = stmt.where(Ref.periodo == periodo)
+        return [
+            IndicadorMAPE(
+                indicador=ind,
+                periodo=periodo,
+                mape=float(mape) if mape is not None else None,
+                pares=int(pares or 0),
+            )
+            for ind, mape, pares in session.exec(stmt).all()
+        ]
+
+    def _metricas_sql(self, session: Session, periodo: Optional[str]) -> List[IndicadorMAPE]:
+        """Métricas estendidas: o banco filtra o período e alinha ref/calc (LEFT JOIN pela chave
+        única); só as colunas (indicador, ref, calc) chegam ao motor vetorizado."""
         Ref, Calc = self._models(session)
+        stmt = select(Ref.indicador, Ref.valor, Calc.valor).select_from(Ref).outerjoin(
+            Calc,
+            and_(Calc.indicador == Ref.indicador, Calc.chave == Ref.chave, Calc.periodo == Ref.periodo),
+        )
+        if periodo:
+            stmt = stmt.where(Ref.periodo == periodo)
+        return self._agregar_pares(session, stmt, periodo)
+
+    def _agregar_pares(self, session: Session, stmt, periodo: Optional[str]) -> List[IndicadorMAPE]:
+        rows = session.exec(stmt).all()
+        indicadores, ref, calc = (list(col) for col in zip(*rows)) if rows else ([], [], [])
+        return [IndicadorMAPE.de_metricas(m, periodo) for m in consistencia_metricas.agregar(indicadores, ref, calc)]
+
+    def _listar_python(self, session: Session, periodo: Optional[str]) -> List[IndicadorMAPE]:
+        """Carrega ref/calc do período uma única vez e agrega no motor vetorizado."""
+        Ref, Calc = self._models(session)
+        stmt_ref = select(Ref.indicador, Ref.chave, Ref.periodo, Ref.valor)
+        stmt_calc = select(Calc.indicador, Calc.chave, Calc.periodo, Calc.valor)
+        if periodo:
+            stmt_ref = stmt_ref.where(Ref.periodo == periodo)
+            stmt_calc = stmt_calc.where(Calc.periodo == periodo)
+        metricas = consistencia_metricas.calcular(
+            [tuple(r) for r in session.exec(stmt_ref).all()],
+            [tuple(c) for c in session.exec(stmt_calc).all()],
+        )
+        return [IndicadorMAPE.de_metricas(m, periodo) for m in metricas]
+
+    def listar_indicadores(self, session: Session, periodo: Optional[str] = None, *, metricas: bool = False) -> List[IndicadorMAPE]:
+        """MAPE e pares por indicador; com `metricas=True` inclui MAE, RMSE, viés e percentis do erro."""
+        dialect = session.get_bind().dialect.name if session.get_bind() else ''
+        if dialect in _DIALETOS_SQL:
+            try:
+                return self._metricas_sql(session, periodo) if metricas else self._listar_sql(session, periodo)
+            except _ERROS_DIALETO as exc:
+                logging.warning("[consistencia] agregação SQL indisponível (%s); usando o caminho Python: %s", dialect, exc)
+                session.rollback()
         try:
-            stmt_ref = select(Ref.indicador).distinct()
-            if periodo:
-                stmt_ref = stmt_ref.where(Ref.periodo == periodo)
-            indicadores = [row[0] if isinstance(row, tuple) else row for row in session.exec(stmt_ref).all()]
-        except Exception:
+            return self._listar_python(session, periodo)
+        except SQLAlchemyError as exc:
+            logging.error("[consistencia] falha ao listar indicadores: %s", exc)
             return []
-        out: List[IndicadorMAPE] = []
-        for ind in indicadores:
-            out.append(self.calcular_mape(session, ind, periodo))
-        return out
 
-    def drill_down(self, session: Session, indicador: str, periodo: Optional[str] = None) -> List[Dict[str, float | str]]:
+    def _filtro_pagina(self, erro_pct, chave, periodo, cursor: Optional[CursorDetalhe], min_erro_pct: Optional[float]):
+        """Condições SQL de keyset (após `cursor`) e de limiar, na ordem de `_ordem_detalhe`."""
+        conds = []
+        if min_erro_pct is not None:
+            conds.append(erro_pct >= min_erro_pct)
+        if cursor is not None:
+            depois_chave = or_(chave > cursor.chave, and_(chave == cursor.chave, periodo > cursor.periodo))
+            if cursor.erro_pct is None:
+                conds.append(and_(erro_pct.is_(None), depois_chave))
+            else:
+                conds.append(or_(
+                    erro_pct < cursor.erro_pct,
+                    and_(erro_pct == cursor.erro_pct, depois_chave),
+                    erro_pct.is_(None),
+                ))
+        return conds
+
+    @staticmethod
+    def _paginar(rows: List[Detalhe], limit: Optional[int]) -> PaginaDetalhes:
+        if limit is None or len(rows) <= limit:
+            return PaginaDetalhes(itens=rows)
+        itens = rows[:limit]
+        return PaginaDetalhes(itens=itens, proximo_cursor=CursorDetalhe.de_linha(itens[-1]).codificar())
+
+    @staticmethod
+    def _detalhe(indicador, chave, periodo, ref, calc, erro_abs, erro_pct) -> Detalhe:
+        row: Detalhe = {
+            "indicador": indicador,
+            "chave": chave,
+            "periodo": periodo,
+            "ref": float(ref),
+            "calc": float(calc) if calc is not None else None,
+        }
+        if erro_pct is not None:
+            row["erro_abs"] = float(erro_abs)
+            row["erro_pct"] = float(erro_pct)
+        return row
+
+    def _drill_down_sql(
+        self,
+        session: Session,
+        indicador: str,
+        periodo: Optional[str],
+        limit: Optional[int],
+        cursor: Optional[CursorDetalhe],
+        min_erro_pct: Optional[float],
+    ) -> PaginaDetalhes:
+        """Top-k por erro_pct calculado no banco (ORDER BY ... LIMIT), com paginação por keyset."""
+        Ref, Calc = self._models(session)
+        erro_pct = self._erro_pct_expr(Ref, Calc)
+        stmt = (
+            select(
+                Ref.indicador,
+                Ref.chave,
+                Ref.periodo,
+                Ref.valor,
+                Calc.valor,
+                self._erro_abs_expr(Ref, Calc),
+                erro_pct,
+            )
+            .select_from(Ref)
+            .outerjoin(
+                Calc,
+                and_(Calc.indicador == Ref.indicador, Calc.chave == Ref.chave, Calc.periodo == Ref.periodo),
+            )
+            .where(Ref.indicador == indicador, *self._filtro_pagina(erro_pct, Ref.chave, Ref.periodo, cursor, min_erro_pct))
+            .order_by(erro_pct.is_(None), erro_pct.desc(), Ref.chave, Ref.periodo)
+        )
+        if periodo:
+            stmt = stmt.where(Ref.periodo == periodo)
+        if limit is not None:
+            stmt = stmt.limit(limit + 1)
+        rows = [self._detalhe(*r) for r in session.exec(stmt).all()]
+        return self._paginar(rows, limit)
+
+    def _drill_down_python(
+        self,
+        session: Session,
+        indicador: str,
+        periodo: Optional[str],
+        limit: Optional[int],
+        cursor: Optional[CursorDetalhe],
+        min_erro_pct: Optional[float],
+    ) -> PaginaDetalhes:
+        """Fallback em Python: calcula os erros e seleciona o top-k com heap (O(n log k))."""
+        Ref, Calc = self._models(session)
+        stmt_ref = select(Ref).where(Ref.indicador == indicador)
+        stmt_calc = select(Calc).where(Calc.indicador == indicador)
+        if periodo:
+            stmt_ref = stmt_ref.where(Ref.periodo == periodo)
+            stmt_calc = stmt_calc.where(Calc.periodo == periodo)
+        ref_rows = session.exec(stmt_ref).all()
+        calc_map: Dict[Tuple[str, str], float] = {(c.chave, c.periodo): float(c.valor) for c in session.exec(stmt_calc).all()}
+
+        def _linhas():
+            for r in ref_rows:
+                cval = calc_map.get((r.chave, r.periodo))
+                ref = float(r.valor)
+                erro_abs = erro_pct = None
+                if cval is not None and ref != 0:
+                    erro_abs = abs(cval - ref)
+                    erro_pct = abs((cval - ref) / ref) * 100.0
+                if min_erro_pct is not None and (erro_pct is None or erro_pct < min_erro_pct):
+                    continue
+                ordem = _ordem_detalhe(erro_pct, r.chave, r.periodo)
+                if cursor is not None and ordem <= cursor.ordem():
+                    continue
+                yield ordem, self._detalhe(r.indicador, r.chave, r.periodo, ref, cval, erro_abs, erro_pct)
+
+        if limit is None:
+            selecionadas = sorted(_linhas(), key=lambda t: t[0])
+        else:
+            selecionadas = heapq.nsmallest(limit + 1, _linhas(), key=lambda t: t[0])
+        return self._paginar([row for _, row in selecionadas], limit)
+
+    def drill_down_pagina(
+        self,
+        session: Session,
+        indicador: str,
+        periodo: Optional[str] = None,
+        *,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        min_erro_pct: Optional[float] = None,
+    ) -> PaginaDetalhes:
+        """Drill-down ordenado por maior erro_pct, com `limit`/`cursor` (keyset) e limiar `min_erro_pct`.
+
+        Levanta ValueError para cursor inválido.
+        """
+        pos = CursorDetalhe.decodificar(cursor) if cursor else None
+        dialect = session.get_bind().dialect.name if session.get_bind() else ''
+        if dialect in _DIALETOS_SQL:
+            try:
+                return self._drill_down_sql(session, indicador, periodo, limit, pos, min_erro_pct)
+            except _ERROS_DIALETO as exc:
+                logging.warning("[consistencia] drill-down SQL indisponível (%s); usando o caminho Python: %s", dialect, exc)
+                session.rollback()
+        try:
+            return self._drill_down_python(session, indicador, periodo, limit, pos, min_erro_pct)
+        except SQLAlchemyError as exc:
+            logging.error("[consistencia] falha no drill-down de %s: %s", indicador, exc)
+            return PaginaDetalhes(itens=[])
+
+    def drill_down(self, session: Session, indicador: str, periodo: Optional[str] = None) -> List[Detalhe]:
+        return self.drill_down_pagina(session, indicador, periodo).itens
+
+    # --- snapshot materializado ---------------------------------------------
+
+    def _inserir_erros(self, session: Session, filtro) -> None:
+        """INSERT ... SELECT dos pares ref LEFT JOIN calc que satisfazem `filtro` na tabela de erros."""
         Ref, Calc = self._models(session)
+        Erro, _ = self._snapshot_models(session)
+        origem = (
+            select(
+                Ref.indicador,
+                Ref.chave,
+                Ref.periodo,
+                cast(Ref.valor, Float),
+                cast(Calc.valor, Float),
+                self._erro_abs_expr(Ref, Calc),
+                self._erro_pct_expr(Ref, Calc),
+            )
+            .select_from(Ref)
+            .outerjoin(
+                Calc,
+                and_(Calc.indicador == Ref.indicador, Calc.chave == Ref.chave, Calc.periodo == Ref.periodo),
+            )
+        )
+        if filtro is not None:
+            origem = origem.where(filtro(Ref))
+        t = Erro.__table__
+        session.exec(insert(t).from_select(
+            [t.c.indicador, t.c.chave, t.c.periodo, t.c.ref, t.c.calc, t.c.erro_abs, t.c.erro_pct],
+            origem,
+        ))
+
+    def _recalcular_resumos(self, session: Session, filtro) -> None:
+        """Reagrega o resumo por (indicador, periodo) a partir da tabela de erros."""
+        Erro, Resumo = self._snapshot_models(session)
+        soma = func.coalesce(func.sum(Erro.erro_pct), 0.0)
+        pares = func.count(Erro.erro_pct)
+        origem = (
+            select(Erro.indicador, Erro.periodo, soma, pares, func.avg(Erro.erro_pct), literal(datetime.utcnow()))
+            .group_by(Erro.indicador, Erro.periodo)
+        )
+        if filtro is not None:
+            origem = origem.where(filtro(Erro))
+        t = Resumo.__table__
+        session.exec(insert(t).from_select(
+            [t.c.indicador, t.c.periodo, t.c.soma_erro_pct, t.c.pares, t.c.mape, t.c.atualizado_em],
+            origem,
+        ))
+
+    def atualizar_snapshot(self, session: Session, chaves: Iterable[Chave]) -> int:
+        """Atualiza o snapshot apenas para as chaves (indicador, chave, periodo) alteradas.
+
+        Os pares afetados são recalculados no banco e os resumos dos grupos
+        (indicador, periodo) correspondentes são reagregados. Não faz commit.
+        """
+        chaves = list(dict.fromkeys(tuple(c) for c in chaves))
+        if not chaves:
+            return 0
+        Erro, Resumo = self._snapshot_models(session)
+        grupos = list(dict.fromkeys((ind, per) for ind, _, per in chaves))
+        for i in range(0, len(chaves), _FATIA_SNAPSHOT):
+            fatia = chaves[i:i + _FATIA_SNAPSHOT]
+            session.exec(delete(Erro).where(tuple_(Erro.indicador, Erro.chave, Erro.periodo).in_(fatia)))
+            self._inserir_erros(session, lambda M: tuple_(M.indicador, M.chave, M.periodo).in_(fatia))
+        for i in range(0, len(grupos), _FATIA_SNAPSHOT):
+            fatia_g = grupos[i:i + _FATIA_SNAPSHOT]
+            session.exec(delete(Resumo).where(tuple_(Resumo.indicador, Resumo.periodo).in_(fatia_g)))
+            self._recalcular_resumos(session, lambda M: tuple_(M.indicador, M.periodo).in_(fatia_g))
+        return len(chaves)
+
+    def reconstruir_snapshot(self, session: Session, periodo: Optional[str] = None) -> None:
+        """Recalcula o snapshot inteiro (ou de um período) a partir de ref/calc."""
+        Erro, Resumo = self._snapshot_models(session)
+        stmt_erro, stmt_resumo = delete(Erro), delete(Resumo)
+        filtro = None
+        if periodo:
+            stmt_erro = stmt_erro.where(Erro.periodo == periodo)
+            stmt_resumo = stmt_resumo.where(Resumo.periodo == periodo)
+            filtro = lambda M: M.periodo == periodo  # noqa: E731
+        session.exec(stmt_erro)
+        session.exec(stmt_resumo)
+        self._inserir_erros(session, filtro)
+        self._recalcular_resumos(session, filtro)
+        session.commit()
+
+    def _metricas_materializado(self, session: Session, periodo: Optional[str]) -> List[IndicadorMAPE]:
+        Erro, Resumo = self._snapshot_models(session)
+        # os pares do snapshot já estão alinhados: só a agregação é necessária
+        stmt = select(Erro.indicador, Erro.ref, Erro.calc)
+        if periodo:
+            # (indicador, periodo) é prefixo do índice de drill-down: com os indicadores do
+            # período vindos do resumo, o banco lê só as linhas do período em vez do snapshot todo
+            indicadores = select(Resumo.indicador).where(Resumo.periodo == periodo)
+            stmt = stmt.where(Erro.indicador.in_(indicadores), Erro.periodo == periodo)
+        return self._agregar_pares(session, stmt, periodo)
+
+    def listar_materializado(self, session: Session, periodo: Optional[str] = None, *, metricas: bool = False) -> List[IndicadorMAPE]:
+        """MAPE por indicador lido do snapshot; sem período, reagrega os resumos mensais."""
+        _, Resumo = self._snapshot_models(session)
         try:
-            stmt_ref = select(Ref).where(Ref.indicador == indicador)
-            stmt_calc = select(Calc).where(Calc.indicador == indicador)
+            if metricas:
+                return self._metricas_materializado(session, periodo)
             if periodo:
-                stmt_ref = stmt_ref.where(Ref.periodo == periodo)
-                stmt_calc = stmt_calc.where(Calc.periodo == periodo)
-            ref_rows = session.exec(stmt_ref).all()
-            calc_rows = session.exec(stmt_calc).all()
-        except Exception:
-            return []
-        calc_map: Dict[Tuple[str, str], float] = {(c.chave, c.periodo): float(c.valor) for c in calc_rows}
-        out: List[Dict[str, float | str]] = []
-        for r in ref_rows:
-            key = (r.chave, r.periodo)
-            cval = calc_map.get(key)
-            row = {
-                "indicador": r.indicador,
-                "chave": r.chave,
-                "periodo": r.periodo,
-                "ref": float(r.valor),
-                "calc": float(cval) if cval is not None else None,
-            }
-            if cval is not None and r.valor != 0:
-                erro_abs = abs(float(cval) - float(r.valor))
-                erro_pct = abs((float(cval) - float(r.valor)) / float(r.valor)) * 100.0
-                row["erro_abs"] = erro_abs
-                row["erro_pct"] = erro_pct
-            out.append(row)
-        # ordenar por maior erro_pct primeiro (quando existir)
-        out.sort(key=lambda d: d.get("erro_pct", -1.0), reverse=True)
-        return out
+                stmt = select(Resumo.indicador, Resumo.mape, Resumo.pares).where(Resumo.periodo == periodo)
+            else:
+                pares = func.sum(Resumo.pares)
+                mape = case((pares > 0, func.sum(Resumo.soma_erro_pct) / pares), else_=None)
+                stmt = select(Resumo.indicador, mape, pares).group_by(Resumo.indicador)
+            rows = session.exec(stmt.order_by(Resumo.indicador)).all()
+        except _ERROS_DIALETO as exc:
+            logging.warning("[consistencia] snapshot indisponível; usando o cálculo ao vivo: %s", exc)
+            session.rollback()
+            return self.listar_indicadores(session, periodo, metricas=metricas)
+        return [
+            IndicadorMAPE(
+                indicador=ind,
+                periodo=periodo,
+                mape=float(m) if m is not None else None,
+                pares=int(p or 0),
+            )
+            for ind, m, p in rows
+        ]
+
+    def drill_down_materializado(
+        self,
+        session: Session,
+        indicador: str,
+        periodo: Optional[str] = None,
+        *,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        min_erro_pct: Optional[float] = None,
+    ) -> PaginaDetalhes:
+        """Drill-down lido do snapshot, com a mesma ordenação e paginação de `drill_down_pagina`."""
+        pos = CursorDetalhe.decodificar(cursor) if cursor else None
+        Erro, _ = self._snapshot_models(session)
+        stmt = (
+            select(Erro.indicador, Erro.chave, Erro.periodo, Erro.ref, Erro.calc, Erro.erro_abs, Erro.erro_pct)
+            .where(Erro.indicador == indicador, *self._filtro_pagina(Erro.erro_pct, Erro.chave, Erro.periodo, pos, min_erro_pct))
+            .order_by(Erro.erro_pct.is_(None), Erro.erro_pct.desc(), Erro.chave, Erro.periodo)
+        )
+        if periodo:
+            stmt = stmt.where(Erro.periodo == periodo)
+        if limit is not None:
+            stmt = stmt.limit(limit + 1)
+        try:
+            rows = [self._detalhe(*r) for r in session.exec(stmt).all()]
+        except _ERROS_DIALETO as exc:
+            logging.warning("[consistencia] snapshot indisponível; drill-down de %s ao vivo: %s", indicador, exc)
+            session.rollback()
+            return self.drill_down_pagina(
+                session, indicador, periodo, limit=limit, cursor=cursor, min_erro_pct=min_erro_pct
+            )
+        return self._paginar(rows, limit)
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Callable, Sequence, Tuple
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    """Cursor opaco de paginação keyset: JSON compacto em base64 url-safe, sem padding."""
+    data = json.dumps(list(valores), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str, tipos: Sequence[Callable[[Any], Any]]) -> Tuple[Any, ...]:
+    """Inverso de `codificar_cursor`, convertendo cada posição com o tipo correspondente.
+
+    Levanta ValueError("cursor inválido") para base64/JSON malformado, aridade
+    diferente de `len(tipos)` ou valor que não converte.
+    """
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(valores, list) or len(valores) != len(tipos):
+            raise ValueError(cursor)
+        return tuple(tipo(v) for tipo, v in zip(tipos, valores))
+    except Exception as exc:
+        raise ValueError("cursor inválido") from exc
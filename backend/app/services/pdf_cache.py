@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+
+class PDFCache:
+    """Cache em disco de PDFs renderizados, endereçado pelo conteúdo da requisição.
+
+    A chave é o SHA-256 de `(html ou url, format, margin_mm)`. Entradas expiram após
+    `ttl_s` (pela data de gravação) e, quando o total passa de `max_bytes`, as mais
+    antigas são removidas. Gravação atômica (arquivo temporário + rename), então
+    vários processos podem compartilhar o diretório.
+    """
+
+    SUFIXO = ".pdf"
+
+    def __init__(self, diretorio: Path, *, max_bytes: int, ttl_s: float):
+        self.diretorio = Path(diretorio)
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None  # bytes em disco; calculado na primeira gravação
+
+    @property
+    def ativo(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def chave(*, html: Optional[str], url: Optional[str], format_: str, margin_mm: int) -> str:
+        origem = {"html": html} if html else {"url": url or ""}
+        data = json.dumps({**origem, "format": format_, "margin_mm": margin_mm}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _path(self, chave: str) -> Path:
+        return self.diretorio / chave[:2] / f"{chave}{self.SUFIXO}"
+
+    def obter(self, chave: str) -> Optional[bytes]:
+        if not self.ativo:
+            return None
+        path = self._path(chave)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_s:
+                with self._lock:
+                    self._remover(path)
+                return None
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logging.warning(f"[pdf-cache] falha ao ler {path.name}: {e}")
+            return None
+
+    def gravar(self, chave: str, data: bytes) -> None:
+        if not self.ativo or len(data) > self.max_bytes:
+            return
+        path = self._path(chave)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                anterior = path.stat().st_size  # sobrescrita: o arquivo antigo sai do total
+            except FileNotFoundError:
+                anterior = 0
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logging.warning(f"[pdf-cache] falha ao gravar {path.name}: {e}")
+            return
+        with self._lock:
+            if self._total is None:
+                self._total = self._tamanho_em_disco()
+            else:
+                self._total += len(data) - anterior
+            if self._total > self.max_bytes:
+                self._podar()
+
+    def _tamanho_em_disco(self) -> int:
+        return sum(p.stat().st_size for p in self.diretorio.glob(f"*/*{self.SUFIXO}"))
+
+    def _remover(self, path: Path) -> None:
+        try:
+            tamanho = path.stat().st_size
+            path.unlink()
+            if self._total is not None:
+                self._total -= tamanho
+        except OSError:
+            pass
+
+    def _podar(self) -> None:
+        """Remove expirados e depois os mais antigos até ficar em 90% de `max_bytes`."""
+        agora = time.time()
+        arquivos = []
+        for p in self.diretorio.glob(f"*/*{self.SUFIXO}"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            arquivos.append((st.st_mtime, st.st_size, p))
+        arquivos.sort()
+        total = sum(a[1] for a in arquivos)
+        alvo = int(self.max_bytes * 0.9)
+        for mtime, tamanho, p in arquivos:
+            if total <= alvo and agora - mtime <= self.ttl_s:
+                continue
+            try:
+                p.unlink()
+                total -= tamanho
+            except OSError:
+                pass
+        self._total = total
+
+    def limpar(self) -> None:
+        with self._lock:
+            for p in self.diretorio.glob(f"*/*{self.SUFIXO}"):
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+            self._total = 0
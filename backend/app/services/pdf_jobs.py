@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlmodel import Session, or_, select
+
+from app.core.config import get_settings
+from app.core.db import engine
+from app.services.artefato_service import ArtefatoService
+from app.services.rdqa_export_service import RDQAExportService
+
+
+PENDENTE = "pendente"
+PROCESSANDO = "processando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+# tipos de artefato gravados pelos jobs (rotas /rdqa e /rag)
+TIPOS = ("rdqa_pdf", "rag_pdf")
+
+
+class FilaCheia(Exception):
+    """Fila de exportação cheia; a requisição deve ser repetida depois."""
+
+
+@dataclass
+class JobPDF:
+    exec_id: str
+    tipo: str
+    html: Optional[str]
+    url: Optional[str]
+    format_: str
+    margin_mm: int
+    status: str = PENDENTE
+    hash_sha256: Optional[str] = None
+    erro: Optional[str] = None
+    cache_hit: bool = False
+    criado_em: datetime = field(default_factory=datetime.utcnow)
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+
+    def resumo(self) -> Dict[str, Any]:
+        return {
+            "exec_id": self.exec_id,
+            "tipo": self.tipo,
+            "status": self.status,
+            "hash": self.hash_sha256,
+            "erro": self.erro,
+            "criado_em": self.criado_em.isoformat(),
+            "iniciado_em": self.iniciado_em.isoformat() if self.iniciado_em else None,
+            "concluido_em": self.concluido_em.isoformat() if self.concluido_em else None,
+        }
+
+
+class PDFJobs:
+    """Fila limitada de exportações PDF renderizadas em segundo plano.
+
+    `submeter` devolve o job já registrado (`ArtefatoExecucao` com status `pendente`);
+    `trabalhadores` tarefas do loop consomem a fila, renderizam via `RDQAExportService`
+    (pool de navegadores + cache) e gravam o PDF em `diretorio/<exec_id>.pdf`. O artefato
+    é atualizado a cada etapa, de modo que o status continua consultável após reinícios.
+    Arquivos com mais de `retencao_s` são removidos nas submissões seguintes.
+
+    A fila vive só na memória do processo: jobs ainda `pendente`/`processando` no banco
+    quando o processo sobe foram perdidos no reinício e `recuperar_interrompidos` os
+    encerra como `erro` (supõe uma única instância atendendo os jobs).
+    """
+
+    def __init__(
+        self,
+        diretorio: Path,
+        *,
+        trabalhadores: int = 2,
+        fila_max: int = 100,
+        retencao_s: float = 86400.0,
+        exporter: Optional[RDQAExportService] = None,
+    ):
+        self.diretorio = Path(diretorio)
+        self.trabalhadores = trabalhadores
+        self.fila_max = fila_max
+        self.retencao_s = retencao_s
+        self.exporter = exporter or RDQAExportService()
+        self._jobs: Dict[str, JobPDF] = {}
+        self._fila: Optional[asyncio.Queue] = None
+        self._tarefas: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def arquivo(self, exec_id: str) -> Path:
+        return self.diretorio / f"{exec_id}.pdf"
+
+    def _iniciar(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._fila = asyncio.Queue(maxsize=self.fila_max)
+        self._tarefas = [loop.create_task(self._trabalhar()) for _ in range(self.trabalhadores)]
+
+    def _registrar(self, job: JobPDF) -> None:
+        metadados = {"status": job.status, "format": job.format_, "margin_mm": job.margin_mm}
+        if job.status == CONCLUIDO:
+            metadados["cache"] = "hit" if job.cache_hit else "miss"
+        try:
+            with Session(engine) as session:
+                ArtefatoService().registrar_execucao(
+                    session,
+                    exec_id=job.exec_id,
+                    hash_sha256=job.hash_sha256 or "",
+                    tipo=job.tipo,
+                    metadados=json.dumps(metadados),
+                    ok=job.status != ERRO,
+                    mensagem=job.erro,
+                )
+        except Exception as e:
+            # o job segue mesmo sem registro (como na exportação síncrona)
+            logging.warning(f"[pdf-jobs] falha ao registrar {job.exec_id}: {e}")
+
+    def _limpar_antigos(self) -> List[str]:
+        limite = time.time() - self.retencao_s
+        removidos = []
+        for p in self.diretorio.glob("*.pdf"):
+            try:
+                if p.stat().st_mtime < limite:
+                    p.unlink()
+                    removidos.append(p.stem)
+            except OSError:
+                pass
+        return removidos
+
+    async def submeter(
+        self,
+        *,
+        tipo: str,
+        html: Optional[str] = None,
+        url: Optional[str] = None,
+        format_: str = "A4",
+        margin_mm: int = 12,
+    ) -> JobPDF:
+        # PDF_STARTUP=off: recusa (PoolIndisponivel) antes de registrar um job que nunca rodaria
+        self.exporter.pool()
+        self._iniciar()
+        if self._fila.full():
+            raise FilaCheia("fila de exportação cheia")
+        job = JobPDF(exec_id=str(uuid.uuid4()), tipo=tipo, html=html, url=url, format_=format_, margin_mm=margin_mm)
+        await asyncio.to_thread(self._registrar, job)
+        try:
+            # outra submissão pode ter ocupado a última vaga enquanto o artefato era registrado
+            self._fila.put_nowait(job)
+        except asyncio.QueueFull:
+            job.status = ERRO
+            job.erro = "fila de exportação cheia"
+            job.concluido_em = datetime.utcnow()
+            await asyncio.to_thread(self._registrar, job)
+            raise FilaCheia(job.erro)
+        self._jobs[job.exec_id] = job
+        for exec_id in await asyncio.to_thread(self._limpar_antigos):
+            self._jobs.pop(exec_id, None)
+        # jobs encerrados há mais de `retencao_s` saem da memória (o artefato continua no banco)
+        limite = datetime.utcnow().timestamp() - self.retencao_s
+        for exec_id in [j.exec_id for j in self._jobs.values() if j.concluido_em and j.concluido_em.timestamp() < limite]:
+            del self._jobs[exec_id]
+        return job
+
+    async def _trabalhar(self) -> None:
+        while True:
+            job = await self._fila.get()
+            try:
+                await self._processar(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # pragma: no cover - _processar já trata os erros do job
+                logging.error(f"[pdf-jobs] falha inesperada em {job.exec_id}: {e}")
+            finally:
+                self._fila.task_done()
+
+    async def _processar(self, job: JobPDF) -> None:
+        job.status = PROCESSANDO
+        job.iniciado_em = datetime.utcnow()
+        await asyncio.to_thread(self._registrar, job)
+        try:
+            pdf_bytes, job.cache_hit = await self.exporter.render_pdf(
+                html=job.html, url=job.url, format_=job.format_, margin_mm=job.margin_mm
+            )
+            await asyncio.to_thread(self._gravar, job.exec_id, pdf_bytes)
+            job.hash_sha256 = self.exporter.sha256_hex(pdf_bytes)
+            job.status = CONCLUIDO
+        except Exception as e:
+            job.status = ERRO
+            job.erro = f"erro ao gerar PDF: {e}"
+        job.concluido_em = datetime.utcnow()
+        # o conteúdo de entrada não é mais necessário
+        job.html = job.url = None
+        await asyncio.to_thread(self._registrar, job)
+
+    def recuperar_interrompidos(self) -> int:
+        """Marca como `erro` os jobs que ficaram pendentes/em processamento antes do reinício."""
+        try:
+            with Session(engine) as session:
+                Model = ArtefatoService().modelo(session)
+                stmt = select(Model).where(
+                    Model.tipo.in_(TIPOS),
+                    or_(*[Model.metadados.contains(f'"status": "{s}"') for s in (PENDENTE, PROCESSANDO)]),
+                )
+                interrompidos = 0
+                for artefato in session.exec(stmt).all():
+                    metadados = json.loads(artefato.metadados)
+                    if metadados.get("status") not in (PENDENTE, PROCESSANDO):
+                        continue
+                    metadados["status"] = ERRO
+                    artefato.metadados = json.dumps(metadados)
+                    artefato.ok = False
+                    artefato.mensagem = "job interrompido pelo reinício do servidor; submeta novamente"
+                    session.add(artefato)
+                    interrompidos += 1
+                session.commit()
+        except Exception as e:
+            logging.warning("[pdf-jobs] falha ao recuperar jobs interrompidos: %s", e)
+            return 0
+        if interrompidos:
+            logging.warning("[pdf-jobs] %d job(s) interrompido(s) pelo reinício marcados como erro", interrompidos)
+        return interrompidos
+
+    def _gravar(self, exec_id: str, data: bytes) -> None:
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        tmp = self.diretorio / f"{exec_id}.tmp"
+        tmp.write_bytes(data)
+        tmp.replace(self.arquivo(exec_id))
+
+    def status(self, session: Session, exec_id: str, *, tipo: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Status do job: da memória deste processo ou, senão, do `ArtefatoExecucao`."""
+        job = self._jobs.get(exec_id)
+        if job is not None:
+            return job.resumo() if tipo in (None, job.tipo) else None
+        Model = ArtefatoService().modelo(session)
+        artefato = session.get(Model, exec_id)
+        if artefato is None or (tipo is not None and artefato.tipo != tipo):
+            return None
+        try:
+            metadados = json.loads(artefato.metadados or "{}")
+        except ValueError:
+            metadados = {}
+        if "status" not in metadados:
+            return None  # execução síncrona, não é um job
+        status = metadados["status"]
+        if status == CONCLUIDO and not self.arquivo(exec_id).exists():
+            status = "expirado"
+        return {
+            "exec_id": exec_id,
+            "tipo": artefato.tipo,
+            "status": status,
+            "hash": artefato.hash_sha256 or None,
+            "erro": artefato.mensagem,
+            "criado_em": artefato.created_at.isoformat() if artefato.created_at else None,
+            "iniciado_em": None,
+            "concluido_em": None,
+        }
+
+    def estatisticas(self) -> Dict[str, Any]:
+        por_status: Dict[str, int] = {}
+        for job in self._jobs.values():
+            por_status[job.status] = por_status.get(job.status, 0) + 1
+        return {"fila": self._fila.qsize() if self._fila else 0, "fila_max": self.fila_max, "jobs": por_status}
+
+    async def fechar(self) -> None:
+        for t in self._tarefas:
+            t.cancel()
+        for t in self._tarefas:
+            try:
+                await t
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tarefas = []
+        self._loop = None
+
+
+_jobs: Optional[PDFJobs] = None
+
+
+def get_jobs() -> PDFJobs:
+    """Fila de jobs do processo, configurada pelas variáveis PDF_JOBS_*."""
+    global _jobs
+    if _jobs is None:
+        settings = get_settings()
+        _jobs = PDFJobs(
+            Path(settings.pdf_jobs_dir),
+            trabalhadores=settings.pdf_jobs_trabalhadores,
+            fila_max=settings.pdf_jobs_fila_max,
+            retencao_s=settings.pdf_jobs_retencao_s,
+        )
+    return _jobs
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
-from collections import defaultdict
-from typing import Dict, List, Optional, Tuple
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+from sqlalchemy import and_, case, delete, func, insert, literal, or_, text, tuple_, union
 from sqlmodel import Session, select
 
 from app.models.dev_lite import (
@@ -10,11 +13,78 @@ from app.models.dev_lite import (
     DevFatoRAGFinanceiro,
     DevFatoRAGProducao,
     DevFatoRAGMeta,
+    DevRAGResumo,
 )
 from app.models import dw as dw_models
+from app.repositories import dimensao_cache as dim_cache
+from app.services.cursor import codificar_cursor, decodificar_cursor
+
+
+_CAMPOS_RESUMO = (
+    "territorio_id",
+    "periodo",
+    "dotacao_atualizada",
+    "receita_realizada",
+    "empenhado",
+    "liquidado",
+    "pago",
+    "execucao_percentual",
+    "producao_total",
+    "metas_cumpridas",
+    "metas_total",
+)
+# partições por comando ao atualizar o resumo (limite de parâmetros do SQLite)
+_PARTICOES_POR_COMANDO = 400
+
+DEFAULT_LIMIT_DETALHES = 500
+# acima disso (pela estimativa do planejador), o total dos detalhes é estimado em vez de contado
+LIMITE_CONTAGEM_EXATA = 50_000
+
+# colunas de cada seção de detalhes, na ordem de saída (`territorio_nome` vem da dimensão, `cumprida` é derivado)
+CAMPOS_DETALHE: Dict[str, Tuple[str, ...]] = {
+    "financeiro": (
+        "territorio_id", "territorio_nome", "periodo",
+        "dotacao_atualizada", "receita_realizada", "empenhado", "liquidado", "pago",
+    ),
+    "producao": ("territorio_id", "territorio_nome", "periodo", "tipo", "quantidade"),
+    "meta": ("territorio_id", "territorio_nome", "periodo", "indicador", "meta_planejada", "meta_executada", "cumprida"),
+}
+
+
+def parse_campos(secao: str, valor: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Converte "periodo,pago" na projeção de campos da seção (ordem canônica); None = todos."""
+    if not valor:
+        return None
+    nomes = [n.strip() for n in valor.split(",") if n.strip()]
+    validos = CAMPOS_DETALHE[secao]
+    invalidos = [n for n in nomes if n not in validos]
+    if invalidos:
+        raise ValueError(f"campo inválido: {', '.join(invalidos)} (use {', '.join(validos)})")
+    return tuple(c for c in validos if c in nomes) or None
+
+
+def _cumprida(planejada, executada) -> Optional[bool]:
+    try:
+        if planejada is not None and executada is not None and planejada != 0:
+            return executada >= planejada
+    except Exception:
+        pass
+    return None
+
+
+@dataclass
+class PaginaRAG:
+    itens: List[Dict[str, object]]
+    proximo_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_estimado: bool = False
 
 
 class RAGService:
+    def modelos(self, session: Session) -> Dict[str, object]:
+        """Modelos de território, fatos e resumo do RAG para o dialeto da sessão (Dev ou dw)."""
+        return self._models(session)
+
     def _models(self, session: Session) -> Dict[str, object]:
         dialect = session.get_bind().dialect.name if session.get_bind() else ""
         if dialect == "sqlite":
@@ -23,181 +93,284 @@ class RAGService:
                 "financeiro": DevFatoRAGFinanceiro,
                 "producao": DevFatoRAGProducao,
                 "meta": DevFatoRAGMeta,
+                "resumo": DevRAGResumo,
             }
         return {
             "territorio": dw_models.DimTerritorio,
             "financeiro": dw_models.FatoRAGFinanceiro,
             "producao": dw_models.FatoRAGProducao,
             "meta": dw_models.FatoRAGMeta,
+            "resumo": dw_models.RAGResumo,
         }
 
-    def _territorios(self, session: Session, territorio_model, territorio_id: Optional[int]) -> Dict[int, str]:
-        stmt = select(territorio_model)
-        if territorio_id is not None:
-            stmt = stmt.where(territorio_model.id == territorio_id)
-        rows = session.exec(stmt).all()
-        return {r.id: getattr(r, "nome", None) for r in rows}
+    def _nomes_territorios(self, session: Session, ids: Iterable[int]) -> Dict[int, Optional[str]]:
+        return dim_cache.territorios.atributo(session, self._models(session)["territorio"], ids, "nome")
 
-    def financeiro(self, session: Session, *, periodo: Optional[str] = None, territorio_id: Optional[int] = None):
-        models = self._models(session)
-        Model = models["financeiro"]
-        stmt = select(Model)
+    def _filtros(self, Model, periodo: Optional[str], territorio_id: Optional[int]) -> list:
+        filtros = []
         if periodo:
-            stmt = stmt.where(Model.periodo == periodo)
+            filtros.append(Model.periodo == periodo)
         if territorio_id is not None:
-            stmt = stmt.where(Model.territorio_id == territorio_id)
-        rows = session.exec(stmt).all()
-        territorios = self._territorios(session, models["territorio"], territorio_id)
-        out: List[Dict[str, object]] = []
-        for row in rows:
-            out.append({
-                "territorio_id": row.territorio_id,
-                "territorio_nome": territorios.get(row.territorio_id),
-                "periodo": row.periodo,
-                "dotacao_atualizada": getattr(row, "dotacao_atualizada", None),
-                "receita_realizada": getattr(row, "receita_realizada", None),
-                "empenhado": getattr(row, "empenhado", None),
-                "liquidado": getattr(row, "liquidado", None),
-                "pago": getattr(row, "pago", None),
-            })
-        return out
+            filtros.append(Model.territorio_id == territorio_id)
+        return filtros
 
-    def producao(self, session: Session, *, periodo: Optional[str] = None, territorio_id: Optional[int] = None):
+    def _contar(self, session: Session, Model, filtros) -> Tuple[int, bool]:
+        """Total de linhas do filtro e se ele é estimado.
+
+        Em Postgres, consulta antes a estimativa do planejador (EXPLAIN); acima de
+        `LIMITE_CONTAGEM_EXATA` ela é devolvida no lugar do COUNT(*).
+        """
+        bind = session.get_bind()
+        if bind is not None and bind.dialect.name == "postgresql":
+            try:
+                stmt = select(literal(1)).select_from(Model).where(*filtros)
+                sql = str(stmt.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True}))
+                plano = session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+                if isinstance(plano, str):
+                    plano = json.loads(plano)
+                estimativa = int(plano[0]["Plan"]["Plan Rows"])
+                if estimativa >= LIMITE_CONTAGEM_EXATA:
+                    return estimativa, True
+            except Exception:
+                session.rollback()
+        total = session.exec(select(func.count()).select_from(Model).where(*filtros)).one()
+        return int(total), False
+
+    def detalhes(
+        self,
+        session: Session,
+        secao: str,
+        *,
+        periodo: Optional[str] = None,
+        territorio_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        campos: Optional[Sequence[str]] = None,
+        contar: bool = False,
+    ) -> PaginaRAG:
+        """Linhas de uma seção (`financeiro`, `producao`, `meta`) em ordem (periodo, territorio_id, id).
+
+        Paginação por keyset: até `limit` linhas após `cursor` (o `proximo_cursor` da
+        página anterior). `campos` restringe as colunas lidas e devolvidas; o nome do
+        território vem do cache de dimensões, só quando pedido. `contar=True` preenche `total`.
+        Levanta ValueError para cursor inválido.
+        """
+        pos = decodificar_cursor(cursor, (str, int, int)) if cursor else None
         models = self._models(session)
-        Model = models["producao"]
-        stmt = select(Model)
-        if periodo:
-            stmt = stmt.where(Model.periodo == periodo)
-        if territorio_id is not None:
-            stmt = stmt.where(Model.territorio_id == territorio_id)
-        rows = session.exec(stmt).all()
-        territorios = self._territorios(session, models["territorio"], territorio_id)
-        out: List[Dict[str, object]] = []
+        Model = models[secao]
+        campos = tuple(campos or CAMPOS_DETALHE[secao])
+        lidos = [c for c in campos if c in Model.__table__.c]
+        if "cumprida" in campos:
+            lidos += [c for c in ("meta_planejada", "meta_executada") if c not in lidos]
+        colunas = [Model.periodo.label("_periodo"), Model.territorio_id.label("_territorio_id"), Model.id.label("_id")]
+        colunas += [getattr(Model, c).label(c) for c in lidos]
+        stmt = select(*colunas).select_from(Model)
+        filtros = self._filtros(Model, periodo, territorio_id)
+        stmt = stmt.where(*filtros).order_by(Model.periodo, Model.territorio_id, Model.id)
+        if pos is not None:
+            per, tid, ultimo = pos
+            stmt = stmt.where(or_(
+                Model.periodo > per,
+                and_(Model.periodo == per, Model.territorio_id > tid),
+                and_(Model.periodo == per, Model.territorio_id == tid, Model.id > ultimo),
+            ))
+        if limit is not None:
+            stmt = stmt.limit(limit + 1)
+        rows = [r._mapping for r in session.exec(stmt).all()]
+
+        proximo_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            ultima = rows[-1]
+            proximo_cursor = codificar_cursor((ultima["_periodo"], ultima["_territorio_id"], ultima["_id"]))
+        nomes = self._nomes_territorios(session, [r["_territorio_id"] for r in rows]) if "territorio_nome" in campos else {}
+        itens: List[Dict[str, object]] = []
         for row in rows:
-            out.append({
-                "territorio_id": row.territorio_id,
-                "territorio_nome": territorios.get(row.territorio_id),
-                "periodo": row.periodo,
-                "tipo": getattr(row, "tipo", ""),
-                "quantidade": getattr(row, "quantidade", None),
-            })
-        return out
+            data: Dict[str, object] = {}
+            for campo in campos:
+                if campo == "cumprida":
+                    data[campo] = _cumprida(row["meta_planejada"], row["meta_executada"])
+                elif campo == "territorio_nome":
+                    data[campo] = nomes.get(row["_territorio_id"])
+                else:
+                    data[campo] = row[campo]
+            itens.append(data)
+        pagina = PaginaRAG(itens=itens, proximo_cursor=proximo_cursor)
+        if contar:
+            pagina.total, pagina.total_estimado = self._contar(session, Model, filtros)
+        return pagina
+
+    def financeiro(self, session: Session, *, periodo: Optional[str] = None, territorio_id: Optional[int] = None):
+        return self.detalhes(session, "financeiro", periodo=periodo, territorio_id=territorio_id).itens
+
+    def producao(self, session: Session, *, periodo: Optional[str] = None, territorio_id: Optional[int] = None):
+        return self.detalhes(session, "producao", periodo=periodo, territorio_id=territorio_id).itens
 
     def metas(self, session: Session, *, periodo: Optional[str] = None, territorio_id: Optional[int] = None):
+        return self.detalhes(session, "meta", periodo=periodo, territorio_id=territorio_id).itens
+
+    def _resumo_agregado(
+        self,
+        session: Session,
+        *,
+        periodo: Optional[str] = None,
+        territorio_id: Optional[int] = None,
+        particoes: Optional[List[Tuple[str, int]]] = None,
+    ):
+        """Cada fato pré-agregado por (territorio_id, periodo) e unido sobre as chaves dos três fatos.
+
+        Colunas na ordem de `_CAMPOS_RESUMO` (sem o nome do território).
+        """
         models = self._models(session)
-        Model = models["meta"]
-        stmt = select(Model)
+        Fin, Prod, Meta = models["financeiro"], models["producao"], models["meta"]
+
+        def _filtrar(stmt, Model):
+            if periodo:
+                stmt = stmt.where(Model.periodo == periodo)
+            if territorio_id is not None:
+                stmt = stmt.where(Model.territorio_id == territorio_id)
+            if particoes is not None:
+                stmt = stmt.where(tuple_(Model.periodo, Model.territorio_id).in_(particoes))
+            return stmt
+
+        fin = _filtrar(select(
+            Fin.territorio_id,
+            Fin.periodo,
+            func.sum(Fin.dotacao_atualizada).label("dotacao_atualizada"),
+            func.sum(Fin.receita_realizada).label("receita_realizada"),
+            func.sum(Fin.empenhado).label("empenhado"),
+            func.sum(Fin.liquidado).label("liquidado"),
+            func.sum(Fin.pago).label("pago"),
+        ), Fin).group_by(Fin.territorio_id, Fin.periodo).subquery("fin")
+
+        prod = _filtrar(select(
+            Prod.territorio_id,
+            Prod.periodo,
+            func.sum(Prod.quantidade).label("producao_total"),
+        ), Prod).group_by(Prod.territorio_id, Prod.periodo).subquery("prod")
+
+        cumprida = and_(
+            Meta.meta_planejada.is_not(None),
+            Meta.meta_executada.is_not(None),
+            Meta.meta_planejada != 0,
+            Meta.meta_executada >= Meta.meta_planejada,
+        )
+        meta = _filtrar(select(
+            Meta.territorio_id,
+            Meta.periodo,
+            func.count().label("metas_total"),
+            func.sum(case((cumprida, 1), else_=0)).label("metas_cumpridas"),
+        ), Meta).group_by(Meta.territorio_id, Meta.periodo).subquery("meta")
+
+        # chaves lidas direto dos fatos: cada subconsulta agregada aparece uma única vez no SQL
+        chaves = union(*[
+            _filtrar(select(Model.territorio_id, Model.periodo), Model) for Model in (Fin, Prod, Meta)
+        ]).subquery("chaves")
+
+        def _na_chave(sub):
+            return and_(sub.c.territorio_id == chaves.c.territorio_id, sub.c.periodo == chaves.c.periodo)
+
+        dotacao = func.coalesce(fin.c.dotacao_atualizada, 0.0)
+        pago = func.coalesce(fin.c.pago, 0.0)
+        return (
+            select(
+                chaves.c.territorio_id.label("territorio_id"),
+                chaves.c.periodo.label("periodo"),
+                dotacao.label("dotacao_atualizada"),
+                func.coalesce(fin.c.receita_realizada, 0.0).label("receita_realizada"),
+                func.coalesce(fin.c.empenhado, 0.0).label("empenhado"),
+                func.coalesce(fin.c.liquidado, 0.0).label("liquidado"),
+                pago.label("pago"),
+                case((dotacao > 0, pago * 100.0 / dotacao), else_=None).label("execucao_percentual"),
+                func.coalesce(prod.c.producao_total, 0).label("producao_total"),
+                func.coalesce(meta.c.metas_cumpridas, 0).label("metas_cumpridas"),
+                func.coalesce(meta.c.metas_total, 0).label("metas_total"),
+            )
+            .select_from(chaves)
+            .outerjoin(fin, _na_chave(fin))
+            .outerjoin(prod, _na_chave(prod))
+            .outerjoin(meta, _na_chave(meta))
+        )
+
+    def _resumo_stmt(self, session: Session, *, periodo: Optional[str], territorio_id: Optional[int]):
+        """Recalcula o resumo a partir dos fatos numa única consulta."""
+        agg = self._resumo_agregado(session, periodo=periodo, territorio_id=territorio_id).subquery("agg")
+        return select(*[agg.c[c] for c in _CAMPOS_RESUMO]).order_by(agg.c.periodo, agg.c.territorio_id)
+
+    def _rollup_stmt(self, session: Session, *, periodo: Optional[str], territorio_id: Optional[int]):
+        """Lê o resumo pré-agregado (`rag_resumo`)."""
+        Resumo = self._models(session)["resumo"]
+        stmt = select(*[getattr(Resumo, c) for c in _CAMPOS_RESUMO]).order_by(Resumo.periodo, Resumo.territorio_id)
         if periodo:
-            stmt = stmt.where(Model.periodo == periodo)
+            stmt = stmt.where(Resumo.periodo == periodo)
         if territorio_id is not None:
-            stmt = stmt.where(Model.territorio_id == territorio_id)
-        rows = session.exec(stmt).all()
-        territorios = self._territorios(session, models["territorio"], territorio_id)
-        out: List[Dict[str, object]] = []
-        for row in rows:
-            planejada = getattr(row, "meta_planejada", None)
-            executada = getattr(row, "meta_executada", None)
-            cumprida = None
-            try:
-                if planejada is not None and executada is not None and planejada != 0:
-                    cumprida = executada >= planejada
-            except Exception:
-                cumprida = None
-            out.append({
-                "territorio_id": row.territorio_id,
-                "territorio_nome": territorios.get(row.territorio_id),
-                "periodo": row.periodo,
-                "indicador": getattr(row, "indicador", ""),
-                "meta_planejada": planejada,
-                "meta_executada": executada,
-                "cumprida": cumprida,
-            })
-        return out
-
-    def resumo(self, session: Session, *, periodo: Optional[str] = None, territorio_id: Optional[int] = None):
-        financeiros = self.financeiro(session, periodo=periodo, territorio_id=territorio_id)
-        producoes = self.producao(session, periodo=periodo, territorio_id=territorio_id)
-        metas = self.metas(session, periodo=periodo, territorio_id=territorio_id)
-
-        resumo: Dict[Tuple[int, str], Dict[str, object]] = {}
-        periodos = set()
-
-        for row in financeiros:
-            key = (row["territorio_id"], row["periodo"])
-            periodos.add(row["periodo"])
-            data = resumo.setdefault(key, {
-                "territorio_id": row["territorio_id"],
-                "territorio_nome": row.get("territorio_nome"),
-                "periodo": row["periodo"],
-                "dotacao_atualizada": 0.0,
-                "receita_realizada": 0.0,
-                "empenhado": 0.0,
-                "liquidado": 0.0,
-                "pago": 0.0,
-                "producao_total": 0,
-                "metas_cumpridas": 0,
-                "metas_total": 0,
-            })
-            for field in ["dotacao_atualizada", "receita_realizada", "empenhado", "liquidado", "pago"]:
-                value = row.get(field)
-                if value is not None:
-                    data[field] = float(value)
-
-        for row in producoes:
-            key = (row["territorio_id"], row["periodo"])
-            periodos.add(row["periodo"])
-            data = resumo.setdefault(key, {
-                "territorio_id": row["territorio_id"],
-                "territorio_nome": row.get("territorio_nome"),
-                "periodo": row["periodo"],
-                "dotacao_atualizada": 0.0,
-                "receita_realizada": 0.0,
-                "empenhado": 0.0,
-                "liquidado": 0.0,
-                "pago": 0.0,
-                "producao_total": 0,
-                "metas_cumpridas": 0,
-                "metas_total": 0,
-            })
-            qtd = row.get("quantidade")
-            if qtd is not None:
-                data["producao_total"] = (data.get("producao_total") or 0) + int(qtd)
-
-        for row in metas:
-            key = (row["territorio_id"], row["periodo"])
-            periodos.add(row["periodo"])
-            data = resumo.setdefault(key, {
-                "territorio_id": row["territorio_id"],
-                "territorio_nome": row.get("territorio_nome"),
-                "periodo": row["periodo"],
-                "dotacao_atualizada": 0.0,
-                "receita_realizada": 0.0,
-                "empenhado": 0.0,
-                "liquidado": 0.0,
-                "pago": 0.0,
-                "producao_total": 0,
-                "metas_cumpridas": 0,
-                "metas_total": 0,
-            })
-            data["metas_total"] = int(data.get("metas_total", 0) + 1)
-            if row.get("cumprida") is True:
-                data["metas_cumpridas"] = int(data.get("metas_cumpridas", 0) + 1)
+            stmt = stmt.where(Resumo.territorio_id == territorio_id)
+        return stmt
+
+    def _rollup_vazio(self, session: Session) -> bool:
+        Resumo = self._models(session)["resumo"]
+        return session.exec(select(Resumo.periodo).limit(1)).first() is None
 
+    def atualizar_resumo(self, session: Session, particoes: Iterable[Tuple[str, int]]) -> int:
+        """Recalcula `rag_resumo` só para as partições (periodo, territorio_id) informadas. Não faz commit."""
+        particoes = sorted(set(particoes))
+        if not particoes:
+            return 0
+        Resumo = self._models(session)["resumo"]
+        t = Resumo.__table__
+        agora = datetime.utcnow()
+        for i in range(0, len(particoes), _PARTICOES_POR_COMANDO):
+            fatia = particoes[i:i + _PARTICOES_POR_COMANDO]
+            session.exec(delete(t).where(tuple_(t.c.periodo, t.c.territorio_id).in_(fatia)))
+            agg = self._resumo_agregado(session, particoes=fatia).subquery("agg")
+            session.exec(insert(t).from_select(
+                [*_CAMPOS_RESUMO, "atualizado_em"],
+                select(*[agg.c[c] for c in _CAMPOS_RESUMO], literal(agora)),
+            ))
+        return len(particoes)
+
+    def reconstruir_resumo(self, session: Session) -> None:
+        """Recalcula `rag_resumo` inteiro a partir dos fatos."""
+        Resumo = self._models(session)["resumo"]
+        t = Resumo.__table__
+        session.exec(delete(t))
+        agg = self._resumo_agregado(session).subquery("agg")
+        session.exec(insert(t).from_select(
+            [*_CAMPOS_RESUMO, "atualizado_em"],
+            select(*[agg.c[c] for c in _CAMPOS_RESUMO], literal(datetime.utcnow())),
+        ))
+        session.commit()
+
+    def resumo(
+        self,
+        session: Session,
+        *,
+        periodo: Optional[str] = None,
+        territorio_id: Optional[int] = None,
+        fresh: bool = False,
+    ):
+        """Painel por (territorio_id, periodo).
+
+        Lê o resumo pré-agregado mantido pela carga dos fatos; `fresh=True` (ou um
+        resumo ainda vazio) recalcula a partir dos fatos numa única consulta.
+        """
+        if fresh or self._rollup_vazio(session):
+            stmt = self._resumo_stmt(session, periodo=periodo, territorio_id=territorio_id)
+        else:
+            stmt = self._rollup_stmt(session, periodo=periodo, territorio_id=territorio_id)
+        rows = session.exec(stmt).all()
+        nomes = self._nomes_territorios(session, [r[0] for r in rows])
         itens: List[Dict[str, object]] = []
-        for key, data in resumo.items():
-            dotacao = data.get("dotacao_atualizada")
-            pago = data.get("pago")
-            execucao = None
-            try:
-                if dotacao and dotacao > 0 and pago is not None:
-                    execucao = (float(pago) / float(dotacao)) * 100.0
-            except Exception:
-                execucao = None
-            data["execucao_percentual"] = execucao
+        for valores in rows:
+            data: Dict[str, object] = dict(zip(_CAMPOS_RESUMO, valores))
+            data["territorio_nome"] = nomes.get(data["territorio_id"])
+            for field in ("dotacao_atualizada", "receita_realizada", "empenhado", "liquidado", "pago", "execucao_percentual"):
+                if data[field] is not None:
+                    data[field] = float(data[field])
+            for field in ("producao_total", "metas_cumpridas", "metas_total"):
+                data[field] = int(data[field])
             itens.append(data)
-
-        itens.sort(key=lambda d: (d["periodo"], d["territorio_id"]))
         return {
-            "periodos": sorted(periodos),
+            "periodos": sorted({d["periodo"] for d in itens}),
             "itens": itens,
         }
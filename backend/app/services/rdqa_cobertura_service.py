@@ -1,11 +1,50 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
+from sqlalchemy import and_, case, func, literal_column, or_, tuple_
 from sqlmodel import Session, select
 
 from app.models.dev_lite import DevRefIndicador, DevCalcIndicador
 from app.models.stage import RefIndicador, CalcIndicador
+from app.services.cursor import codificar_cursor, decodificar_cursor
+
+
+DEFAULT_LIMIT_FALTANTES = 500
+
+# dimensões do breakdown; `territorio` é o prefixo da chave antes do primeiro ';' (ex.: mun=4300000)
+DIMENSOES = ("indicador", "territorio", "periodo")
+NIVEIS_PADRAO: Tuple[Tuple[str, ...], ...] = (
+    ("indicador", "territorio", "periodo"),
+    ("indicador",),
+    ("territorio",),
+    ("periodo",),
+    (),
+)
+
+Nivel = Tuple[str, ...]
+
+
+def parse_niveis(valores: Sequence[str]) -> List[Nivel]:
+    """Converte ["indicador,periodo", "total"] em níveis de agrupamento validados."""
+    niveis: List[Nivel] = []
+    for valor in valores:
+        nomes = tuple(n.strip() for n in valor.split(",") if n.strip())
+        if nomes in ((), ("total",)):
+            nivel: Nivel = ()
+        else:
+            invalidas = [n for n in nomes if n not in DIMENSOES]
+            if invalidas:
+                raise ValueError(f"dimensão inválida: {', '.join(invalidas)} (use {', '.join(DIMENSOES)} ou total)")
+            # ordem canônica, para que "periodo,indicador" e "indicador,periodo" sejam o mesmo nível
+            nivel = tuple(d for d in DIMENSOES if d in nomes)
+        if nivel not in niveis:
+            niveis.append(nivel)
+    return niveis
+
+
+def _prefixo_territorio(chave: str) -> str:
+    return chave.split(";", 1)[0]
 
 
 class RDQACoberturaService:
@@ -15,35 +54,212 @@ class RDQACoberturaService:
             return DevRefIndicador, DevCalcIndicador
         return RefIndicador, CalcIndicador
 
-    def cobertura(self, session: Session, periodo: Optional[str] = None) -> Dict:
+    def _ref_sem_calc(self, session: Session):
+        """FROM ref LEFT JOIN calc pela chave (indicador, chave, periodo)."""
         Ref, Calc = self._models(session)
+        juncao = and_(Calc.indicador == Ref.indicador, Calc.chave == Ref.chave, Calc.periodo == Ref.periodo)
+        return Ref, Calc, juncao
+
+    def cobertura(
+        self,
+        session: Session,
+        periodo: Optional[str] = None,
+        *,
+        indicador: Optional[str] = None,
+        limit: int = DEFAULT_LIMIT_FALTANTES,
+        cursor: Optional[str] = None,
+    ) -> Dict:
+        """Cobertura calculada no banco: contagens agregadas e faltantes via anti-join.
+
+        Os faltantes vêm ordenados por (indicador, chave, periodo) e paginados por
+        keyset (`limit`/`cursor`); `por_indicador` traz o resumo de cada indicador.
+        Levanta ValueError para cursor inválido.
+        """
+        pos = decodificar_cursor(cursor, (str, str, str)) if cursor else None
+        Ref, Calc, juncao = self._ref_sem_calc(session)
+        filtros = []
+        if periodo:
+            filtros.append(Ref.periodo == periodo)
+        if indicador:
+            filtros.append(Ref.indicador == indicador)
+
         try:
-            stmt_ref = select(Ref)
-            stmt_calc = select(Calc)
-            if periodo:
-                stmt_ref = stmt_ref.where(Ref.periodo == periodo)
-                stmt_calc = stmt_calc.where(Calc.periodo == periodo)
-            ref_rows = session.exec(stmt_ref).all()
-            calc_rows = session.exec(stmt_calc).all()
+            stmt_grupos = (
+                select(Ref.indicador, func.count(), func.count(Calc.id))
+                .select_from(Ref)
+                .outerjoin(Calc, juncao)
+                .where(*filtros)
+                .group_by(Ref.indicador)
+                .order_by(Ref.indicador)
+            )
+            grupos = session.exec(stmt_grupos).all()
+
+            stmt_faltantes = (
+                select(Ref.indicador, Ref.chave, Ref.periodo)
+                .select_from(Ref)
+                .outerjoin(Calc, juncao)
+                .where(Calc.id.is_(None), *filtros)
+                .order_by(Ref.indicador, Ref.chave, Ref.periodo)
+                .limit(limit + 1)
+            )
+            if pos is not None:
+                ind, chave, per = pos
+                stmt_faltantes = stmt_faltantes.where(or_(
+                    Ref.indicador > ind,
+                    and_(Ref.indicador == ind, Ref.chave > chave),
+                    and_(Ref.indicador == ind, Ref.chave == chave, Ref.periodo > per),
+                ))
+            faltantes_rows = [tuple(r) for r in session.exec(stmt_faltantes).all()]
         except Exception:
-            ref_rows, calc_rows = [], []
+            session.rollback()
+            grupos, faltantes_rows = [], []
 
-        ref_keys = {(r.indicador, r.chave, r.periodo) for r in ref_rows}
-        calc_keys = {(c.indicador, c.chave, c.periodo) for c in calc_rows}
+        por_indicador: List[Dict] = []
+        total = gerados = 0
+        for ind, n_total, n_gerados in grupos:
+            total += n_total
+            gerados += n_gerados
+            por_indicador.append({
+                "indicador": ind,
+                "total": n_total,
+                "gerados": n_gerados,
+                "faltantes": n_total - n_gerados,
+                "percent": (n_gerados / n_total * 100.0) if n_total else 0.0,
+            })
 
-        total = len(ref_keys)
-        gerados = len(ref_keys & calc_keys)
-        faltantes_items: List[Dict[str, str]] = []
-        for (indicador, chave, per) in sorted(ref_keys - calc_keys):
-            faltantes_items.append({
-                "quadro": f"{indicador}:{chave}",
+        proximo_cursor = None
+        if len(faltantes_rows) > limit:
+            faltantes_rows = faltantes_rows[:limit]
+            proximo_cursor = codificar_cursor(faltantes_rows[-1])
+        faltantes_items: List[Dict[str, str]] = [
+            {
+                "quadro": f"{ind}:{chave}",
+                "indicador": ind,
+                "chave": chave,
                 "periodo": per,
                 "motivo": "sem dados",
-            })
+            }
+            for ind, chave, per in faltantes_rows
+        ]
         percent = (gerados / total * 100.0) if total else 0.0
         return {
             "percent": percent,
             "total": total,
             "gerados": gerados,
+            "faltantes_total": total - gerados,
             "faltantes": faltantes_items,
+            "proximo_cursor": proximo_cursor,
+            "por_indicador": por_indicador,
         }
+
+    def _territorio_expr(self, session: Session, Ref):
+        dialect = session.get_bind().dialect.name if session.get_bind() else ''
+        if dialect == 'postgresql':
+            return func.split_part(Ref.chave, ';', 1)
+        if dialect == 'sqlite':
+            pos = func.instr(Ref.chave, ';')
+            return case((pos > 0, func.substr(Ref.chave, 1, pos - 1)), else_=Ref.chave)
+        return Ref.chave  # o prefixo é extraído no rollup em Python
+
+    @staticmethod
+    def _grupo(nivel: Nivel, valores: Dict[str, Optional[str]], total: int, gerados: int) -> Dict:
+        return {
+            "nivel": "+".join(nivel) or "total",
+            "indicador": valores.get("indicador"),
+            "territorio": valores.get("territorio"),
+            "periodo": valores.get("periodo"),
+            "total": total,
+            "gerados": gerados,
+            "faltantes": total - gerados,
+            "percent": (gerados / total * 100.0) if total else 0.0,
+        }
+
+    def _breakdown_grouping_sets(self, session: Session, niveis: List[Nivel], filtros, dims) -> List[Dict]:
+        """Postgres: todos os níveis numa única consulta com GROUP BY GROUPING SETS."""
+        Ref, Calc, juncao = self._ref_sem_calc(session)
+        conjuntos = [tuple_(*[dims[d] for d in nivel]) if nivel else literal_column("()") for nivel in niveis]
+        stmt = (
+            select(
+                *[dims[d] for d in DIMENSOES],
+                *[func.grouping(dims[d]) for d in DIMENSOES],
+                func.count(),
+                func.count(Calc.id),
+            )
+            .select_from(Ref)
+            .outerjoin(Calc, juncao)
+            .where(*filtros)
+            .group_by(func.grouping_sets(*conjuntos))
+        )
+        por_nivel: Dict[Nivel, List[Dict]] = {nivel: [] for nivel in niveis}
+        for row in session.exec(stmt).all():
+            valores = dict(zip(DIMENSOES, row[:3]))
+            agrupado = row[3:6]
+            nivel = tuple(d for d, g in zip(DIMENSOES, agrupado) if not g)
+            if nivel in por_nivel:
+                por_nivel[nivel].append(self._grupo(nivel, {d: valores[d] for d in nivel}, int(row[6]), int(row[7])))
+        out: List[Dict] = []
+        for nivel in niveis:
+            out += sorted(por_nivel[nivel], key=lambda g: tuple(g[d] or "" for d in nivel))
+        return out
+
+    def _breakdown_rollup(self, session: Session, niveis: List[Nivel], filtros, dims) -> List[Dict]:
+        """Demais dialetos: uma consulta no grão mais fino e rollup em Python (contagens são aditivas)."""
+        Ref, Calc, juncao = self._ref_sem_calc(session)
+        stmt = (
+            select(*[dims[d] for d in DIMENSOES], func.count(), func.count(Calc.id))
+            .select_from(Ref)
+            .outerjoin(Calc, juncao)
+            .where(*filtros)
+            .group_by(*[dims[d] for d in DIMENSOES])
+        )
+        base = []
+        for ind, terr, per, n_total, n_gerados in session.exec(stmt).all():
+            base.append(({"indicador": ind, "territorio": _prefixo_territorio(terr), "periodo": per}, n_total, n_gerados))
+        out: List[Dict] = []
+        for nivel in niveis:
+            acumulado: Dict[Tuple, List[int]] = {}
+            for valores, n_total, n_gerados in base:
+                k = tuple(valores[d] for d in nivel)
+                soma = acumulado.setdefault(k, [0, 0])
+                soma[0] += n_total
+                soma[1] += n_gerados
+            if nivel == () and not acumulado:
+                acumulado[()] = [0, 0]
+            for k in sorted(acumulado):
+                out.append(self._grupo(nivel, dict(zip(nivel, k)), *acumulado[k]))
+        return out
+
+    def breakdown(
+        self,
+        session: Session,
+        periodo: Optional[str] = None,
+        *,
+        indicador: Optional[str] = None,
+        niveis: Optional[Sequence[Nivel]] = None,
+    ) -> Dict:
+        """Cobertura agrupada por indicador, território (prefixo da chave) e período, com rollups.
+
+        Cada nível é um conjunto de dimensões (estilo GROUPING SETS); `()` é o total geral.
+        """
+        niveis = list(niveis or NIVEIS_PADRAO)
+        Ref, _, _ = self._ref_sem_calc(session)
+        dims = {"indicador": Ref.indicador, "territorio": self._territorio_expr(session, Ref), "periodo": Ref.periodo}
+        filtros = []
+        if periodo:
+            filtros.append(Ref.periodo == periodo)
+        if indicador:
+            filtros.append(Ref.indicador == indicador)
+        dialect = session.get_bind().dialect.name if session.get_bind() else ''
+        grupos: List[Dict] = []
+        try:
+            if dialect == 'postgresql':
+                grupos = self._breakdown_grouping_sets(session, niveis, filtros, dims)
+            else:
+                grupos = self._breakdown_rollup(session, niveis, filtros, dims)
+        except Exception:
+            session.rollback()
+            try:
+                grupos = self._breakdown_rollup(session, niveis, filtros, dims)
+            except Exception:
+                grupos = []
+        return {"niveis": ["+".join(n) or "total" for n in niveis], "grupos": grupos}
@@ -1,18 +1,75 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
 
+from sqlalchemy import case, func
 from sqlmodel import Session, select
 
 from app.models.dev_lite import DevCalcIndicador
 from app.models.stage import CalcIndicador
 
 
+# linhas buscadas por ida ao banco ao percorrer o resultado
+DIFF_YIELD_PER = 1000
+
+
+def _tendencia(v_curr: Optional[float], v_prev: Optional[float]) -> str:
+    if v_curr is None or v_prev is None or v_curr == v_prev:
+        return "igual"
+    return "melhora" if v_curr > v_prev else "piora"
+
+
 class RDQADiffService:
     def _model(self, session: Session):
         dialect = session.get_bind().dialect.name if session.get_bind() else ''
         return DevCalcIndicador if dialect == 'sqlite' else CalcIndicador
 
+    def _stmt(self, session: Session, indicadores: Optional[List[str]], periodo_atual: str, periodo_anterior: str):
+        """Pivot dos dois períodos numa única consulta (equivalente a um FULL OUTER JOIN por chave).
+
+        Sem `indicadores`, compara os indicadores presentes no período atual.
+        """
+        Model = self._model(session)
+        valor_atual = func.max(case((Model.periodo == periodo_atual, Model.valor), else_=None))
+        valor_anterior = func.max(case((Model.periodo == periodo_anterior, Model.valor), else_=None))
+        stmt = (
+            select(Model.indicador, Model.chave, valor_atual, valor_anterior)
+            .where(Model.periodo.in_([periodo_atual, periodo_anterior]))
+            .group_by(Model.indicador, Model.chave)
+            .order_by(Model.indicador, Model.chave)
+        )
+        if indicadores:
+            stmt = stmt.where(Model.indicador.in_(indicadores))
+        else:
+            presentes = select(Model.indicador).where(Model.periodo == periodo_atual).distinct()
+            stmt = stmt.where(Model.indicador.in_(presentes.scalar_subquery()))
+        return stmt
+
+    def iter_comparar(
+        self,
+        session: Session,
+        *,
+        indicadores: Optional[List[str]],
+        periodo_atual: str,
+        periodo_anterior: str,
+    ) -> Iterator[Dict[str, object]]:
+        """Percorre o diff em ordem de (indicador, chave), buscando `DIFF_YIELD_PER` linhas por vez."""
+        stmt = self._stmt(session, indicadores, periodo_atual, periodo_anterior)
+        result = session.exec(stmt.execution_options(yield_per=DIFF_YIELD_PER))
+        for indicador, chave, v_curr, v_prev in result:
+            v_curr = float(v_curr) if v_curr is not None else None
+            v_prev = float(v_prev) if v_prev is not None else None
+            yield {
+                "indicador": indicador,
+                "chave": chave,
+                "periodo_atual": periodo_atual,
+                "periodo_anterior": periodo_anterior,
+                "valor_atual": v_curr,
+                "valor_anterior": v_prev,
+                "delta": (v_curr - v_prev) if (v_curr is not None and v_prev is not None) else None,
+                "tendencia": _tendencia(v_curr, v_prev),
+            }
+
     def comparar(
         self,
         session: Session,
@@ -21,38 +78,11 @@ class RDQADiffService:
         periodo_atual: str,
         periodo_anterior: str,
     ) -> List[Dict[str, object]]:
-        Model = self._model(session)
-        res: List[Dict[str, object]] = []
-        for indicador in indicadores:
-            stmt_curr = select(Model).where(Model.indicador == indicador, Model.periodo == periodo_atual)
-            stmt_prev = select(Model).where(Model.indicador == indicador, Model.periodo == periodo_anterior)
-            curr_rows = session.exec(stmt_curr).all()
-            prev_rows = session.exec(stmt_prev).all()
-            curr_map: Dict[str, float] = {r.chave: float(r.valor) for r in curr_rows}
-            prev_map: Dict[str, float] = {r.chave: float(r.valor) for r in prev_rows}
-            keys = set(curr_map.keys()) | set(prev_map.keys())
-            for k in sorted(keys):
-                v_curr = curr_map.get(k)
-                v_prev = prev_map.get(k)
-                delta = (v_curr - v_prev) if (v_curr is not None and v_prev is not None) else None
-                if v_curr is not None and v_prev is not None:
-                    if v_curr > v_prev:
-                        tendencia = "melhora"
-                    elif v_curr < v_prev:
-                        tendencia = "piora"
-                    else:
-                        tendencia = "igual"
-                else:
-                    tendencia = "igual"
-                res.append({
-                    "indicador": indicador,
-                    "chave": k,
-                    "periodo_atual": periodo_atual,
-                    "periodo_anterior": periodo_anterior,
-                    "valor_atual": v_curr,
-                    "valor_anterior": v_prev,
-                    "delta": delta,
-                    "tendencia": tendencia,
-                })
-        return res
-
+        if not indicadores:
+            return []
+        return list(self.iter_comparar(
+            session,
+            indicadores=indicadores,
+            periodo_atual=periodo_atual,
+            periodo_anterior=periodo_anterior,
+        ))
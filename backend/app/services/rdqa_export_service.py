@@ -1,35 +1,81 @@
 import asyncio
 import hashlib
+import json
 import logging
 import os
+import re
 import shutil
 import sys
+import tempfile
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional, Tuple
+from zipfile import ZipFile, ZIP_STORED
 
-from pyppeteer import launch
-from pyppeteer.chromium_downloader import chromium_executable, download_chromium
+from app.core.config import get_settings
+from app.services.browser_pool import BrowserPool, PoolIndisponivel
+from app.services.pdf_cache import PDFCache
 
 
+# tamanho do ZIP de um lote mantido em memória antes de passar para arquivo temporário
+_ZIP_EM_MEMORIA = 8 * 1024 * 1024
+
 class RDQAExportService:
-    def __init__(self):
-        self._browser = None
+    # pyppeteer só é importado ao lançar o primeiro navegador (PDF_STARTUP=lazy) ou no
+    # startup (PDF_STARTUP=warm); réplicas só de API nunca carregam o módulo
+    # pool compartilhado por todas as instâncias do processo (rotas RDQA e RAG)
+    _pool: Optional[BrowserPool] = None
+    _cache: Optional[PDFCache] = None
+    # renderizações em curso por chave do cache (evita renderizar o mesmo conteúdo em paralelo)
+    _em_andamento: Dict[str, "asyncio.Future[bytes]"] = {}
+
+    @classmethod
+    def pool(cls) -> BrowserPool:
+        if cls._pool is None:
+            settings = get_settings()
+            if settings.pdf_startup == 'off':
+                raise PoolIndisponivel("exportação PDF desabilitada nesta instância (PDF_STARTUP=off)")
+            cls._pool = BrowserPool(
+                cls._launch,
+                navegadores=settings.pdf_navegadores,
+                paginas_por_navegador=settings.pdf_paginas_por_navegador,
+                fila_max=settings.pdf_fila_max,
+                espera_s=settings.pdf_espera_s,
+            )
+        return cls._pool
+
+    @classmethod
+    async def aquecer(cls) -> int:
+        """Lança os navegadores do pool antes da primeira exportação (PDF_STARTUP=warm)."""
+        inicio = time.monotonic()
+        navegadores = await cls.pool().aquecer()
+        logging.info(f"[pdf] pool aquecido: {navegadores} navegador(es) em {time.monotonic() - inicio:.1f}s")
+        return navegadores
+
+    @classmethod
+    async def fechar(cls) -> None:
+        if cls._pool is not None:
+            await cls._pool.fechar()
+
+    @classmethod
+    async def _launch(cls):
+        from pyppeteer import launch
+
+        executable = await cls._resolve_executable()
+        args = ['--no-sandbox', '--disable-gpu', '--disable-dev-shm-usage']
+        try:
+            if executable:
+                return await launch(executablePath=str(executable), args=args)
+            return await launch(args=args)
+        except Exception as e:
+            logging.error(f"Failed to launch Chromium: {e}")
+            raise
+
+    @staticmethod
+    async def _resolve_executable() -> Optional[Path]:
+        from pyppeteer.chromium_downloader import chromium_executable, download_chromium
 
-    async def _get_browser(self):
-        if self._browser is None:
-            executable = await self._resolve_executable()
-            args = ['--no-sandbox', '--disable-gpu', '--disable-dev-shm-usage']
-            try:
-                if executable:
-                    self._browser = await launch(executablePath=str(executable), args=args)
-                else:
-                    self._browser = await launch(args=args)
-            except Exception as e:
-                logging.error(f"Failed to launch Chromium: {e}")
-                raise
-        return self._browser
-
-    async def _resolve_executable(self) -> Optional[Path]:
         env_path = os.getenv('PUPPETEER_EXECUTABLE_PATH')
         if env_path and Path(env_path).exists():
             return Path(env_path)
@@ -65,15 +111,9 @@ class RDQAExportService:
             logging.error(f"Chromium download failed: {e}")
         return None
 
-    async def render_pdf_from_html(self, html: str, format_: str = 'A4', margin_mm: int = 12) -> bytes:
-        browser = await self._get_browser()
-        page = await browser.newPage()
-        await page.setContent(html)
-        try:
-            await page.waitForSelector('body', { 'timeout': 3000 })
-        except Exception:
-            pass
-        pdf_bytes = await page.pdf({
+    @staticmethod
+    def _pdf_options(format_: str, margin_mm: int) -> dict:
+        return {
             'format': format_,
             'margin': {
                 'top': f'{margin_mm}mm',
@@ -83,27 +123,186 @@ class RDQAExportService:
             },
             'printBackground': True,
             'preferCSSPageSize': False,
-        })
-        await page.close()
-        return pdf_bytes
+        }
+
+    async def render_pdf_from_html(self, html: str, format_: str = 'A4', margin_mm: int = 12) -> bytes:
+        async def _render(page) -> bytes:
+            await page.setContent(html)
+            try:
+                await page.waitForSelector('body', { 'timeout': 3000 })
+            except Exception:
+                pass
+            return await page.pdf(self._pdf_options(format_, margin_mm))
+
+        async with self.pool().pagina() as page:
+            return await asyncio.wait_for(_render(page), timeout=get_settings().pdf_render_timeout_s)
 
     async def render_pdf_from_url(self, url: str, format_: str = 'A4', margin_mm: int = 12) -> bytes:
-        browser = await self._get_browser()
-        page = await browser.newPage()
-        await page.goto(url, waitUntil=['load', 'networkidle0'])
-        pdf_bytes = await page.pdf({
-            'format': format_,
-            'margin': {
-                'top': f'{margin_mm}mm',
-                'bottom': f'{margin_mm}mm',
-                'left': f'{margin_mm}mm',
-                'right': f'{margin_mm}mm',
-            },
-            'printBackground': True,
-            'preferCSSPageSize': False,
-        })
-        await page.close()
-        return pdf_bytes
+        async def _render(page) -> bytes:
+            await page.goto(url, waitUntil=['load', 'networkidle0'])
+            return await page.pdf(self._pdf_options(format_, margin_mm))
+
+        async with self.pool().pagina() as page:
+            return await asyncio.wait_for(_render(page), timeout=get_settings().pdf_render_timeout_s)
+
+    @classmethod
+    def cache(cls) -> PDFCache:
+        if cls._cache is None:
+            settings = get_settings()
+            cls._cache = PDFCache(
+                Path(settings.pdf_cache_dir),
+                max_bytes=settings.pdf_cache_max_mb * 1024 * 1024,
+                ttl_s=settings.pdf_cache_ttl_s,
+            )
+        return cls._cache
+
+    async def render_pdf(
+        self,
+        *,
+        html: Optional[str] = None,
+        url: Optional[str] = None,
+        format_: str = 'A4',
+        margin_mm: int = 12,
+    ) -> Tuple[bytes, bool]:
+        """PDF de `html` (ou `url`) passando pelo cache em disco; devolve (bytes, veio_do_cache).
+
+        Requisições idênticas simultâneas compartilham uma única renderização.
+        """
+        cache = self.cache()
+        chave = cache.chave(html=html, url=url, format_=format_, margin_mm=margin_mm)
+        pdf_bytes = await asyncio.to_thread(cache.obter, chave)
+        if pdf_bytes is not None:
+            return pdf_bytes, True
+        while (pendente := self._em_andamento.get(chave)) is not None:
+            try:
+                return await asyncio.shield(pendente), True
+            except asyncio.CancelledError:
+                if not pendente.cancelled():
+                    raise  # quem foi cancelado é esta requisição
+                # a renderização compartilhada foi cancelada: esta requisição renderiza (ou aguarda outra)
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_andamento[chave] = futuro
+        try:
+            if html:
+                pdf_bytes = await self.render_pdf_from_html(html, format_=format_, margin_mm=margin_mm)
+            else:
+                pdf_bytes = await self.render_pdf_from_url(url or '', format_=format_, margin_mm=margin_mm)
+            await asyncio.to_thread(cache.gravar, chave, pdf_bytes)
+            futuro.set_result(pdf_bytes)
+            return pdf_bytes, False
+        except Exception as e:
+            futuro.set_exception(e)
+            futuro.exception()  # marca como consumida caso ninguém mais aguarde
+            raise
+        finally:
+            if not futuro.done():
+                futuro.cancel()
+            self._em_andamento.pop(chave, None)
+
+    async def render_lote(
+        self,
+        documentos: List[Dict[str, Optional[str]]],
+        *,
+        format_: str = 'A4',
+        margin_mm: int = 12,
+    ) -> AsyncIterator[Tuple[int, Optional[bytes], bool, Optional[str]]]:
+        """Renderiza vários documentos (`html`/`url`) em paralelo pelo pool.
+
+        No máximo `capacidade` renderizações do lote ficam pendentes no pool ao mesmo
+        tempo, para o lote não ocupar a fila de espera das exportações avulsas. Produz
+        (índice, bytes, veio_do_cache, erro) na ordem em que os documentos ficam prontos;
+        falha de um documento não interrompe os demais.
+        """
+        limite = asyncio.Semaphore(self.pool().capacidade)
+
+        async def _um(indice: int, doc) -> Tuple[int, Optional[bytes], bool, Optional[str]]:
+            async with limite:
+                try:
+                    pdf_bytes, cache_hit = await self.render_pdf(
+                        html=doc.get('html'), url=doc.get('url'), format_=format_, margin_mm=margin_mm
+                    )
+                    return indice, pdf_bytes, cache_hit, None
+                except Exception as e:
+                    return indice, None, False, str(e) or e.__class__.__name__
+
+        tarefas = [asyncio.ensure_future(_um(i, doc)) for i, doc in enumerate(documentos)]
+        try:
+            for proxima in asyncio.as_completed(tarefas):
+                yield await proxima
+        finally:
+            for t in tarefas:
+                t.cancel()
+
+    @staticmethod
+    def nome_arquivo(nome: Optional[str], indice: int, usados: set) -> str:
+        """Nome seguro e único (no ZIP) para o documento `indice` do lote."""
+        base = re.sub(r'[^\w.-]+', '_', (nome or '').strip()).strip('._')
+        if base.lower().endswith('.pdf'):
+            base = base[:-4]
+        base = base or f"documento-{indice + 1:04d}"
+        candidato, n = base, 2
+        while f"{candidato}.pdf" in usados:
+            candidato, n = f"{base}-{n}", n + 1
+        usados.add(f"{candidato}.pdf")
+        return f"{candidato}.pdf"
+
+    async def empacotar_lote(
+        self,
+        exec_id: str,
+        documentos: List[Dict[str, Optional[str]]],
+        *,
+        format_: str = 'A4',
+        margin_mm: int = 12,
+    ) -> Tuple[BinaryIO, Dict[str, Any]]:
+        """Renderiza o lote e grava o ZIP (um PDF por documento + MANIFEST.json) em arquivo temporário.
+
+        Cada documento traz `arquivo`, `exec_id` e `html`/`url`. Os PDFs entram no ZIP
+        assim que ficam prontos e são descartados em seguida, então o lote não fica
+        inteiro em memória; o ZIP passa para o disco acima de `_ZIP_EM_MEMORIA` bytes.
+        Os PDFs já são comprimidos, então vão sem nova compressão (ZIP_STORED). Devolve o
+        arquivo posicionado no início (quem chama o fecha) e o manifest.
+        """
+        entradas: List[Optional[Dict[str, Any]]] = [None] * len(documentos)
+        arquivo = tempfile.SpooledTemporaryFile(max_size=_ZIP_EM_MEMORIA)
+        try:
+            with ZipFile(arquivo, 'w', compression=ZIP_STORED) as z:
+                async for indice, data, cache_hit, erro in self.render_lote(
+                    documentos, format_=format_, margin_mm=margin_mm
+                ):
+                    doc = documentos[indice]
+                    entrada = {"arquivo": doc["arquivo"], "exec_id": doc["exec_id"], "ok": data is not None}
+                    if data is not None:
+                        await asyncio.to_thread(z.writestr, doc["arquivo"], data)
+                        entrada.update({
+                            "hash": self.sha256_hex(data),
+                            "size": len(data),
+                            "cache": "hit" if cache_hit else "miss",
+                        })
+                    else:
+                        entrada["erro"] = erro
+                    entradas[indice] = entrada
+                manifest: Dict[str, Any] = {
+                    "schema": 1,
+                    "generated_at": datetime.utcnow().isoformat() + 'Z',
+                    "exec_id": exec_id,
+                    "documentos": entradas,
+                }
+                z.writestr('MANIFEST.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+            arquivo.seek(0)
+            return arquivo, manifest
+        except BaseException:
+            arquivo.close()
+            raise
+
+    @staticmethod
+    def sha256_arquivo(fp: BinaryIO, bloco: int = 1024 * 1024) -> str:
+        """SHA-256 de um arquivo lido em blocos; volta a posição para o início."""
+        h = hashlib.sha256()
+        fp.seek(0)
+        for parte in iter(lambda: fp.read(bloco), b''):
+            h.update(parte)
+        fp.seek(0)
+        return h.hexdigest()
 
     @staticmethod
     def sha256_hex(data: bytes) -> str:
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import Session, func, select
+
+from app.models.dev_lite import DevRefIndicador, DevCalcIndicador
+from app.models.stage import RefIndicador, CalcIndicador
+
+
+DEFAULT_JANELA = 3
+
+
+class RDQASeriesService:
+    def _model(self, session: Session, fonte: str = "calculado"):
+        dialect = session.get_bind().dialect.name if session.get_bind() else ''
+        if dialect == 'sqlite':
+            return DevRefIndicador if fonte == "referencia" else DevCalcIndicador
+        return RefIndicador if fonte == "referencia" else CalcIndicador
+
+    def series(
+        self,
+        session: Session,
+        *,
+        indicadores: List[str],
+        chaves: Optional[List[str]] = None,
+        periodo_inicio: Optional[str] = None,
+        periodo_fim: Optional[str] = None,
+        janela: int = DEFAULT_JANELA,
+        fonte: str = "calculado",
+    ) -> Dict:
+        """Séries por (indicador, chave) em formato colunar, com delta e média móvel via funções de janela.
+
+        `delta` é a diferença para o período anterior existente na série (LAG) e
+        `media_movel` a média das últimas `janela` observações (AVG OVER ROWS).
+        As janelas são calculadas antes do corte por `periodo_inicio`, de modo que
+        o primeiro período exibido ainda enxerga seus antecessores.
+        """
+        if janela < 1:
+            raise ValueError("janela deve ser >= 1")
+        Model = self._model(session, fonte)
+        particao = (Model.indicador, Model.chave)
+        interna = select(
+            Model.indicador.label("indicador"),
+            Model.chave.label("chave"),
+            Model.periodo.label("periodo"),
+            Model.valor.label("valor"),
+            (Model.valor - func.lag(Model.valor).over(partition_by=particao, order_by=Model.periodo)).label("delta"),
+            func.avg(Model.valor).over(
+                partition_by=particao, order_by=Model.periodo, rows=(-(janela - 1), 0)
+            ).label("media_movel"),
+        ).where(Model.indicador.in_(indicadores))
+        if chaves:
+            interna = interna.where(Model.chave.in_(chaves))
+        if periodo_fim:
+            interna = interna.where(Model.periodo <= periodo_fim)
+        sub = interna.subquery()
+        stmt = select(sub.c.indicador, sub.c.chave, sub.c.periodo, sub.c.valor, sub.c.delta, sub.c.media_movel)
+        if periodo_inicio:
+            stmt = stmt.where(sub.c.periodo >= periodo_inicio)
+        stmt = stmt.order_by(sub.c.indicador, sub.c.chave, sub.c.periodo)
+        rows = session.exec(stmt).all()
+
+        periodos = sorted({r[2] for r in rows})
+        pos = {p: i for i, p in enumerate(periodos)}
+        series: Dict[Tuple[str, str], Dict] = {}
+        for indicador, chave, periodo, valor, delta, media in rows:
+            serie = series.get((indicador, chave))
+            if serie is None:
+                vazio = [None] * len(periodos)
+                serie = series[(indicador, chave)] = {
+                    "indicador": indicador,
+                    "chave": chave,
+                    "valores": list(vazio),
+                    "delta": list(vazio),
+                    "media_movel": list(vazio),
+                }
+            i = pos[periodo]
+            serie["valores"][i] = float(valor) if valor is not None else None
+            serie["delta"][i] = float(delta) if delta is not None else None
+            serie["media_movel"][i] = float(media) if media is not None else None
+        return {"fonte": fonte, "janela": janela, "periodos": periodos, "series": list(series.values())}
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from datetime import datetime
+from html import escape
+from string import Template
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlmodel import Session
+
+from app.services.consistencia_service import ConsistenciaService
+from app.services.rag_service import DEFAULT_LIMIT_DETALHES, RAGService
+from app.services.rdqa_cobertura_service import RDQACoberturaService
+
+
+# linhas de detalhe por relatório; acima disso o relatório avisa que foi truncado
+MAX_LINHAS_RELATORIO = 5000
+RELATORIOS = ("rag_resumo", "rag_financeiro", "rag_metas", "rdqa_consistencia", "rdqa_cobertura")
+
+# CSS embutido: o HTML não referencia fontes, imagens nem scripts externos,
+# então o Chromium renderiza sem nenhuma requisição de rede
+_CSS = """
+@page { size: A4; }
+* { box-sizing: border-box; }
+body { font-family: "DejaVu Sans", Arial, Helvetica, sans-serif; font-size: 10pt; color: #1f2933; margin: 0; }
+header { border-bottom: 2px solid #1f6f8b; margin-bottom: 12px; padding-bottom: 6px; }
+h1 { font-size: 16pt; margin: 0 0 4px 0; color: #1f6f8b; }
+h2 { font-size: 12pt; margin: 16px 0 6px 0; }
+.sub { color: #52606d; font-size: 9pt; }
+table { width: 100%; border-collapse: collapse; margin-bottom: 8px; }
+thead { display: table-header-group; }
+tr { page-break-inside: avoid; }
+th, td { border: 1px solid #cbd2d9; padding: 3px 5px; text-align: left; }
+th { background: #e4e7eb; font-weight: bold; }
+td.n { text-align: right; white-space: nowrap; }
+tr:nth-child(even) td { background: #f5f7fa; }
+.aviso { color: #8a4b08; font-size: 9pt; }
+.vazio { color: #52606d; font-style: italic; }
+footer { margin-top: 12px; color: #7b8794; font-size: 8pt; }
+"""
+
+_PAGINA = Template("""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>$titulo</title>
+<style>$css</style>
+</head>
+<body>
+<header><h1>$titulo</h1><div class="sub">$filtros</div></header>
+$conteudo
+<footer>Gerado em $gerado_em</footer>
+</body>
+</html>
+""")
+_TABELA = Template("<table><thead><tr>$cabecalho</tr></thead><tbody>\n$linhas\n</tbody></table>")
+_SECAO = Template("<h2>$titulo</h2>\n$corpo")
+
+Coluna = Tuple[str, str, Optional[Callable[[Any], str]]]
+
+
+def _numero(v: Any, casas: int = 2) -> str:
+    if v is None:
+        return "—"
+    texto = f"{float(v):,.{casas}f}"
+    return texto.replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def _inteiro(v: Any) -> str:
+    return "—" if v is None else _numero(v, 0)
+
+
+def _percentual(v: Any) -> str:
+    return "—" if v is None else f"{_numero(v)}%"
+
+
+def _sim_nao(v: Any) -> str:
+    return "—" if v is None else ("sim" if v else "não")
+
+
+def _tabela(colunas: Sequence[Coluna], linhas: Sequence[Dict[str, Any]]) -> str:
+    if not linhas:
+        return '<p class="vazio">Sem dados para os filtros informados.</p>'
+    cabecalho = "".join(f"<th>{escape(rotulo)}</th>" for _, rotulo, _ in colunas)
+    corpo = []
+    for linha in linhas:
+        celulas = []
+        for campo, _, fmt in colunas:
+            valor = linha.get(campo)
+            if fmt is None:
+                celulas.append(f"<td>{escape('' if valor is None else str(valor))}</td>")
+            else:
+                celulas.append(f'<td class="n">{escape(fmt(valor))}</td>')
+        corpo.append(f"<tr>{''.join(celulas)}</tr>")
+    return _TABELA.substitute(cabecalho=cabecalho, linhas="\n".join(corpo))
+
+
+_COLUNAS_RESUMO: List[Coluna] = [
+    ("territorio_nome", "Território", None),
+    ("periodo", "Período", None),
+    ("dotacao_atualizada", "Dotação atualizada", _numero),
+    ("receita_realizada", "Receita realizada", _numero),
+    ("empenhado", "Empenhado", _numero),
+    ("liquidado", "Liquidado", _numero),
+    ("pago", "Pago", _numero),
+    ("execucao_percentual", "Execução", _percentual),
+    ("producao_total", "Produção", _inteiro),
+    ("metas_cumpridas", "Metas cumpridas", _inteiro),
+    ("metas_total", "Metas", _inteiro),
+]
+_COLUNAS_FINANCEIRO: List[Coluna] = _COLUNAS_RESUMO[:7]
+_COLUNAS_METAS: List[Coluna] = [
+    ("territorio_nome", "Território", None),
+    ("periodo", "Período", None),
+    ("indicador", "Indicador", None),
+    ("meta_planejada", "Planejada", _numero),
+    ("meta_executada", "Executada", _numero),
+    ("cumprida", "Cumprida", _sim_nao),
+]
+_COLUNAS_CONSISTENCIA: List[Coluna] = [
+    ("indicador", "Indicador", None),
+    ("pares", "Pares", _inteiro),
+    ("mape", "MAPE", _percentual),
+]
+_COLUNAS_COBERTURA: List[Coluna] = [
+    ("indicador", "Indicador", None),
+    ("total", "Total", _inteiro),
+    ("gerados", "Gerados", _inteiro),
+    ("faltantes", "Faltantes", _inteiro),
+    ("percent", "Cobertura", _percentual),
+]
+_COLUNAS_FALTANTES: List[Coluna] = [
+    ("indicador", "Indicador", None),
+    ("chave", "Chave", None),
+    ("periodo", "Período", None),
+    ("motivo", "Motivo", None),
+]
+
+
+class RelatorioService:
+    """Relatórios RAG/RDQA em HTML estático, montados no servidor a partir dos serviços.
+
+    Os templates são compilados na importação e o HTML sai com CSS embutido e sem
+    recursos externos, pronto para `RDQAExportService.render_pdf(html=...)`: o Chromium
+    não precisa carregar o SPA nem chamar a API. Como o HTML só depende dos dados (e da
+    data de geração), o cache de PDFs reaproveita o PDF enquanto os dados não mudarem.
+    """
+
+    def __init__(self):
+        self.rag = RAGService()
+        self.consistencia = ConsistenciaService()
+        self.cobertura = RDQACoberturaService()
+
+    def html(
+        self,
+        session: Session,
+        relatorio: str,
+        *,
+        periodo: Optional[str] = None,
+        territorio_id: Optional[int] = None,
+    ) -> str:
+        """HTML do `relatorio` (um de `RELATORIOS`); levanta ValueError para nome desconhecido."""
+        if relatorio not in RELATORIOS:
+            raise ValueError(f"relatório inválido: {relatorio} (use {', '.join(RELATORIOS)})")
+        titulo, conteudo = getattr(self, f"_{relatorio}")(session, periodo=periodo, territorio_id=territorio_id)
+        filtros = [f"Período: {periodo or 'todos'}"]
+        if relatorio.startswith("rag_"):
+            filtros.append(f"Território: {territorio_id if territorio_id is not None else 'todos'}")
+        return _PAGINA.substitute(
+            titulo=escape(titulo),
+            css=_CSS,
+            filtros=escape(" · ".join(filtros)),
+            conteudo=conteudo,
+            gerado_em=escape(datetime.utcnow().strftime("%Y-%m-%d")),
+        )
+
+    def _linhas_detalhe(self, session: Session, secao: str, **filtros) -> Tuple[List[Dict[str, Any]], bool]:
+        """Todas as linhas da seção (paginando por keyset) até `MAX_LINHAS_RELATORIO`."""
+        itens: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            pagina = self.rag.detalhes(session, secao, limit=DEFAULT_LIMIT_DETALHES, cursor=cursor, **filtros)
+            itens += pagina.itens
+            cursor = pagina.proximo_cursor
+            if cursor is None:
+                return itens, False
+            if len(itens) >= MAX_LINHAS_RELATORIO:
+                return itens[:MAX_LINHAS_RELATORIO], True
+
+    @staticmethod
+    def _com_aviso(tabela: str, truncado: bool) -> str:
+        if not truncado:
+            return tabela
+        return tabela + f'\n<p class="aviso">Exibindo as primeiras {MAX_LINHAS_RELATORIO} linhas; refine os filtros.</p>'
+
+    def _rag_resumo(self, session: Session, **filtros) -> Tuple[str, str]:
+        itens = self.rag.resumo(session, **filtros)["itens"]
+        return "RAG — Resumo por território", _tabela(_COLUNAS_RESUMO, itens)
+
+    def _rag_financeiro(self, session: Session, **filtros) -> Tuple[str, str]:
+        itens, truncado = self._linhas_detalhe(session, "financeiro", **filtros)
+        return "RAG — Execução financeira", self._com_aviso(_tabela(_COLUNAS_FINANCEIRO, itens), truncado)
+
+    def _rag_metas(self, session: Session, **filtros) -> Tuple[str, str]:
+        itens, truncado = self._linhas_detalhe(session, "meta", **filtros)
+        return "RAG — Metas", self._com_aviso(_tabela(_COLUNAS_METAS, itens), truncado)
+
+    def _rdqa_consistencia(self, session: Session, *, periodo: Optional[str], **_) -> Tuple[str, str]:
+        itens = [
+            {"indicador": r.indicador, "pares": r.pares, "mape": r.mape}
+            for r in self.consistencia.listar_indicadores(session, periodo)
+        ]
+        return "RDQA — Consistência (MAPE por indicador)", _tabela(_COLUNAS_CONSISTENCIA, itens)
+
+    def _rdqa_cobertura(self, session: Session, *, periodo: Optional[str], **_) -> Tuple[str, str]:
+        res = self.cobertura.cobertura(session, periodo, limit=MAX_LINHAS_RELATORIO)
+        total = {
+            "indicador": "Total",
+            "total": res["total"],
+            "gerados": res["gerados"],
+            "faltantes": res["faltantes_total"],
+            "percent": res["percent"],
+        }
+        por_indicador = res["por_indicador"] + ([total] if res["por_indicador"] else [])
+        corpo = _SECAO.substitute(titulo="Por indicador", corpo=_tabela(_COLUNAS_COBERTURA, por_indicador))
+        faltantes = self._com_aviso(_tabela(_COLUNAS_FALTANTES, res["faltantes"]), res["proximo_cursor"] is not None)
+        corpo += "\n" + _SECAO.substitute(titulo="Quadros faltantes", corpo=faltantes)
+        return "RDQA — Cobertura", corpo
@@ -5,7 +5,7 @@ import json
 import uuid
 import hashlib
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, Optional, Tuple
 from zipfile import ZipFile, ZIP_DEFLATED
 
 from sqlmodel import Session, select
@@ -14,6 +14,11 @@ from app.models import dw as dw_models
 from app.models import dev_lite as dev_models
 
 
+# linhas buscadas por vez em cada tabela e tamanho aproximado dos blocos enviados
+PACOTE_YIELD_PER = 1000
+PACOTE_CHUNK_BYTES = 256 * 1024
+
+
 class ReproducibilidadeService:
     def _is_sqlite(self, session: Session) -> bool:
         return (session.get_bind().dialect.name if session.get_bind() else '') == 'sqlite'
@@ -59,61 +64,120 @@ class ReproducibilidadeService:
                     out[k] = str(v)
         return out
 
-    def _dump_query(self, session: Session, model, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        stmt = select(model)
-        try:
-            rows = session.exec(stmt).all()
-        except Exception:
-            return []
-        out: List[Dict[str, Any]] = []
-        for r in rows:
-            if hasattr(r, 'model_dump'):
-                d = r.model_dump()
-            elif hasattr(r, 'dict'):
-                d = r.dict()
-            else:
-                try:
-                    fields = r.__fields__.keys()  # type: ignore[attr-defined]
-                    d = {k: getattr(r, k) for k in fields}
-                except Exception:
-                    d = {k: v for k, v in vars(r).items() if not k.startswith('_')}
-            d = self._jsonify(d)
-            out.append(d)
-        return out
+    def _iter_linhas(self, session: Session, model) -> Iterator[Dict[str, Any]]:
+        """Linhas da tabela como dicts, lidas em blocos de `PACOTE_YIELD_PER` (cursor no servidor em Postgres).
+
+        Seleciona as colunas em vez da entidade, para as linhas não se acumularem na sessão.
+        """
+        stmt = select(*model.__table__.columns).execution_options(yield_per=PACOTE_YIELD_PER)
+        for row in session.exec(stmt):
+            yield self._jsonify(dict(row._mapping))
+
+    def pacote_stream(self, session: Session, *, periodo: Optional[str] = None) -> "PacoteStream":
+        """Pacote de reprodutibilidade como iterável de blocos do ZIP (ver `PacoteStream`)."""
+        return PacoteStream(self, session, periodo=periodo)
 
     def gerar_pacote(self, session: Session, *, periodo: Optional[str] = None) -> Tuple[bytes, str, str]:
-        models = self._models(session)
-        buf = io.BytesIO()
-        manifest: Dict[str, Any] = {
-            "schema": 1,
+        """Pacote inteiro em memória: (zip, exec_id, sha256). Para respostas HTTP use `pacote_stream`."""
+        pacote = self.pacote_stream(session, periodo=periodo)
+        zip_bytes = b"".join(pacote)
+        return zip_bytes, pacote.exec_id, pacote.sha256
+
+
+class _SaidaZip(io.RawIOBase):
+    """Destino não posicionável do ZipFile: acumula os bytes até `drenar` e calcula o SHA-256."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._sha = hashlib.sha256()
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._buf += b
+        self._sha.update(b)
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def pendente(self) -> int:
+        return len(self._buf)
+
+    def drenar(self) -> bytes:
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+    def hexdigest(self) -> str:
+        return self._sha.hexdigest()
+
+
+class PacoteStream:
+    """ZIP do pacote produzido incrementalmente, em blocos de ~`PACOTE_CHUNK_BYTES`.
+
+    Cada tabela vira `data/<tabela>.ndjson` (uma linha JSON por registro), escrita à
+    medida que o cursor avança; a memória fica limitada ao bloco corrente, não ao DW.
+    O SHA-256 do ZIP é calculado sobre os bytes enviados e fica em `sha256` ao fim da
+    iteração (o mesmo vale para `manifest`), para registro posterior da execução.
+    """
+
+    def __init__(self, service: ReproducibilidadeService, session: Session, *, periodo: Optional[str] = None):
+        self.service = service
+        self.session = session
+        self.exec_id = str(uuid.uuid4())
+        self.manifest: Dict[str, Any] = {
+            "schema": 2,
             "generated_at": datetime.utcnow().isoformat() + 'Z',
-            "exec_id": str(uuid.uuid4()),
+            "exec_id": self.exec_id,
             "periodo": periodo,
+            "format": "ndjson",
             "files": [],
         }
-        with ZipFile(buf, 'w', compression=ZIP_DEFLATED) as z:
-            # README
+        self.sha256: Optional[str] = None
+
+    def __iter__(self) -> Iterator[bytes]:
+        saida = _SaidaZip()
+        with ZipFile(saida, 'w', compression=ZIP_DEFLATED) as z:
             readme = (
                 "Pacote de Reprodutibilidade (RDQA)\n\n"
                 "Conteúdos:\n"
-                "- data/*.json: dumps das dimensões e fatos relevantes.\n"
-                "- MANIFEST.json: metadados do pacote.\n\n"
+                "- data/*.ndjson: dumps das dimensões e fatos relevantes (um objeto JSON por linha).\n"
+                "- MANIFEST.json: metadados do pacote (linhas e SHA-256 de cada arquivo).\n\n"
                 "Como usar:\n"
-                "- Importe os JSONs em seu ambiente de análise ou gere seeds a partir deles.\n"
+                "- Importe os NDJSON em seu ambiente de análise ou gere seeds a partir deles.\n"
+                "- O SHA-256 do ZIP é registrado ao fim do envio: confira em /public/verificar?exec_id=...&hash=...\n"
             )
             z.writestr('README.txt', readme)
-            manifest["files"].append({"path": "README.txt", "size": len(readme)})
-
-            # data dumps
-            for name, model in models.items():
-                data = self._dump_query(session, model)
-                j = json.dumps(data, ensure_ascii=False, indent=2)
-                path = f"data/{name}.json"
-                z.writestr(path, j)
-                manifest["files"].append({"path": path, "size": len(j)})
+            self.manifest["files"].append({"path": "README.txt", "size": len(readme.encode('utf-8'))})
 
-            z.writestr('MANIFEST.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+            for name, model in self.service._models(self.session).items():
+                path = f"data/{name}.ndjson"
+                info = {"path": path, "rows": 0, "size": 0}
+                sha = hashlib.sha256()
+                # zip64: o tamanho da tabela não é conhecido de antemão
+                with z.open(path, 'w', force_zip64=True) as f:
+                    try:
+                        for linha in self.service._iter_linhas(self.session, model):
+                            data = (json.dumps(linha, ensure_ascii=False) + "\n").encode('utf-8')
+                            f.write(data)
+                            sha.update(data)
+                            info["rows"] += 1
+                            info["size"] += len(data)
+                            if saida.pendente() >= PACOTE_CHUNK_BYTES:
+                                yield saida.drenar()
+                    except Exception as e:
+                        # tabela ausente/inacessível: segue com as demais, registrando no manifesto
+                        self.session.rollback()
+                        info["erro"] = str(e).splitlines()[0] if str(e) else e.__class__.__name__
+                info["sha256"] = sha.hexdigest()
+                self.manifest["files"].append(info)
+                if saida.pendente():
+                    yield saida.drenar()
 
-        zip_bytes = buf.getvalue()
-        pkg_hash = self._sha256_hex(zip_bytes)
-        return zip_bytes, manifest["exec_id"], pkg_hash
+            z.writestr('MANIFEST.json', json.dumps(self.manifest, ensure_ascii=False, indent=2))
+        yield saida.drenar()
+        self.sha256 = saida.hexdigest()
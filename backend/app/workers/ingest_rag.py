@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, tuple_
+from sqlmodel import Session, delete, select
+
+from app.core.db import engine
+from app.services.rag_service import RAGService
+from app.workers.ingestao import (
+    atualizar_raw,
+    concluir,
+    execucao_inalterada,
+    hash_payload,
+    registrar_raw,
+    sha256_arquivo,
+    transacao,
+)
+from app.workers.json_stream import DEFAULT_CHUNK_SIZE, JSONSecoesStream
+
+
+DEFAULT_BATCH_SIZE = 5000
+SECOES = ("financeiro", "producao", "metas")
+# tipo do ArtefatoExecucao de cada ingestão (controle de idempotência por hash)
+TIPO_ARTEFATO = "rag_ingest"
+
+# seção do payload -> chave de modelo em RAGService.modelos
+_MODELO_SECAO = {"financeiro": "financeiro", "producao": "producao", "metas": "meta"}
+_CAMPOS: Dict[str, Dict[str, Callable[[Any], Any]]] = {
+    "financeiro": {
+        "dotacao_atualizada": float,
+        "receita_realizada": float,
+        "empenhado": float,
+        "liquidado": float,
+        "pago": float,
+    },
+    "producao": {"tipo": str, "quantidade": int},
+    "metas": {"indicador": str, "meta_planejada": float, "meta_executada": float},
+}
+_OBRIGATORIOS = {"financeiro": (), "producao": ("tipo",), "metas": ("indicador",)}
+_PARTICOES_POR_DELETE = 500
+
+# callback de progresso: (linhas gravadas, itens descartados)
+Progresso = Callable[[int, int], None]
+
+
+@dataclass
+class RAGIngestResultado:
+    exec_id: uuid.UUID
+    linhas: Dict[str, int] = field(default_factory=lambda: {secao: 0 for secao in SECOES})
+    particoes: Dict[str, int] = field(default_factory=lambda: {secao: 0 for secao in SECOES})
+    descartados: int = 0
+    duracao_s: float = 0.0
+    modo: str = "bulk"
+    ignorado: bool = False
+
+    @property
+    def total(self) -> int:
+        return sum(self.linhas.values())
+
+    @property
+    def linhas_por_s(self) -> Optional[float]:
+        if self.duracao_s <= 0:
+            return None
+        return self.total / self.duracao_s
+
+    def metadados(self) -> Dict[str, Any]:
+        return {
+            "linhas": self.linhas,
+            "particoes": self.particoes,
+            "descartados": self.descartados,
+            "modo": self.modo,
+            "duracao_s": round(self.duracao_s, 6),
+            "linhas_por_s": round(self.linhas_por_s, 1) if self.linhas_por_s else None,
+        }
+
+
+def _itens_payload(payload: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    for secao in SECOES:
+        for item in payload.get(secao, []):
+            yield secao, item
+
+
+class _Territorios:
+    """Resolve `territorio_id` direto ou via `cod_ibge_municipio` (mapa carregado uma única vez)."""
+
+    def __init__(self, session: Session, model):
+        self._session = session
+        self._model = model
+        self._por_ibge: Optional[Dict[str, int]] = None
+
+    def resolver(self, item: Dict[str, Any]) -> Optional[int]:
+        tid = item.get("territorio_id")
+        if tid is not None:
+            return int(tid)
+        cod = item.get("cod_ibge_municipio")
+        if cod is None:
+            return None
+        if self._por_ibge is None:
+            rows = self._session.exec(select(self._model.cod_ibge_municipio, self._model.id)).all()
+            self._por_ibge = {str(c): i for c, i in rows}
+        return self._por_ibge.get(str(cod).strip())
+
+
+def _normalizar_item(secao: str, item: Any, periodo_ref: str, territorios: _Territorios) -> Optional[Dict[str, Any]]:
+    if not isinstance(item, dict):
+        return None
+    try:
+        territorio_id = territorios.resolver(item)
+        if territorio_id is None:
+            return None
+        row: Dict[str, Any] = {"periodo": str(item.get("periodo", periodo_ref)), "territorio_id": territorio_id}
+        for campo, conv in _CAMPOS[secao].items():
+            valor = item.get(campo)
+            row[campo] = conv(valor) if valor is not None else None
+    except (TypeError, ValueError):
+        return None
+    if any(row[c] in (None, "") for c in _OBRIGATORIOS[secao]):
+        return None
+    return row
+
+
+def _apagar_particoes(session: Session, table, particoes: Set[Tuple[str, int]]) -> None:
+    conn = session.connection()
+    ordenadas = sorted(particoes)
+    for i in range(0, len(ordenadas), _PARTICOES_POR_DELETE):
+        fatia = ordenadas[i:i + _PARTICOES_POR_DELETE]
+        conn.execute(delete(table).where(tuple_(table.c.periodo, table.c.territorio_id).in_(fatia)))
+
+
+def _ingest_bulk(
+    session: Session,
+    itens: Iterable[Tuple[str, Any]],
+    periodo_ref: str,
+    batch_size: int,
+    resultado: RAGIngestResultado,
+    progresso: Optional[Progresso] = None,
+) -> None:
+    """Grava os fatos em lotes: cada partição (periodo, territorio_id) é apagada na primeira
+    vez em que aparece na seção e depois só recebe INSERTs em lote (executemany).
+
+    Não faz commit: a substituição das partições e o resumo vão numa única transação,
+    então leitores nunca veem uma partição apagada e ainda não recarregada.
+    """
+    models = RAGService().modelos(session)
+    tables = {secao: models[_MODELO_SECAO[secao]].__table__ for secao in SECOES}
+    territorios = _Territorios(session, models["territorio"])
+    lotes: Dict[str, List[Dict[str, Any]]] = {secao: [] for secao in SECOES}
+    vistas: Dict[str, Set[Tuple[str, int]]] = {secao: set() for secao in SECOES}
+
+    def _flush(secao: str) -> None:
+        table = tables[secao]
+        lote = lotes[secao]
+        novas = {(r["periodo"], r["territorio_id"]) for r in lote} - vistas[secao]
+        if novas:
+            _apagar_particoes(session, table, novas)
+            vistas[secao] |= novas
+        if "extract_ts" in table.c:
+            agora = datetime.utcnow()
+            for r in lote:
+                r["extract_ts"] = agora
+        session.connection().execute(insert(table), lote)
+        resultado.linhas[secao] += len(lote)
+        lotes[secao] = []
+        if progresso:
+            progresso(resultado.total, resultado.descartados)
+
+    for secao, item in itens:
+        row = _normalizar_item(secao, item, periodo_ref, territorios)
+        if row is None:
+            resultado.descartados += 1
+            continue
+        lotes[secao].append(row)
+        if len(lotes[secao]) >= batch_size:
+            _flush(secao)
+    for secao in SECOES:
+        if lotes[secao]:
+            _flush(secao)
+    for secao in SECOES:
+        resultado.particoes[secao] = len(vistas[secao])
+    # resumo pré-agregado: recalcula só as partições tocadas por alguma seção
+    RAGService().atualizar_resumo(session, set().union(*vistas.values()))
+
+
+def _executar(
+    session: Session,
+    itens: Iterable[Tuple[str, Any]],
+    *,
+    hash_sha256: Optional[str],
+    fonte: str,
+    periodo_ref: str,
+    raw_payload: Dict[str, Any],
+    modo: str,
+    batch_size: int,
+    progresso: Optional[Progresso],
+    forcar: bool,
+) -> RAGIngestResultado:
+    if batch_size < 1:
+        raise ValueError("batch_size deve ser >= 1")
+    inicio = time.perf_counter()
+    if hash_sha256 and not forcar:
+        anterior = execucao_inalterada(
+            session, tipo=TIPO_ARTEFATO, hash_sha256=hash_sha256, fonte=fonte, periodo_ref=periodo_ref
+        )
+        if anterior is not None:
+            return RAGIngestResultado(exec_id=anterior, modo="inalterado", ignorado=True)
+    raw_id = registrar_raw(session, fonte=fonte, periodo_ref=periodo_ref, payload=raw_payload)
+    resultado = RAGIngestResultado(exec_id=raw_id, modo=modo)
+    _ingest_bulk(session, itens, periodo_ref, batch_size, resultado, progresso)
+    resultado.duracao_s = time.perf_counter() - inicio
+    logging.info(
+        "[ingest-rag] %s linhas em %.3fs (%.0f linhas/s)",
+        resultado.total, resultado.duracao_s, resultado.linhas_por_s or 0.0,
+    )
+    return resultado
+
+
+def ingest_rag_payload(
+    session: Session,
+    *,
+    payload: Dict[str, Any],
+    fonte: str,
+    periodo_ref: str,
+    registrar_artefato: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progresso: Optional[Progresso] = None,
+    forcar: bool = False,
+) -> RAGIngestResultado:
+    """Ingestão de fatos RAG (`financeiro`, `producao`, `metas`) a partir de dicionário.
+
+    Cada item informa `territorio_id` ou `cod_ibge_municipio` e, opcionalmente,
+    `periodo` (padrão: `periodo_ref`). As partições (periodo, territorio_id)
+    presentes em cada seção são substituídas por inteiro.
+    """
+    payload_hash = hash_payload(payload)
+    with transacao(session):
+        resultado = _executar(
+            session,
+            _itens_payload(payload),
+            hash_sha256=payload_hash,
+            fonte=fonte,
+            periodo_ref=periodo_ref,
+            raw_payload={secao: len(payload.get(secao, [])) for secao in SECOES},
+            modo="bulk",
+            batch_size=batch_size,
+            progresso=progresso,
+            forcar=forcar,
+        )
+        if not resultado.ignorado:
+            concluir(
+                session,
+                resultado,
+                tipo=TIPO_ARTEFATO,
+                registrar_artefato=registrar_artefato,
+                hash_sha256=payload_hash,
+                fonte=fonte,
+                periodo_ref=periodo_ref,
+            )
+    return resultado
+
+
+def ingest_rag_file(
+    path: Path,
+    *,
+    fonte: str,
+    periodo_ref: str,
+    registrar_artefato: bool = True,
+    modo: str = "bulk",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progresso: Optional[Progresso] = None,
+    forcar: bool = False,
+) -> RAGIngestResultado:
+    with Session(engine) as session:
+        if modo != "stream":
+            payload = json.loads(path.read_text(encoding="utf-8"))
+            return ingest_rag_payload(
+                session,
+                payload=payload,
+                fonte=fonte,
+                periodo_ref=periodo_ref,
+                registrar_artefato=registrar_artefato,
+                batch_size=batch_size,
+                progresso=progresso,
+                forcar=forcar,
+            )
+        with path.open("rb") as fp, transacao(session):
+            file_hash = sha256_arquivo(fp)
+            stream = JSONSecoesStream(fp, SECOES, chunk_size=DEFAULT_CHUNK_SIZE)
+            resultado = _executar(
+                session,
+                stream,
+                hash_sha256=file_hash,
+                fonte=fonte,
+                periodo_ref=periodo_ref,
+                raw_payload={"arquivo": path.name, "modo": "stream", "sha256": file_hash},
+                modo="stream",
+                batch_size=batch_size,
+                progresso=progresso,
+                forcar=forcar,
+            )
+            if not resultado.ignorado:
+                atualizar_raw(session, resultado.exec_id, {
+                    "arquivo": path.name,
+                    "modo": "stream",
+                    "sha256": file_hash,
+                    "linhas": resultado.linhas,
+                })
+                concluir(
+                    session,
+                    resultado,
+                    tipo=TIPO_ARTEFATO,
+                    registrar_artefato=registrar_artefato,
+                    hash_sha256=file_hash,
+                    fonte=fonte,
+                    periodo_ref=periodo_ref,
+                    extras={"arquivo": path.name, "hash_de": "arquivo"},
+                )
+        return resultado
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingestão de fatos RAG (JSON) para dw/dev.")
+    parser.add_argument("arquivo", type=Path, help="JSON com as seções 'financeiro', 'producao' e/ou 'metas'.")
+    parser.add_argument("--fonte", required=True, help="Identificador da fonte (ex.: 'rag_2024_sargsus').")
+    parser.add_argument("--periodo", required=True, help="Período padrão dos itens sem 'periodo' (ex.: 2024).")
+    parser.add_argument(
+        "--modo",
+        choices=["bulk", "stream"],
+        default="bulk",
+        help="bulk: carrega o JSON inteiro (padrão); stream: leitura incremental com memória limitada.",
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Linhas por lote de INSERT.")
+    parser.add_argument("--forcar", action="store_true", help="Reprocessa mesmo se o conteúdo já foi ingerido.")
+    parser.add_argument("--sem-progresso", action="store_true", help="Não exibir progresso no stderr.")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+
+    def _progresso(linhas: int, descartados: int) -> None:
+        decorrido = time.perf_counter() - inicio
+        taxa = linhas / decorrido if decorrido > 0 else 0.0
+        print(
+            f"\r[ingest-rag] {linhas} linhas gravadas, {descartados} descartadas ({taxa:.0f} linhas/s)",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    res = ingest_rag_file(
+        args.arquivo,
+        fonte=args.fonte,
+        periodo_ref=args.periodo,
+        modo=args.modo,
+        batch_size=args.batch_size,
+        progresso=None if args.sem_progresso else _progresso,
+        forcar=args.forcar,
+    )
+    if res.ignorado:
+        print(f"[ingest-rag] conteúdo idêntico já ingerido. exec_id={res.exec_id} (use --forcar para reprocessar)")
+        return
+    if not args.sem_progresso:
+        print(file=sys.stderr)
+    print(
+        f"[ingest-rag] concluído. exec_id={res.exec_id} linhas={res.linhas} particoes={res.particoes} "
+        f"descartados={res.descartados} duracao={res.duracao_s:.3f}s taxa={res.linhas_por_s or 0:.0f} linhas/s"
+    )
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -2,127 +2,633 @@ from __future__ import annotations
 
 import argparse
 import json
+import logging
+import sys
+import time
 import uuid
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from sqlmodel import Session, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, SQLModel, delete
 
 from app.core.db import engine
-from app.models.stage import RawIngest, RefIndicador as StageRefIndicador, CalcIndicador as StageCalcIndicador
-from app.models.dev_lite import DevRefIndicador, DevCalcIndicador
-from app.services.artefato_service import ArtefatoService
-from app.services.rdqa_export_service import RDQAExportService
+from app.models.stage import RefIndicador as StageRefIndicador, CalcIndicador as StageCalcIndicador
+from app.models.dev_lite import DevRefIndicador, DevCalcIndicador, DevConsistenciaErro, DevConsistenciaResumo
+from app.services.consistencia_service import ConsistenciaService
+from app.workers.ingestao import (
+    atualizar_raw,
+    concluir,
+    execucao_inalterada,
+    hash_payload,
+    registrar_raw,
+    sha256_arquivo,
+    transacao,
+)
+from app.workers.json_stream import DEFAULT_CHUNK_SIZE, JSONSecoesStream
+from app.workers.planilhas import LeitorPlanilha, MapeamentoColunas, formato_de
 
 
-def _hash_payload(payload: Dict[str, Any]) -> str:
-    data = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
-    return RDQAExportService.sha256_hex(data)  # reuse util
+DEFAULT_BATCH_SIZE = 5000
+SECOES = ("referencia", "calculado")
+# tipo do ArtefatoExecucao de cada ingestão (controle de idempotência por hash)
+TIPO_ARTEFATO = "rdqa_ingest"
+
+# callback de progresso: (linhas gravadas, itens descartados)
+Progresso = Callable[[int, int], None]
+
+# linhas por INSERT ... ON CONFLICT (4 parâmetros por linha; limite de variáveis do SQLite)
+_LINHAS_POR_COMANDO = 8000
+
+
+@dataclass
+class IngestResultado:
+    exec_id: uuid.UUID
+    referencia: int = 0
+    calculado: int = 0
+    descartados: int = 0
+    alterados: Optional[int] = None
+    duracao_s: float = 0.0
+    modo: str = "bulk"
+    ignorado: bool = False
+
+    @property
+    def linhas(self) -> int:
+        return self.referencia + self.calculado
+
+    @property
+    def linhas_por_s(self) -> Optional[float]:
+        if self.duracao_s <= 0:
+            return None
+        return self.linhas / self.duracao_s
+
+    @classmethod
+    def inalterado(cls, exec_id: uuid.UUID) -> "IngestResultado":
+        """Resultado no-op: o conteúdo já foi ingerido na execução `exec_id`."""
+        return cls(exec_id=exec_id, alterados=0, modo="inalterado", ignorado=True)
+
+    def metadados(self) -> Dict[str, Any]:
+        return {
+            "referencia": self.referencia,
+            "calculado": self.calculado,
+            "descartados": self.descartados,
+            "alterados": self.alterados,
+            "modo": self.modo,
+            "duracao_s": round(self.duracao_s, 6),
+            "linhas_por_s": round(self.linhas_por_s, 1) if self.linhas_por_s else None,
+        }
+
+
+def _dialect(session: Session) -> str:
+    return session.get_bind().dialect.name if session.get_bind() else ""
 
 
 def _resolve_models(session: Session):
-    dialect = session.get_bind().dialect.name if session.get_bind() else ""
-    if dialect == "sqlite":
+    if _dialect(session) == "sqlite":
         return DevRefIndicador, DevCalcIndicador
     return StageRefIndicador, StageCalcIndicador
 
 
-def ingest_rdqa_payload(
+def normalizar_item(item: Dict[str, Any], periodo_ref: str) -> Optional[Dict[str, Any]]:
+    indicador = item.get("indicador")
+    chave = item.get("chave")
+    periodo = item.get("periodo", periodo_ref)
+    valor = item.get("valor")
+    if indicador is None or chave is None or valor is None:
+        return None
+    return {"indicador": indicador, "chave": chave, "periodo": periodo, "valor": float(valor)}
+
+
+def _garantir_snapshot_sqlite(session: Session) -> None:
+    SQLModel.metadata.create_all(
+        bind=session.connection(),
+        tables=[DevConsistenciaErro.__table__, DevConsistenciaResumo.__table__],
+    )
+
+
+Chave = Tuple[str, str, str]
+
+
+def _merge_lote(session: Session, Model, rows: List[Dict[str, Any]]) -> List[Chave]:
+    """Upsert set-based de um lote em ref/calc pela chave (indicador, chave, periodo).
+
+    Só toca as linhas novas ou cujo `valor` mudou, e devolve as chaves efetivamente gravadas:
+    INSERT ... ON CONFLICT DO UPDATE ... WHERE valor IS DISTINCT FROM, nativo em Postgres e
+    SQLite (índice único da chave declarado nos modelos). Não faz commit.
+    """
+    if not rows:
+        return []
+    # ON CONFLICT não aceita a mesma chave duas vezes no mesmo comando: vale a última ocorrência
+    dedup = list({(r["indicador"], r["chave"], r["periodo"]): r for r in rows}.values())
+    table = Model.__table__
+    insert = pg_insert if _dialect(session) == "postgresql" else sqlite_insert
+    conn = session.connection()
+    alterados: List[Chave] = []
+    for i in range(0, len(dedup), _LINHAS_POR_COMANDO):
+        stmt = insert(table).values(dedup[i:i + _LINHAS_POR_COMANDO])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.indicador, table.c.chave, table.c.periodo],
+            set_={"valor": stmt.excluded.valor},
+            where=table.c.valor.is_distinct_from(stmt.excluded.valor),
+        ).returning(table.c.indicador, table.c.chave, table.c.periodo)
+        alterados += [tuple(r) for r in conn.execute(stmt).all()]
+    return alterados
+
+
+def _itens_payload(payload: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for secao in SECOES:
+        for item in payload.get(secao, []):
+            yield secao, item
+
+
+@dataclass
+class _Totais:
+    lidos: Dict[str, int] = field(default_factory=lambda: {secao: 0 for secao in SECOES})
+    alterados: Dict[str, int] = field(default_factory=lambda: {secao: 0 for secao in SECOES})
+    descartados: int = 0
+    # chaves alteradas cujo snapshot ficou a cargo do chamador (`snapshot=False`)
+    chaves: List[Chave] = field(default_factory=list)
+
+
+def ingest_bulk(
     session: Session,
-    *,
-    payload: Dict[str, Any],
-    fonte: str,
+    itens: Iterable[Tuple[str, Dict[str, Any]]],
     periodo_ref: str,
-    registrar_artefato: bool = True,
-) -> uuid.UUID:
-    """Ingestão de dados RDQA a partir de dicionário estruturado."""
-    ref_items = list(payload.get("referencia", []))
-    calc_items = list(payload.get("calculado", []))
-
-    dialect = session.get_bind().dialect.name if session.get_bind() else ""
-    use_stage_raw = dialect != "sqlite"
-    raw_id: uuid.UUID
-
-    if use_stage_raw:
-        raw = RawIngest(fonte=fonte, periodo_ref=periodo_ref, payload=payload)
-        session.add(raw)
-        session.commit()
-        session.refresh(raw)
-        raw_id = raw.id
-    else:
-        raw_id = uuid.uuid4()
+    batch_size: int,
+    progresso: Optional[Progresso] = None,
+    snapshot: bool = True,
+) -> _Totais:
+    """Consome `(secao, item)` acumulando lotes por seção; cada lote cheio é mesclado no banco.
+
+    As chaves efetivamente alteradas em cada lote atualizam o snapshot de
+    consistência (erro por par e MAPE por indicador/período). A memória fica limitada
+    a ~2 * `batch_size` itens, independente do tamanho da entrada. Não faz commit: o
+    arquivo inteiro é gravado numa única transação (ver `concluir`).
 
+    Com `snapshot=False` o snapshot não é tocado e as chaves alteradas ficam em
+    `totais.chaves`, para o chamador atualizá-lo depois do commit (ver a ingestão em
+    lote, cujos escritores concorrentes disputariam os mesmos resumos).
+    """
     RefModel, CalcModel = _resolve_models(session)
+    modelos = {"referencia": RefModel, "calculado": CalcModel}
+    if _dialect(session) == "sqlite":
+        _garantir_snapshot_sqlite(session)
+    consistencia = ConsistenciaService()
+    lotes: Dict[str, List[Dict[str, Any]]] = {secao: [] for secao in SECOES}
+    totais = _Totais()
 
-    for item in ref_items:
-        indicador = item.get("indicador")
-        chave = item.get("chave")
-        periodo = item.get("periodo", periodo_ref)
-        valor = item.get("valor")
-        if indicador is None or chave is None or valor is None:
+    def _flush(secao: str) -> None:
+        alterados = _merge_lote(session, modelos[secao], lotes[secao])
+        if snapshot:
+            # o snapshot de consistência acompanha a mesma transação dos dados
+            consistencia.atualizar_snapshot(session, alterados)
+        else:
+            totais.chaves += alterados
+        totais.lidos[secao] += len(lotes[secao])
+        totais.alterados[secao] += len(alterados)
+        lotes[secao] = []
+        if progresso:
+            progresso(sum(totais.lidos.values()), totais.descartados)
+
+    for secao, item in itens:
+        row = normalizar_item(item, periodo_ref) if isinstance(item, dict) else None
+        if row is None:
+            totais.descartados += 1
             continue
-        session.exec(
-            delete(RefModel).where(
-                RefModel.indicador == indicador,
-                RefModel.chave == chave,
-                RefModel.periodo == periodo,
-            )
-        )
-        session.add(RefModel(indicador=indicador, chave=chave, periodo=periodo, valor=float(valor)))
-
-    for item in calc_items:
-        indicador = item.get("indicador")
-        chave = item.get("chave")
-        periodo = item.get("periodo", periodo_ref)
-        valor = item.get("valor")
-        if indicador is None or chave is None or valor is None:
+        lotes[secao].append(row)
+        if len(lotes[secao]) >= batch_size:
+            _flush(secao)
+    for secao in SECOES:
+        if lotes[secao]:
+            _flush(secao)
+    return totais
+
+
+def _ingest_orm(session: Session, Model, items: Iterable[Dict[str, Any]], periodo_ref: str) -> Tuple[int, int]:
+    total = 0
+    descartados = 0
+    chaves: List[Chave] = []
+    for item in items:
+        row = normalizar_item(item, periodo_ref)
+        if row is None:
+            descartados += 1
             continue
         session.exec(
-            delete(CalcModel).where(
-                CalcModel.indicador == indicador,
-                CalcModel.chave == chave,
-                CalcModel.periodo == periodo,
+            delete(Model).where(
+                Model.indicador == row["indicador"],
+                Model.chave == row["chave"],
+                Model.periodo == row["periodo"],
             )
         )
-        session.add(CalcModel(indicador=indicador, chave=chave, periodo=periodo, valor=float(valor)))
+        session.add(Model(**row))
+        chaves.append((row["indicador"], row["chave"], row["periodo"]))
+        total += 1
+    session.flush()
+    if _dialect(session) == "sqlite":
+        _garantir_snapshot_sqlite(session)
+    ConsistenciaService().atualizar_snapshot(session, chaves)
+    return total, descartados
 
-    session.commit()
 
-    if registrar_artefato:
-        artefatos = ArtefatoService()
-        artefatos.registrar_execucao(
+def _log_resultado(resultado: IngestResultado) -> None:
+    logging.info(
+        "[ingest] %s linhas (%s) em %.3fs (%.0f linhas/s)",
+        resultado.linhas, resultado.modo, resultado.duracao_s, resultado.linhas_por_s or 0.0,
+    )
+
+
+def ingest_rdqa(
+    session: Session,
+    *,
+    payload: Dict[str, Any],
+    fonte: str,
+    periodo_ref: str,
+    registrar_artefato: bool = True,
+    bulk: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progresso: Optional[Progresso] = None,
+    forcar: bool = False,
+) -> IngestResultado:
+    """Ingestão RDQA com estatísticas de execução (linhas e linhas/s).
+
+    Se a última ingestão registrada para `fonte`/`periodo_ref` tem o mesmo hash de
+    payload, nada é gravado (use `forcar=True` para reprocessar). No modo bulk,
+    apenas as chaves novas ou com `valor` alterado são escritas.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size deve ser >= 1")
+    inicio = time.perf_counter()
+    payload_hash = hash_payload(payload)
+    if not forcar:
+        anterior = execucao_inalterada(
+            session, tipo=TIPO_ARTEFATO, hash_sha256=payload_hash, fonte=fonte, periodo_ref=periodo_ref
+        )
+        if anterior is not None:
+            return IngestResultado.inalterado(anterior)
+    with transacao(session):
+        raw_id = registrar_raw(session, fonte=fonte, periodo_ref=periodo_ref, payload=payload)
+
+        alterados: Optional[int] = None
+        if bulk:
+            totais = ingest_bulk(session, _itens_payload(payload), periodo_ref, batch_size, progresso)
+            n_ref, n_calc = totais.lidos["referencia"], totais.lidos["calculado"]
+            descartados = totais.descartados
+            alterados = sum(totais.alterados.values())
+        else:
+            RefModel, CalcModel = _resolve_models(session)
+            n_ref, d_ref = _ingest_orm(session, RefModel, payload.get("referencia", []), periodo_ref)
+            n_calc, d_calc = _ingest_orm(session, CalcModel, payload.get("calculado", []), periodo_ref)
+            descartados = d_ref + d_calc
+
+        resultado = IngestResultado(
+            exec_id=raw_id,
+            referencia=n_ref,
+            calculado=n_calc,
+            descartados=descartados,
+            alterados=alterados,
+            duracao_s=time.perf_counter() - inicio,
+            modo="bulk" if bulk else "orm",
+        )
+        _log_resultado(resultado)
+        concluir(
             session,
-            exec_id=str(raw_id),
-            hash_sha256=_hash_payload(payload),
-            tipo="rdqa_ingest",
+            resultado,
+            tipo=TIPO_ARTEFATO,
+            registrar_artefato=registrar_artefato,
+            hash_sha256=payload_hash,
             fonte=fonte,
-            periodo=periodo_ref,
-            metadados=json.dumps({"referencia": len(ref_items), "calculado": len(calc_items)}),
+            periodo_ref=periodo_ref,
         )
-    return raw_id
+    return resultado
+
 
+def ingest_rdqa_stream(
+    session: Session,
+    fp,
+    *,
+    fonte: str,
+    periodo_ref: str,
+    arquivo: Optional[str] = None,
+    registrar_artefato: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progresso: Optional[Progresso] = None,
+    forcar: bool = False,
+) -> IngestResultado:
+    """Ingestão incremental de um JSON RDQA aberto em modo binário.
 
-def ingest_rdqa_file(path: Path, *, fonte: str, periodo_ref: str, registrar_artefato: bool = True) -> uuid.UUID:
-    payload = json.loads(path.read_text(encoding="utf-8"))
+    Os arrays `referencia`/`calculado` são percorridos item a item e gravados em
+    lotes de `batch_size`, então a memória não cresce com o tamanho do arquivo.
+    O `RawIngest.payload` guarda apenas um resumo, e o hash registrado é o
+    SHA-256 dos bytes do arquivo (não do JSON canônico de `hash_payload`).
+    Em arquivos com seek, o hash é calculado antes para pular arquivos já ingeridos.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size deve ser >= 1")
+    inicio = time.perf_counter()
+    if not forcar and fp.seekable():
+        file_hash = sha256_arquivo(fp, chunk_size)
+        anterior = execucao_inalterada(
+            session, tipo=TIPO_ARTEFATO, hash_sha256=file_hash, fonte=fonte, periodo_ref=periodo_ref
+        )
+        if anterior is not None:
+            return IngestResultado.inalterado(anterior)
+    with transacao(session):
+        raw_id = registrar_raw(
+            session, fonte=fonte, periodo_ref=periodo_ref, payload={"arquivo": arquivo, "modo": "stream"}
+        )
+        stream = JSONSecoesStream(fp, SECOES, chunk_size=chunk_size)
+        totais = ingest_bulk(session, stream, periodo_ref, batch_size, progresso)
+        resultado = IngestResultado(
+            exec_id=raw_id,
+            referencia=totais.lidos["referencia"],
+            calculado=totais.lidos["calculado"],
+            descartados=totais.descartados,
+            alterados=sum(totais.alterados.values()),
+            duracao_s=time.perf_counter() - inicio,
+            modo="stream",
+        )
+        file_hash = stream.sha256.hexdigest()
+        atualizar_raw(session, raw_id, {
+            "arquivo": arquivo,
+            "modo": "stream",
+            "bytes": stream.bytes_lidos,
+            "sha256": file_hash,
+            "referencia": resultado.referencia,
+            "calculado": resultado.calculado,
+        })
+        _log_resultado(resultado)
+        concluir(
+            session,
+            resultado,
+            tipo=TIPO_ARTEFATO,
+            registrar_artefato=registrar_artefato,
+            hash_sha256=file_hash,
+            fonte=fonte,
+            periodo_ref=periodo_ref,
+            extras={"arquivo": arquivo, "bytes": stream.bytes_lidos, "hash_de": "arquivo"},
+        )
+    return resultado
+
+
+def ingest_rdqa_planilha(
+    session: Session,
+    path: Path,
+    *,
+    fonte: str,
+    periodo_ref: str,
+    mapeamento: Optional[MapeamentoColunas] = None,
+    registrar_artefato: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progresso: Optional[Progresso] = None,
+    forcar: bool = False,
+) -> IngestResultado:
+    """Ingestão de planilha CSV/XLSX pelo mesmo caminho bulk do JSON.
+
+    As linhas são lidas sob demanda e convertidas em itens conforme o
+    `MapeamentoColunas`; `RawIngest.payload` recebe só cabeçalho, amostra e
+    contagens. O hash registrado é o SHA-256 dos bytes do arquivo.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size deve ser >= 1")
+    inicio = time.perf_counter()
+    leitor = LeitorPlanilha(path, mapeamento)
+    with path.open("rb") as fp:
+        file_hash = sha256_arquivo(fp)
+    if not forcar:
+        anterior = execucao_inalterada(
+            session, tipo=TIPO_ARTEFATO, hash_sha256=file_hash, fonte=fonte, periodo_ref=periodo_ref
+        )
+        if anterior is not None:
+            return IngestResultado.inalterado(anterior)
+    with transacao(session):
+        raw_id = registrar_raw(
+            session,
+            fonte=fonte,
+            periodo_ref=periodo_ref,
+            payload={"arquivo": path.name, "formato": leitor.formato, "sha256": file_hash},
+        )
+        totais = ingest_bulk(session, leitor, periodo_ref, batch_size, progresso)
+        resultado = IngestResultado(
+            exec_id=raw_id,
+            referencia=totais.lidos["referencia"],
+            calculado=totais.lidos["calculado"],
+            descartados=totais.descartados,
+            alterados=sum(totais.alterados.values()),
+            duracao_s=time.perf_counter() - inicio,
+            modo=leitor.formato,
+        )
+        resumo = leitor.resumo()
+        atualizar_raw(session, raw_id, {**resumo, "sha256": file_hash})
+        _log_resultado(resultado)
+        concluir(
+            session,
+            resultado,
+            tipo=TIPO_ARTEFATO,
+            registrar_artefato=registrar_artefato,
+            hash_sha256=file_hash,
+            fonte=fonte,
+            periodo_ref=periodo_ref,
+            extras={"arquivo": path.name, "linhas_planilha": resumo["linhas"], "hash_de": "arquivo"},
+        )
+    return resultado
+
+
+def ingest_rdqa_payload(
+    session: Session,
+    *,
+    payload: Dict[str, Any],
+    fonte: str,
+    periodo_ref: str,
+    registrar_artefato: bool = True,
+    bulk: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> uuid.UUID:
+    """Ingestão de dados RDQA a partir de dicionário estruturado."""
+    return ingest_rdqa(
+        session,
+        payload=payload,
+        fonte=fonte,
+        periodo_ref=periodo_ref,
+        registrar_artefato=registrar_artefato,
+        bulk=bulk,
+        batch_size=batch_size,
+    ).exec_id
+
+
+def ingest_rdqa_file(path: Path, *, fonte: str, periodo_ref: str, registrar_artefato: bool = True, **opcoes) -> uuid.UUID:
+    """Ingestão de um arquivo RDQA; devolve só o `exec_id` (ver `ingest_rdqa_arquivo`)."""
+    return ingest_rdqa_arquivo(
+        path, fonte=fonte, periodo_ref=periodo_ref, registrar_artefato=registrar_artefato, **opcoes
+    ).exec_id
+
+
+def ingest_rdqa_arquivo(
+    path: Path,
+    *,
+    fonte: str,
+    periodo_ref: str,
+    registrar_artefato: bool = True,
+    modo: str = "bulk",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progresso: Optional[Progresso] = None,
+    forcar: bool = False,
+    mapeamento: Optional[MapeamentoColunas] = None,
+) -> IngestResultado:
+    """Ingestão de um arquivo JSON/CSV/XLSX numa sessão própria, com as estatísticas da execução."""
     with Session(engine) as session:
-        return ingest_rdqa_payload(
+        if formato_de(path):
+            return ingest_rdqa_planilha(
+                session,
+                path,
+                fonte=fonte,
+                periodo_ref=periodo_ref,
+                mapeamento=mapeamento,
+                registrar_artefato=registrar_artefato,
+                batch_size=batch_size,
+                progresso=progresso,
+                forcar=forcar,
+            )
+        if modo == "stream":
+            with path.open("rb") as fp:
+                return ingest_rdqa_stream(
+                    session,
+                    fp,
+                    fonte=fonte,
+                    periodo_ref=periodo_ref,
+                    arquivo=path.name,
+                    registrar_artefato=registrar_artefato,
+                    batch_size=batch_size,
+                    progresso=progresso,
+                    forcar=forcar,
+                )
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        return ingest_rdqa(
             session,
             payload=payload,
             fonte=fonte,
             periodo_ref=periodo_ref,
             registrar_artefato=registrar_artefato,
+            bulk=modo == "bulk",
+            batch_size=batch_size,
+            progresso=progresso,
+            forcar=forcar,
+        )
+
+
+def _progresso_cli(inicio: float) -> Progresso:
+    def _imprimir(linhas: int, descartados: int) -> None:
+        decorrido = time.perf_counter() - inicio
+        taxa = linhas / decorrido if decorrido > 0 else 0.0
+        print(
+            f"\r[ingest] {linhas} linhas gravadas, {descartados} descartadas ({taxa:.0f} linhas/s)",
+            end="",
+            file=sys.stderr,
+            flush=True,
         )
+    return _imprimir
+
+
+def _main_lote(args: argparse.Namespace, paths: List[Path]) -> None:
+    from app.workers.ingest_rdqa_lote import ingest_rdqa_lote
+
+    total = len(paths)
+    concluidos = []
+
+    def _progresso(res) -> None:
+        concluidos.append(res)
+        if not args.sem_progresso:
+            status = ("inalterado" if res.ignorado else "ok") if res.ok else f"erro: {res.erro}"
+            print(f"[ingest] ({len(concluidos)}/{total}) {res.arquivo}: {status}", file=sys.stderr, flush=True)
+
+    res = ingest_rdqa_lote(
+        paths,
+        fonte=args.fonte,
+        periodo_ref=args.periodo,
+        workers=args.workers,
+        conexoes=args.conexoes,
+        batch_size=args.batch_size,
+        progresso=_progresso,
+        forcar=args.forcar,
+        mapeamento=args.mapeamento,
+    )
+    falhas = sum(1 for a in res.arquivos if not a.ok)
+    print(
+        f"[ingest] lote concluído. exec_id={res.exec_id} arquivos={len(res.arquivos)} falhas={falhas} "
+        f"linhas={res.linhas} duracao={res.duracao_s:.3f}s taxa={res.linhas_por_s or 0:.0f} linhas/s"
+    )
+    if falhas:
+        sys.exit(1)
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Ingestão de planilha RDQA (JSON) para stage/dev.")
-    parser.add_argument("arquivo", type=Path, help="Caminho do arquivo JSON estruturado.")
+    parser = argparse.ArgumentParser(description="Ingestão de planilha RDQA (JSON/CSV/XLSX) para stage/dev.")
+    parser.add_argument(
+        "arquivo",
+        nargs="+",
+        help="Arquivo(s) JSON estruturado(s) ou planilha(s) CSV/XLSX, diretório(s) ou glob (ex.: 'dados/*.json').",
+    )
     parser.add_argument("--fonte", required=True, help="Identificador da fonte (ex.: 'planilha_oficial_q4').")
     parser.add_argument("--periodo", required=True, help="Período de referência (ex.: 2024-12).")
+    parser.add_argument(
+        "--modo",
+        choices=["bulk", "stream", "orm"],
+        default="bulk",
+        help=(
+            "bulk: upsert set-based por lote (padrão); stream: leitura incremental do JSON "
+            "com memória limitada; orm: DELETE + INSERT por item. Ignorado com vários arquivos."
+        ),
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Linhas por lote (bulk/stream).")
+    parser.add_argument(
+        "--mapeamento",
+        type=Path,
+        help="JSON com o contrato de colunas de CSV/XLSX (campos de MapeamentoColunas).",
+    )
+    parser.add_argument(
+        "--padrao",
+        help="Padrão de arquivos ao receber um diretório (padrão: todos os .json, .csv, .xlsx e .xlsm).",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Processos para leitura/validação (vários arquivos).")
+    parser.add_argument("--conexoes", type=int, default=2, help="Conexões simultâneas de escrita (vários arquivos).")
+    parser.add_argument("--forcar", action="store_true", help="Reprocessa mesmo se o conteúdo já foi ingerido.")
+    parser.add_argument("--sem-progresso", action="store_true", help="Não exibir progresso no stderr.")
     args = parser.parse_args()
+    args.mapeamento = MapeamentoColunas.from_file(args.mapeamento) if args.mapeamento else None
+
+    from app.workers.ingest_rdqa_lote import expandir_entradas
+
+    paths = expandir_entradas(args.arquivo, padrao=args.padrao)
+    if not paths:
+        parser.error("nenhum arquivo encontrado")
+    if len(paths) > 1 or any(Path(a).is_dir() for a in args.arquivo):
+        _main_lote(args, paths)
+        return
 
-    exec_id = ingest_rdqa_file(args.arquivo, fonte=args.fonte, periodo_ref=args.periodo)
-    print(f"[ingest] planejamento concluído. exec_id={exec_id}")
+    progresso = None if args.sem_progresso else _progresso_cli(time.perf_counter())
+    res = ingest_rdqa_arquivo(
+        paths[0],
+        fonte=args.fonte,
+        periodo_ref=args.periodo,
+        modo=args.modo,
+        batch_size=args.batch_size,
+        progresso=progresso,
+        forcar=args.forcar,
+        mapeamento=args.mapeamento,
+    )
+    if res.ignorado:
+        print(f"[ingest] conteúdo idêntico já ingerido. exec_id={res.exec_id} (use --forcar para reprocessar)")
+        return
+    if progresso:
+        print(file=sys.stderr)
+    print(
+        f"[ingest] planejamento concluído. exec_id={res.exec_id} "
+        f"linhas={res.linhas} alterados={res.alterados if res.alterados is not None else '-'} "
+        f"descartados={res.descartados} modo={res.modo} "
+        f"duracao={res.duracao_s:.3f}s taxa={res.linhas_por_s or 0:.0f} linhas/s"
+    )
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import glob
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.services.artefato_service import ArtefatoService
+from app.services.consistencia_service import ConsistenciaService
+from app.services.rdqa_export_service import RDQAExportService
+from app.workers.ingest_rdqa import (
+    DEFAULT_BATCH_SIZE,
+    SECOES,
+    TIPO_ARTEFATO,
+    Chave,
+    IngestResultado,
+    ingest_bulk,
+    normalizar_item,
+)
+from app.workers.ingestao import concluir, execucao_inalterada, hash_payload, registrar_raw, sha256_arquivo, transacao
+from app.workers.planilhas import FORMATOS, LeitorPlanilha, MapeamentoColunas, formato_de
+
+
+DEFAULT_WORKERS = 4
+# extensões aceitas ao expandir um diretório sem padrão explícito
+EXTENSOES = (".json", *FORMATOS)
+DEFAULT_CONEXOES = 2
+
+
+@dataclass
+class ArquivoPreparado:
+    """Conteúdo já validado/normalizado de um arquivo (produzido no pool de processos)."""
+
+    arquivo: str
+    hash_sha256: str
+    referencia: List[Dict[str, Any]]
+    calculado: List[Dict[str, Any]]
+    descartados: int
+
+    def itens(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for row in self.referencia:
+            yield "referencia", row
+        for row in self.calculado:
+            yield "calculado", row
+
+
+@dataclass
+class ArquivoResultado:
+    arquivo: str
+    ok: bool
+    exec_id: Optional[str] = None
+    hash_sha256: Optional[str] = None
+    referencia: int = 0
+    calculado: int = 0
+    descartados: int = 0
+    alterados: int = 0
+    ignorado: bool = False
+    erro: Optional[str] = None
+
+
+@dataclass
+class LoteResultado:
+    exec_id: uuid.UUID
+    arquivos: List[ArquivoResultado] = field(default_factory=list)
+    duracao_s: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(a.ok for a in self.arquivos)
+
+    @property
+    def linhas(self) -> int:
+        return sum(a.referencia + a.calculado for a in self.arquivos)
+
+    @property
+    def linhas_por_s(self) -> Optional[float]:
+        if self.duracao_s <= 0:
+            return None
+        return self.linhas / self.duracao_s
+
+
+def expandir_entradas(entradas: Sequence[str], padrao: Optional[str] = None) -> List[Path]:
+    """Resolve arquivos, diretórios e globs numa lista ordenada e sem repetição.
+
+    Diretórios são filtrados por `padrao`; sem padrão, entram todas as extensões
+    suportadas (`EXTENSOES`: JSON, CSV e XLSX).
+    """
+    paths: Dict[str, Path] = {}
+    for entrada in entradas:
+        p = Path(entrada)
+        if p.is_dir():
+            encontrados = sorted(
+                x for x in p.glob(padrao or "*")
+                if x.is_file() and (padrao or x.suffix.lower() in EXTENSOES)
+            )
+        elif any(ch in entrada for ch in "*?["):
+            encontrados = sorted(Path(x) for x in glob.glob(entrada, recursive=True) if Path(x).is_file())
+        else:
+            encontrados = [p]
+        for x in encontrados:
+            paths.setdefault(str(x.resolve()), x)
+    return list(paths.values())
+
+
+def _preparar_arquivo(path: str, periodo_ref: str, mapeamento: Optional[MapeamentoColunas] = None) -> ArquivoPreparado:
+    """Leitura, hash e validação de um arquivo; executa num processo do pool.
+
+    JSON usa o hash canônico do payload; CSV/XLSX usam o hash dos bytes do arquivo,
+    como na ingestão individual.
+    """
+    p = Path(path)
+    if formato_de(p):
+        itens = LeitorPlanilha(p, mapeamento)
+        with p.open("rb") as fp:
+            hash_sha256 = sha256_arquivo(fp)
+    else:
+        payload = json.loads(p.read_text(encoding="utf-8"))
+        if not isinstance(payload, dict):
+            raise ValueError("JSON deve ser um objeto com 'referencia'/'calculado'")
+        itens = ((secao, item) for secao in SECOES for item in payload.get(secao, []))
+        hash_sha256 = hash_payload(payload)
+    secoes: Dict[str, List[Dict[str, Any]]] = {secao: [] for secao in SECOES}
+    descartados = 0
+    for secao, item in itens:
+        row = normalizar_item(item, periodo_ref) if isinstance(item, dict) else None
+        if row is None:
+            descartados += 1
+            continue
+        secoes[secao].append(row)
+    return ArquivoPreparado(
+        arquivo=path,
+        hash_sha256=hash_sha256,
+        referencia=secoes["referencia"],
+        calculado=secoes["calculado"],
+        descartados=descartados,
+    )
+
+
+def _gravar_arquivo(
+    prep: ArquivoPreparado,
+    *,
+    fonte: str,
+    periodo_ref: str,
+    batch_size: int,
+    registrar_artefato: bool = True,
+    forcar: bool = False,
+    pendentes: Optional[List[Chave]] = None,
+) -> ArquivoResultado:
+    """Grava um arquivo preparado numa sessão própria (uma conexão do pool de escrita).
+
+    O artefato de cada arquivo usa a fonte `<fonte>:<arquivo>`, de modo que o
+    controle de idempotência por hash é feito arquivo a arquivo. Com `pendentes`, o
+    snapshot de consistência não é atualizado aqui: as chaves alteradas são anexadas
+    à lista depois do commit (ver `_atualizar_snapshot`).
+    """
+    nome = Path(prep.arquivo).name
+    fonte_arquivo = f"{fonte}:{nome}"
+    inicio = time.perf_counter()
+    with Session(engine) as session:
+        if not forcar:
+            anterior = execucao_inalterada(
+                session,
+                tipo=TIPO_ARTEFATO,
+                hash_sha256=prep.hash_sha256,
+                fonte=fonte_arquivo,
+                periodo_ref=periodo_ref,
+            )
+            if anterior is not None:
+                return ArquivoResultado(
+                    arquivo=nome,
+                    ok=True,
+                    exec_id=str(anterior),
+                    hash_sha256=prep.hash_sha256,
+                    ignorado=True,
+                )
+        with transacao(session):
+            raw_id = registrar_raw(
+                session,
+                fonte=fonte_arquivo,
+                periodo_ref=periodo_ref,
+                payload={
+                    "arquivo": nome,
+                    "modo": "lote",
+                    "sha256": prep.hash_sha256,
+                    "referencia": len(prep.referencia),
+                    "calculado": len(prep.calculado),
+                },
+            )
+            totais = ingest_bulk(session, prep.itens(), periodo_ref, batch_size, snapshot=pendentes is None)
+            resultado = IngestResultado(
+                exec_id=raw_id,
+                referencia=totais.lidos["referencia"],
+                calculado=totais.lidos["calculado"],
+                descartados=prep.descartados,
+                alterados=sum(totais.alterados.values()),
+                duracao_s=time.perf_counter() - inicio,
+                modo="lote",
+            )
+            logging.info("[ingest] %s: %s linhas (lote) em %.3fs", nome, resultado.linhas, resultado.duracao_s)
+            concluir(
+                session,
+                resultado,
+                tipo=TIPO_ARTEFATO,
+                registrar_artefato=registrar_artefato,
+                hash_sha256=prep.hash_sha256,
+                fonte=fonte_arquivo,
+                periodo_ref=periodo_ref,
+                extras={"arquivo": nome},
+            )
+    if pendentes is not None:
+        pendentes += totais.chaves
+    return ArquivoResultado(
+        arquivo=nome,
+        ok=True,
+        exec_id=str(raw_id),
+        hash_sha256=prep.hash_sha256,
+        referencia=resultado.referencia,
+        calculado=resultado.calculado,
+        descartados=resultado.descartados,
+        alterados=resultado.alterados or 0,
+    )
+
+
+def _atualizar_snapshot(chaves: List[Chave]) -> None:
+    """Atualiza o snapshot de consistência numa única passada, depois que todos os escritores gravaram.
+
+    Feito por arquivo, dois escritores com chaves do mesmo (indicador, periodo)
+    apagariam e reinseririam o mesmo resumo em transações concorrentes (violação de
+    unicidade ou MAPE calculado sem as linhas ainda não commitadas do outro).
+    """
+    if not chaves:
+        return
+    with Session(engine) as session:
+        ConsistenciaService().atualizar_snapshot(session, chaves)
+        session.commit()
+
+
+def _registrar_lote(resultado: LoteResultado, *, fonte: str, periodo_ref: str) -> None:
+    arquivos = sorted(resultado.arquivos, key=lambda a: a.arquivo)
+    assinatura = "\n".join(f"{a.arquivo}:{a.hash_sha256 or ''}" for a in arquivos).encode("utf-8")
+    metadados = {
+        "arquivos": [a.__dict__ for a in arquivos],
+        "total_arquivos": len(arquivos),
+        "falhas": sum(1 for a in arquivos if not a.ok),
+        "inalterados": sum(1 for a in arquivos if a.ignorado),
+        "linhas": resultado.linhas,
+        "duracao_s": round(resultado.duracao_s, 6),
+        "linhas_por_s": round(resultado.linhas_por_s, 1) if resultado.linhas_por_s else None,
+    }
+    falhas = [a.arquivo for a in arquivos if not a.ok]
+    with Session(engine) as session:
+        ArtefatoService().registrar_execucao(
+            session,
+            exec_id=str(resultado.exec_id),
+            hash_sha256=RDQAExportService.sha256_hex(assinatura),
+            tipo="rdqa_ingest_lote",
+            fonte=fonte,
+            periodo=periodo_ref,
+            metadados=json.dumps(metadados, ensure_ascii=False),
+            ok=resultado.ok,
+            mensagem=f"falha em: {', '.join(falhas)}" if falhas else None,
+        )
+
+
+def ingest_rdqa_lote(
+    paths: Sequence[Path],
+    *,
+    fonte: str,
+    periodo_ref: str,
+    workers: int = DEFAULT_WORKERS,
+    conexoes: int = DEFAULT_CONEXOES,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    registrar_artefato: bool = True,
+    progresso=None,
+    forcar: bool = False,
+    mapeamento: Optional[MapeamentoColunas] = None,
+) -> LoteResultado:
+    """Ingestão de vários arquivos: parse/validação num pool de processos e escrita por no máximo `conexoes` sessões.
+
+    Cada arquivo gera seu próprio `ArtefatoExecucao` (tipo `rdqa_ingest`) e a execução
+    inteira gera um resumo consolidado (tipo `rdqa_ingest_lote`). O snapshot de
+    consistência é atualizado uma vez, ao final. `progresso`, se informado, recebe o
+    `ArquivoResultado` de cada arquivo concluído.
+    """
+    if workers < 1 or conexoes < 1:
+        raise ValueError("workers e conexoes devem ser >= 1")
+    if engine.dialect.name == "sqlite":
+        conexoes = 1  # SQLite aceita um único escritor por vez
+    resultado = LoteResultado(exec_id=uuid.uuid4())
+    inicio = time.perf_counter()
+    lock = threading.Lock()
+    pendentes: List[Chave] = []
+    # limita quantos arquivos preparados aguardam escrita e quantos estão em leitura (memória)
+    vagas = threading.BoundedSemaphore(conexoes * 2)
+    janela = workers * 2
+
+    def _anotar(res: ArquivoResultado) -> None:
+        with lock:
+            resultado.arquivos.append(res)
+        if progresso:
+            progresso(res)
+
+    def _escrever(prep: ArquivoPreparado) -> None:
+        chaves: List[Chave] = []
+        try:
+            res = _gravar_arquivo(
+                prep,
+                fonte=fonte,
+                periodo_ref=periodo_ref,
+                batch_size=batch_size,
+                registrar_artefato=registrar_artefato,
+                forcar=forcar,
+                pendentes=chaves,
+            )
+        except Exception as exc:
+            logging.error("[ingest] falha ao gravar %s: %s", prep.arquivo, exc)
+            res = ArquivoResultado(arquivo=Path(prep.arquivo).name, ok=False, hash_sha256=prep.hash_sha256, erro=str(exc))
+        finally:
+            vagas.release()
+        with lock:
+            pendentes.extend(chaves)
+        _anotar(res)
+
+    with ProcessPoolExecutor(max_workers=workers) as procs, ThreadPoolExecutor(max_workers=conexoes) as escritores:
+        entradas = iter(paths)
+        lendo: Dict[Future, Path] = {}
+        escrevendo: Set[Future] = set()
+
+        def _submeter() -> None:
+            # submissão sob demanda: no máximo `janela` arquivos lidos/validados de uma vez
+            for p in itertools.islice(entradas, janela - len(lendo)):
+                lendo[procs.submit(_preparar_arquivo, str(p), periodo_ref, mapeamento)] = p
+
+        _submeter()
+        while lendo:
+            prontos, _ = wait(lendo, return_when=FIRST_COMPLETED)
+            for fut in prontos:
+                path = lendo.pop(fut)
+                try:
+                    prep = fut.result()
+                except Exception as exc:
+                    logging.error("[ingest] falha ao ler %s: %s", path, exc)
+                    _anotar(ArquivoResultado(arquivo=path.name, ok=False, erro=str(exc)))
+                    continue
+                vagas.acquire()
+                escrevendo.add(escritores.submit(_escrever, prep))
+            escrevendo = {f for f in escrevendo if not f.done()}
+            _submeter()
+        for fut in escrevendo:
+            fut.result()
+
+    _atualizar_snapshot(pendentes)
+    resultado.duracao_s = time.perf_counter() - inicio
+    if registrar_artefato:
+        _registrar_lote(resultado, fonte=fonte, periodo_ref=periodo_ref)
+    return resultado
@@ -0,0 +1,107 @@
+# Peças comuns às ingestões (RDQA, RDQA em lote e RAG): cada arquivo é gravado numa
+# transação (`transacao`) fechada por um único commit (`concluir`), que leva junto o
+# `ArtefatoExecucao` com o hash do conteúdo; esse hash permite pular conteúdo já
+# ingerido (`execucao_inalterada`).
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from sqlmodel import Session
+
+from app.models.stage import RawIngest
+from app.services.artefato_service import ArtefatoService
+from app.services.rdqa_export_service import RDQAExportService
+from app.workers.json_stream import DEFAULT_CHUNK_SIZE
+
+
+def _dialect(session: Session) -> str:
+    return session.get_bind().dialect.name if session.get_bind() else ""
+
+
+def hash_payload(payload: Dict[str, Any]) -> str:
+    """SHA-256 do JSON canônico (chaves ordenadas) de um payload."""
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return RDQAExportService.sha256_hex(data)
+
+
+def sha256_arquivo(fp, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """SHA-256 dos bytes de um arquivo aberto em modo binário; volta ao início."""
+    h = hashlib.sha256()
+    for bloco in iter(lambda: fp.read(chunk_size), b""):
+        h.update(bloco)
+    fp.seek(0)
+    return h.hexdigest()
+
+
+def registrar_raw(session: Session, *, fonte: str, periodo_ref: str, payload: Dict[str, Any]) -> uuid.UUID:
+    """Grava o `RawIngest` da execução (só no stage) e devolve o id usado como `exec_id`."""
+    if _dialect(session) == "sqlite":
+        return uuid.uuid4()
+    raw = RawIngest(fonte=fonte, periodo_ref=periodo_ref, payload=payload)
+    session.add(raw)
+    session.flush()
+    return raw.id
+
+
+def atualizar_raw(session: Session, raw_id: uuid.UUID, payload: Dict[str, Any]) -> None:
+    if _dialect(session) == "sqlite":
+        return
+    raw = session.get(RawIngest, raw_id)
+    if raw is not None:
+        raw.payload = payload
+        session.add(raw)
+
+
+@contextmanager
+def transacao(session: Session):
+    """Desfaz tudo o que o arquivo gravou se a ingestão falhar no meio."""
+    try:
+        yield
+    except BaseException:
+        session.rollback()
+        raise
+
+
+def execucao_inalterada(
+    session: Session, *, tipo: str, hash_sha256: str, fonte: str, periodo_ref: str
+) -> Optional[uuid.UUID]:
+    """`exec_id` da última execução `tipo` de `fonte`/`periodo_ref` se ela teve o mesmo hash; senão None."""
+    anterior = ArtefatoService().ultima_execucao(session, tipo=tipo, fonte=fonte, periodo=periodo_ref)
+    if anterior is None or anterior.hash_sha256 != hash_sha256:
+        return None
+    logging.info("[ingest] %s: conteúdo idêntico à execução %s; nada a fazer", tipo, anterior.id)
+    return uuid.UUID(anterior.id)
+
+
+def concluir(
+    session: Session,
+    resultado,
+    *,
+    tipo: str,
+    registrar_artefato: bool,
+    hash_sha256: str,
+    fonte: str,
+    periodo_ref: str,
+    extras: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Fecha a transação do arquivo: RawIngest, dados e artefato vão no mesmo commit.
+
+    `resultado` é o resultado da ingestão (`exec_id` e `metadados()`).
+    """
+    if not registrar_artefato:
+        session.commit()
+        return
+    ArtefatoService().registrar_execucao(  # registrar_execucao faz o commit
+        session,
+        exec_id=str(resultado.exec_id),
+        hash_sha256=hash_sha256,
+        tipo=tipo,
+        fonte=fonte,
+        periodo=periodo_ref,
+        metadados=json.dumps({**resultado.metadados(), **(extras or {})}),
+    )
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import codecs
+import hashlib
+import json
+from typing import Any, BinaryIO, Iterable, Iterator, Tuple
+
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+_ESPACOS = " \t\r\n"
+# caracteres que encerram um número/literal; qualquer outro pode ser a continuação do token
+_FIM_TOKEN = _ESPACOS + ",]}:"
+
+
+class JSONSecoesStream:
+    """Leitor incremental de um objeto JSON de topo com arrays grandes.
+
+    Percorre as chaves do objeto raiz e, para as chaves listadas em `secoes`
+    cujo valor é um array, devolve `(secao, item)` item a item, sem carregar o
+    array inteiro em memória. Demais chaves são lidas e descartadas. O arquivo
+    é lido em blocos de `chunk_size` bytes, e o SHA-256 do conteúdo bruto é
+    calculado durante a leitura (`sha256`, `bytes_lidos`).
+    """
+
+    def __init__(self, fp: BinaryIO, secoes: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._fp = fp
+        self._secoes = set(secoes)
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.sha256 = hashlib.sha256()
+        self.bytes_lidos = 0
+
+    def _ler(self) -> bool:
+        if self._eof:
+            return False
+        data = self._fp.read(self._chunk_size)
+        if not data:
+            self._eof = True
+            self._decoder.decode(b"", final=True)
+            return False
+        self.sha256.update(data)
+        self.bytes_lidos += len(data)
+        # descarta o prefixo já consumido para manter o buffer limitado
+        self._buf = self._buf[self._pos:] + self._decoder.decode(data)
+        self._pos = 0
+        return True
+
+    def _pular_espacos(self) -> None:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _ESPACOS:
+                self._pos += 1
+            if self._pos < len(self._buf) or not self._ler():
+                return
+
+    def _espiar(self) -> str:
+        self._pular_espacos()
+        if self._pos >= len(self._buf):
+            raise ValueError("JSON truncado")
+        return self._buf[self._pos]
+
+    def _consumir(self, esperado: str) -> str:
+        ch = self._espiar()
+        if ch not in esperado:
+            raise ValueError(f"JSON inválido: esperado um de {esperado!r}, encontrado {ch!r}")
+        self._pos += 1
+        return ch
+
+    def _token_aberto(self, end: int) -> bool:
+        return end >= len(self._buf) or self._buf[end] not in _FIM_TOKEN
+
+    def _valor(self) -> Any:
+        self._pular_espacos()
+        while True:
+            try:
+                obj, end = self._json.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._ler():
+                    continue
+                raise
+            # número/literal sem delimitador depois dele pode continuar no próximo bloco
+            # (ex.: "1." + "25" decodificaria só o 1): lê mais e decodifica de novo
+            if not isinstance(obj, (str, list, dict)) and self._token_aberto(end) and self._ler():
+                continue
+            self._pos = end
+            return obj
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        self._consumir("{")
+        if self._espiar() == "}":
+            self._pos += 1
+            return
+        while True:
+            chave = self._valor()
+            if not isinstance(chave, str):
+                raise ValueError("JSON inválido: chave do objeto raiz deve ser string")
+            self._consumir(":")
+            if chave in self._secoes and self._espiar() == "[":
+                self._pos += 1
+                if self._espiar() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield chave, self._valor()
+                        if self._consumir(",]") == "]":
+                            break
+            else:
+                self._valor()
+            if self._consumir(",}") == "}":
+                return
+
+
+def iter_secoes(fp: BinaryIO, secoes: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    return iter(JSONSecoesStream(fp, secoes, chunk_size=chunk_size))
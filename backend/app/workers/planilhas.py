@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import csv
+import json
+import re
+from dataclasses import asdict, dataclass, fields
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+FORMATOS = {".csv": "csv", ".xlsx": "xlsx", ".xlsm": "xlsx"}
+AMOSTRA_PADRAO = 5
+
+_ALIASES_SECAO = {
+    "referencia": "referencia",
+    "referência": "referencia",
+    "ref": "referencia",
+    "oficial": "referencia",
+    "calculado": "calculado",
+    "calc": "calculado",
+    "pipeline": "calculado",
+}
+
+
+@dataclass
+class MapeamentoColunas:
+    """Contrato de colunas de uma planilha RDQA.
+
+    Formato longo: uma linha por valor, com a coluna `secao` indicando
+    referência/cálculo e a coluna `valor`. Formato largo: informe
+    `valor_referencia` e/ou `valor_calculado`, e cada linha gera até dois itens.
+    `chave_formato` monta a chave a partir da célula (ex.: "mun={}").
+    Se a coluna `periodo` não existir (ou for None), vale o período de referência da ingestão.
+    `decimal` é o separador decimal dos valores em texto ("," ou "."); sem ele, CSV
+    delimitado por ";" usa "," e os demais casos recusam valores ambíguos (ver `_numero`).
+    """
+
+    indicador: str = "indicador"
+    chave: str = "chave"
+    periodo: Optional[str] = "periodo"
+    valor: Optional[str] = "valor"
+    secao: Optional[str] = "secao"
+    valor_referencia: Optional[str] = None
+    valor_calculado: Optional[str] = None
+    chave_formato: str = "{}"
+    aba: Optional[str] = None
+    delimitador: Optional[str] = None
+    decimal: Optional[str] = None
+    encoding: str = "utf-8-sig"
+
+    def __post_init__(self):
+        if self.decimal not in (None, ",", "."):
+            raise ValueError(f"separador decimal inválido: {self.decimal!r} (use ',' ou '.')")
+
+    @property
+    def largo(self) -> bool:
+        return bool(self.valor_referencia or self.valor_calculado)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MapeamentoColunas":
+        conhecidos = {f.name for f in fields(cls)}
+        desconhecidos = set(data) - conhecidos
+        if desconhecidos:
+            raise ValueError(f"mapeamento com campos desconhecidos: {', '.join(sorted(desconhecidos))}")
+        return cls(**data)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "MapeamentoColunas":
+        return cls.from_dict(json.loads(path.read_text(encoding="utf-8")))
+
+    def obrigatorias(self) -> List[str]:
+        cols = [self.indicador, self.chave]
+        if self.largo:
+            cols += [c for c in (self.valor_referencia, self.valor_calculado) if c]
+        else:
+            cols += [c for c in (self.secao, self.valor) if c]
+        return cols
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def formato_de(path: Path) -> Optional[str]:
+    return FORMATOS.get(path.suffix.lower())
+
+
+def _texto(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    if isinstance(v, datetime):
+        return v.strftime("%Y-%m")
+    if isinstance(v, date):
+        return v.strftime("%Y-%m")
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    s = str(v).strip()
+    return s or None
+
+
+def _sem_milhar(s: str, milhar: str, decimal: str) -> float:
+    inteiro, sep, fracao = s.partition(decimal)
+    if milhar in inteiro:
+        if not re.fullmatch(rf"[+-]?\d{{1,3}}(\{milhar}\d{{3}})+", inteiro):
+            raise ValueError(f"separador de milhar fora de posição: {s!r}")
+        inteiro = inteiro.replace(milhar, "")
+    return float(f"{inteiro}.{fracao}" if sep else inteiro)
+
+
+# '1.234' / '12.345.678': ponto como milhar ou como decimal?
+_AMBIGUO = re.compile(r"[+-]?\d{1,3}(\.\d{3})+")
+
+
+def _numero(v: Any, decimal: Optional[str] = None) -> Optional[float]:
+    """Converte célula numérica; `decimal` é o separador decimal dos valores em texto.
+
+    Com `decimal=","`, '1.234' vale 1234 e '1.234,5' vale 1234.5; com `decimal="."`,
+    '1,234.5' vale 1234.5. Sem `decimal`, a vírgula é decimal quando presente e,
+    sem vírgula, o ponto é decimal, mas valores como '1.234' levantam ValueError
+    (a linha vira erro) em vez de valerem 1.234 por palpite.
+    """
+    if v is None:
+        return None
+    if isinstance(v, bool):
+        raise ValueError("valor booleano")
+    if isinstance(v, (int, float)):
+        return float(v)
+    s = str(v).strip().replace(" ", "").replace(" ", "")
+    if not s:
+        return None
+    if decimal == "." or (decimal is None and "," not in s):
+        if decimal is None and _AMBIGUO.fullmatch(s):
+            raise ValueError(f"valor ambíguo: {s!r} (informe o separador decimal no mapeamento)")
+        return _sem_milhar(s, ",", ".")
+    return _sem_milhar(s, ".", ",")
+
+
+def _delimitador_csv(path: Path, mapeamento: MapeamentoColunas) -> str:
+    if mapeamento.delimitador:
+        return mapeamento.delimitador
+    with path.open("r", encoding=mapeamento.encoding, newline="") as fp:
+        amostra = fp.read(8192)
+    try:
+        return csv.Sniffer().sniff(amostra, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ";"
+
+
+def _linhas_csv(path: Path, mapeamento: MapeamentoColunas, delimitador: str) -> Iterator[Sequence[Any]]:
+    with path.open("r", encoding=mapeamento.encoding, newline="") as fp:
+        yield from csv.reader(fp, delimiter=delimitador)
+
+
+def _linhas_xlsx(path: Path, mapeamento: MapeamentoColunas) -> Iterator[Sequence[Any]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:  # pragma: no cover - depende do ambiente
+        raise RuntimeError("leitura de XLSX requer o pacote 'openpyxl'") from exc
+    # read_only: as linhas são lidas sob demanda, sem carregar a planilha inteira
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[mapeamento.aba] if mapeamento.aba else wb.active
+        yield from ws.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+class LeitorPlanilha:
+    """Leitor preguiçoso de CSV/XLSX que produz `(secao, item)` como o JSON RDQA.
+
+    Itens inválidos são produzidos como `(secao, None)` para serem contados como
+    descartados pelo caminho de ingestão. Após a leitura, `resumo()` devolve uma
+    representação compacta (cabeçalho, amostra e contagens) para `RawIngest.payload`.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        mapeamento: Optional[MapeamentoColunas] = None,
+        *,
+        formato: Optional[str] = None,
+        amostra: int = AMOSTRA_PADRAO,
+    ):
+        self.path = path
+        self.mapeamento = mapeamento or MapeamentoColunas()
+        self.formato = formato or formato_de(path)
+        if self.formato not in ("csv", "xlsx"):
+            raise ValueError(f"formato de planilha não suportado: {path.suffix or formato}")
+        self._max_amostra = amostra
+        self.colunas: List[str] = []
+        self.amostra: List[Dict[str, Any]] = []
+        self.linhas = 0
+        self.decimal: Optional[str] = self.mapeamento.decimal
+
+    def _linhas(self) -> Iterator[Sequence[Any]]:
+        self.decimal = self.mapeamento.decimal
+        if self.formato == "csv":
+            delimitador = _delimitador_csv(self.path, self.mapeamento)
+            # CSV com ";" é o layout brasileiro (DATASUS/SIOPS): vírgula decimal, ponto de milhar
+            if self.decimal is None and delimitador == ";":
+                self.decimal = ","
+            return _linhas_csv(self.path, self.mapeamento, delimitador)
+        return _linhas_xlsx(self.path, self.mapeamento)
+
+    def _item(self, row: Dict[str, Any], valor_col: str) -> Optional[Dict[str, Any]]:
+        m = self.mapeamento
+        chave = _texto(row.get(m.chave))
+        item: Dict[str, Any] = {
+            "indicador": _texto(row.get(m.indicador)),
+            "chave": m.chave_formato.format(chave) if chave is not None else None,
+            "valor": _numero(row.get(valor_col), self.decimal),
+        }
+        if m.periodo and m.periodo in row:
+            periodo = _texto(row.get(m.periodo))
+            if periodo is not None:
+                item["periodo"] = periodo
+        return item
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        m = self.mapeamento
+        linhas = self._linhas()
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        self.colunas = [_texto(c) or f"col{i}" for i, c in enumerate(cabecalho)]
+        faltando = [c for c in m.obrigatorias() if c not in self.colunas]
+        if faltando:
+            raise ValueError(f"colunas ausentes na planilha: {', '.join(faltando)}")
+
+        for valores in linhas:
+            if not any(v not in (None, "") for v in valores):
+                continue
+            row = dict(zip(self.colunas, valores))
+            self.linhas += 1
+            if len(self.amostra) < self._max_amostra:
+                self.amostra.append({k: _texto(v) for k, v in row.items()})
+            if m.largo:
+                for secao, col in (("referencia", m.valor_referencia), ("calculado", m.valor_calculado)):
+                    if not col or row.get(col) in (None, ""):
+                        continue
+                    try:
+                        yield secao, self._item(row, col)
+                    except ValueError:
+                        yield secao, None
+                continue
+            secao = _ALIASES_SECAO.get((_texto(row.get(m.secao)) or "").lower()) if m.secao else None
+            if secao is None:
+                yield "referencia", None
+                continue
+            try:
+                yield secao, self._item(row, m.valor or "valor")
+            except ValueError:
+                yield secao, None
+
+    def resumo(self) -> Dict[str, Any]:
+        return {
+            "arquivo": self.path.name,
+            "formato": self.formato,
+            "mapeamento": self.mapeamento.to_dict(),
+            "colunas": self.colunas,
+            "decimal": self.decimal,
+            "linhas": self.linhas,
+            "amostra": self.amostra,
+        }
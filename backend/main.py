@@ -13,14 +13,22 @@ from app.models.dev_lite import (
     DevArtefatoExecucao,
     DevRefIndicador,
     DevCalcIndicador,
+    DevConsistenciaErro,
+    DevConsistenciaResumo,
     DevFatoRAGFinanceiro,
     DevFatoRAGProducao,
     DevFatoRAGMeta,
+    DevRAGResumo,
 )
+from app.services.consistencia_service import ConsistenciaService
+from app.services.rag_service import RAGService
+from app.services.rdqa_export_service import RDQAExportService
+from app.services.pdf_jobs import get_jobs
 from app.models.stage import RawIngest as StageRawIngest, RefIndicador as StageRefIndicador, CalcIndicador as StageCalcIndicador
 from datetime import date
 from pathlib import Path
 from sqlalchemy import text as sa_text
+import asyncio
 import logging
 try:
     from alembic.config import Config as AlembicConfig
@@ -40,6 +48,8 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # paginação por cursor e proveniência dos exports são lidas pelo frontend
+        expose_headers=["X-Next-Cursor", "X-Exec-Id", "X-Hash"],
     )
 
     from app.core.errors import register_exception_handlers
@@ -77,10 +87,27 @@ def create_app() -> FastAPI:
                 DevArtefatoExecucao.__table__,
                 DevRefIndicador.__table__,
                 DevCalcIndicador.__table__,
+                DevConsistenciaErro.__table__,
+                DevConsistenciaResumo.__table__,
                 DevFatoRAGFinanceiro.__table__,
                 DevFatoRAGProducao.__table__,
                 DevFatoRAGMeta.__table__,
+                DevRAGResumo.__table__,
             ])
+            # create_all não cria índices em tabelas já existentes (bancos dev antigos)
+            for Model in (
+                DevRefIndicador,
+                DevCalcIndicador,
+                DevConsistenciaErro,
+                DevFatoRAGFinanceiro,
+                DevFatoRAGProducao,
+                DevFatoRAGMeta,
+            ):
+                for idx in Model.__table__.indexes:
+                    try:
+                        idx.create(bind=engine, checkfirst=True)
+                    except Exception as e:
+                        logging.warning(f"Could not create index {idx.name}: {e}")
             with Session(engine) as session:
                 try:
                     exists = session.exec(select(DevDimTerritorio).limit(1)).first()
@@ -149,6 +176,12 @@ def create_app() -> FastAPI:
                         # mun=2 em 2025-02 propositalmente ausente para demonstrar faltante
                     ])
                     session.commit()
+                # Snapshot de consistência: construído uma vez; depois a ingestão o mantém
+                try:
+                    if not session.exec(select(DevConsistenciaResumo).limit(1)).first():
+                        ConsistenciaService().reconstruir_snapshot(session)
+                except Exception as e:
+                    logging.warning(f"Could not build consistency snapshot: {e}")
                 try:
                     exists_rag_fin = session.exec(select(DevFatoRAGFinanceiro).limit(1)).first()
                 except Exception:
@@ -199,6 +232,30 @@ def create_app() -> FastAPI:
                         DevFatoRAGMeta(periodo="2024", territorio_id=2, indicador="consultas_esf", meta_planejada=11000, meta_executada=11200),
                     ])
                     session.commit()
+                # Resumo RAG pré-agregado: construído uma vez; depois a carga dos fatos o mantém
+                try:
+                    if not session.exec(select(DevRAGResumo).limit(1)).first():
+                        RAGService().reconstruir_resumo(session)
+                except Exception as e:
+                    logging.warning(f"Could not build RAG summary: {e}")
+
+    @app.on_event("startup")
+    async def _startup_pdf():
+        # jobs que estavam na fila em memória antes do reinício não serão mais processados
+        await asyncio.to_thread(get_jobs().recuperar_interrompidos)
+        # PDF_STARTUP=warm: o primeiro export não paga a resolução/lançamento do Chromium
+        if settings.pdf_startup == "warm":
+            try:
+                await RDQAExportService.aquecer()
+            except Exception as e:
+                logging.warning(f"Could not warm up PDF browser pool: {e}")
+
+    @app.on_event("shutdown")
+    async def _shutdown():
+        # encerra os jobs de exportação em andamento e fecha os navegadores do pool PDF
+        await get_jobs().fechar()
+        await RDQAExportService.fechar()
+
     return app
 
 
@@ -40,9 +40,14 @@ def seed_dev_sqlite(engine):
         DevFatoRAGFinanceiro,
         DevFatoRAGProducao,
         DevFatoRAGMeta,
+        DevRAGResumo,
         DevRefIndicador,
         DevCalcIndicador,
+        DevConsistenciaErro,
+        DevConsistenciaResumo,
     )
+    from app.services.consistencia_service import ConsistenciaService
+    from app.services.rag_service import RAGService
 
     SQLModel.metadata.create_all(bind=engine, tables=[
         DevDimTerritorio.__table__,
@@ -54,8 +59,11 @@ def seed_dev_sqlite(engine):
         DevFatoRAGFinanceiro.__table__,
         DevFatoRAGProducao.__table__,
         DevFatoRAGMeta.__table__,
+        DevRAGResumo.__table__,
         DevRefIndicador.__table__,
         DevCalcIndicador.__table__,
+        DevConsistenciaErro.__table__,
+        DevConsistenciaResumo.__table__,
     ])
 
     random.seed(42)
@@ -66,6 +74,7 @@ def seed_dev_sqlite(engine):
     with Session(engine) as session:
         # wipe
         for model in [
+            DevRAGResumo,
             DevFatoRAGMeta,
             DevFatoRAGProducao,
             DevFatoRAGFinanceiro,
@@ -240,6 +249,10 @@ def seed_dev_sqlite(engine):
             ])
         session.add_all(rag_meta_rows)
         session.commit()
+        RAGService().reconstruir_resumo(session)
+        # ref/calc foram recarregados: o snapshot de consistência (que main.py só monta
+        # quando está vazio) precisa ser refeito junto
+        ConsistenciaService().reconstruir_snapshot(session)
 
     print("[seed] SQLite-dev: dados gerados para TO — territórios, tempo, unidades, pop_faixa, fontes e equipes.")
 
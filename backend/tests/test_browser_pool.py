@@ -0,0 +1,245 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.browser_pool import BrowserPool, PoolIndisponivel
+
+
+class _Pagina:
+    def __init__(self):
+        self.fechada = False
+        self.url = "about:blank"
+        self.biscoitos = []
+
+    def isClosed(self):
+        return self.fechada
+
+    async def cookies(self):
+        return list(self.biscoitos)
+
+    async def deleteCookie(self, *cookies):
+        self.biscoitos = [c for c in self.biscoitos if c not in cookies]
+
+    async def goto(self, url):
+        self.url = url
+
+    async def close(self):
+        self.fechada = True
+
+
+class _Navegador:
+    def __init__(self):
+        self.vivo = True
+        self.paginas = []
+        self.fechado = False
+
+    def on(self, evento, cb):
+        pass
+
+    async def version(self):
+        if not self.vivo:
+            raise ConnectionError("navegador caiu")
+        return "fake"
+
+    async def newPage(self):
+        page = _Pagina()
+        self.paginas.append(page)
+        return page
+
+    async def close(self):
+        self.fechado = True
+
+
+def _pool(**kwargs):
+    lancados = []
+
+    async def lancar():
+        nav = _Navegador()
+        lancados.append(nav)
+        return nav
+
+    return BrowserPool(lancar, **kwargs), lancados
+
+
+def test_pool_limita_concorrencia_e_reaproveita_paginas():
+    pool, lancados = _pool(navegadores=2, paginas_por_navegador=2, fila_max=10)
+    ativos = {"agora": 0, "pico": 0}
+
+    async def renderizar():
+        async with pool.pagina():
+            ativos["agora"] += 1
+            ativos["pico"] = max(ativos["pico"], ativos["agora"])
+            await asyncio.sleep(0.01)
+            ativos["agora"] -= 1
+
+    async def main():
+        await asyncio.gather(*[renderizar() for _ in range(12)])
+
+    asyncio.run(main())
+    assert ativos["pico"] == 4
+    assert len(lancados) == 2
+    # páginas devolvidas voltam para o pool em vez de abrir uma por exportação
+    assert sum(len(n.paginas) for n in lancados) == 4
+    assert pool.estatisticas()["em_uso"] == 0
+
+
+def test_pool_fila_limitada():
+    pool, _ = _pool(navegadores=1, paginas_por_navegador=1, fila_max=1, espera_s=5)
+
+    async def main():
+        liberar = asyncio.Event()
+
+        async def ocupar():
+            async with pool.pagina():
+                await liberar.wait()
+
+        async def esperar():
+            async with pool.pagina():
+                pass
+
+        ocupante = asyncio.create_task(ocupar())
+        await asyncio.sleep(0)
+        na_fila = asyncio.create_task(esperar())
+        await asyncio.sleep(0)
+        with pytest.raises(PoolIndisponivel):
+            async with pool.pagina():
+                pass
+        liberar.set()
+        await asyncio.gather(ocupante, na_fila)
+
+    asyncio.run(main())
+
+
+def test_pool_relanca_navegador_que_caiu():
+    pool, lancados = _pool(navegadores=1, paginas_por_navegador=1, verificar_s=0)
+
+    async def main():
+        async with pool.pagina():
+            pass
+        lancados[0].vivo = False
+        async with pool.pagina() as page:
+            assert page in lancados[1].paginas
+
+    asyncio.run(main())
+    assert len(lancados) == 2
+    assert lancados[0].fechado
+    assert pool.relancamentos == 1
+
+
+def test_pool_descarta_pagina_apos_erro():
+    pool, lancados = _pool(navegadores=1, paginas_por_navegador=1)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            async with pool.pagina():
+                raise RuntimeError("falha ao renderizar")
+        async with pool.pagina():
+            pass
+
+    asyncio.run(main())
+    primeira, segunda = lancados[0].paginas
+    assert primeira.fechada and not segunda.fechada
+
+
+def test_pool_limpa_pagina_antes_de_reaproveitar():
+    pool, lancados = _pool(navegadores=1, paginas_por_navegador=1)
+
+    async def main():
+        async with pool.pagina() as page:
+            page.url = "data:text/html,<p>relatorio</p>"
+            page.biscoitos.append({"name": "sessao", "value": "x"})
+        async with pool.pagina() as reaproveitada:
+            assert reaproveitada is page
+            assert reaproveitada.url == "about:blank" and reaproveitada.biscoitos == []
+
+    asyncio.run(main())
+    assert len(lancados[0].paginas) == 1
+
+
+def test_pool_fecha_navegadores_do_loop_anterior():
+    pool, lancados = _pool(navegadores=1, paginas_por_navegador=1)
+
+    async def usar():
+        async with pool.pagina():
+            pass
+
+    asyncio.run(usar())
+    asyncio.run(usar())
+    assert len(lancados) == 2
+    assert lancados[0].fechado and not lancados[1].fechado
+
+
+def test_pool_aquecer_fecha_navegador_que_caiu():
+    pool, lancados = _pool(navegadores=1, paginas_por_navegador=1)
+
+    async def main():
+        await pool.aquecer()
+        pool._slots[0].vivo = False
+        assert await pool.aquecer() == 1
+
+    asyncio.run(main())
+    assert len(lancados) == 2
+    assert lancados[0].fechado and not lancados[1].fechado
+
+
+def test_pool_aquecer_lanca_navegadores_antes_do_uso():
+    pool, lancados = _pool(navegadores=2, paginas_por_navegador=2)
+
+    async def main():
+        assert await pool.aquecer() == 2
+        async with pool.pagina() as page:
+            # a página aberta no aquecimento é reaproveitada
+            assert page in lancados[0].paginas or page in lancados[1].paginas
+
+    asyncio.run(main())
+    assert len(lancados) == 2
+    assert sum(len(n.paginas) for n in lancados) == 2
+
+
+def test_api_nao_importa_pyppeteer_no_boot():
+    import os
+    import subprocess
+
+    env = {**os.environ, "DATABASE_URL": "sqlite:///./dev_test.db"}
+    saida = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print('pyppeteer' in sys.modules)"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    assert saida.stdout.strip().endswith("False")
+
+
+def test_pdf_startup_off_recusa_exportacao(monkeypatch):
+    from app.core.config import get_settings
+    from app.services.rdqa_export_service import RDQAExportService
+
+    monkeypatch.setattr(get_settings(), "pdf_startup", "off")
+    monkeypatch.setattr(RDQAExportService, "_pool", None)
+    with pytest.raises(PoolIndisponivel):
+        RDQAExportService.pool()
+
+
+def test_pdf_startup_off_rotas_respondem_503(client, monkeypatch):
+    from app.core.config import get_settings
+    from app.services.rdqa_export_service import RDQAExportService
+
+    monkeypatch.setattr(get_settings(), "pdf_startup", "off")
+    monkeypatch.setattr(RDQAExportService, "_pool", None)
+    lote = client.post("/rdqa/export/pdf/lote", json={"documentos": [{"html": "<p>x</p>"}]})
+    assert lote.status_code == 503 and "PDF_STARTUP=off" in lote.json()["detail"]
+    for prefixo in ("/rdqa", "/rag"):
+        job = client.post(f"{prefixo}/export/pdf/jobs", json={"html": "<p>x</p>"})
+        assert job.status_code == 503, prefixo
+
+
+def test_pdf_startup_invalido_e_recusado(monkeypatch):
+    from app.core.config import Settings
+
+    assert Settings(pdf_startup="warm").pdf_startup == "warm"
+    with pytest.raises(ValueError, match="PDF_STARTUP"):
+        Settings(pdf_startup="wram")
@@ -0,0 +1,64 @@
+import math
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+ROOT = Path(__file__).resolve().parents[2]
+for entry in [str(BACKEND_DIR), str(ROOT)]:
+    if entry not in sys.path:
+        sys.path.insert(0, entry)
+
+import pytest
+
+from app.services import consistencia_metricas
+
+
+REF = [
+    ("a", "mun=1", "2025-01", 100.0),
+    ("a", "mun=2", "2025-01", 50.0),
+    ("a", "mun=3", "2025-01", 0.0),    # sem erro percentual, entra em MAE/RMSE/viés
+    ("a", "mun=4", "2025-01", 10.0),   # sem cálculo
+    ("b", "mun=1", "2025-01", 200.0),
+    ("c", "mun=1", "2025-01", 1.0),    # indicador sem nenhum par
+]
+CALC = [
+    ("a", "mun=1", "2025-01", 90.0),   # 10%
+    ("a", "mun=2", "2025-01", 60.0),   # 20%
+    ("a", "mun=3", "2025-01", 5.0),
+    ("b", "mun=1", "2025-01", 300.0),  # 50%
+    ("x", "mun=9", "2025-01", 1.0),    # sem referência: ignorado
+]
+
+
+def _verificar(resultado):
+    por_ind = {m.indicador: m for m in resultado}
+    assert sorted(por_ind) == ["a", "b", "c"]
+    a = por_ind["a"]
+    assert a.pares == 2
+    assert a.mape == pytest.approx(15.0)
+    assert a.mae == pytest.approx((10 + 10 + 5) / 3)
+    assert a.rmse == pytest.approx(math.sqrt((100 + 100 + 25) / 3))
+    assert a.vies == pytest.approx((-10 + 10 + 5) / 3)
+    assert a.p50 == pytest.approx(15.0)
+    assert a.p90 == pytest.approx(19.0)
+    assert por_ind["b"].p95 == pytest.approx(50.0)
+    c = por_ind["c"]
+    assert c.pares == 0 and c.mape is None and c.mae is None
+
+
+def test_metricas_caminho_vetorizado():
+    if not consistencia_metricas.vetorizado():
+        pytest.skip("numpy indisponível")
+    _verificar(consistencia_metricas.calcular(REF, CALC))
+
+
+def test_metricas_caminho_python(monkeypatch):
+    monkeypatch.setattr(consistencia_metricas, "np", None)
+    _verificar(consistencia_metricas.calcular(REF, CALC))
+
+
+def test_metricas_agregar_pares_alinhados():
+    res = consistencia_metricas.agregar(["a", "a", "b"], [100.0, 50.0, 10.0], [110.0, None, 10.0])
+    por_ind = {m.indicador: m for m in res}
+    assert por_ind["a"].pares == 1 and por_ind["a"].mape == pytest.approx(10.0)
+    assert por_ind["b"].mape == pytest.approx(0.0)
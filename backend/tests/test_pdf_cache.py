@@ -0,0 +1,129 @@
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.pdf_cache import PDFCache
+from app.services.rdqa_export_service import RDQAExportService
+
+
+def test_chave_depende_do_conteudo_e_das_opcoes():
+    base = PDFCache.chave(html="<p>a</p>", url=None, format_="A4", margin_mm=12)
+    assert base == PDFCache.chave(html="<p>a</p>", url=None, format_="A4", margin_mm=12)
+    assert base != PDFCache.chave(html="<p>b</p>", url=None, format_="A4", margin_mm=12)
+    assert base != PDFCache.chave(html="<p>a</p>", url=None, format_="A3", margin_mm=12)
+    assert base != PDFCache.chave(html="<p>a</p>", url=None, format_="A4", margin_mm=10)
+
+
+def test_cache_expira_e_respeita_tamanho(tmp_path):
+    cache = PDFCache(tmp_path, max_bytes=2500, ttl_s=60)
+    cache.gravar("aa01", b"x" * 1000)
+    cache.gravar("bb02", b"y" * 1000)
+    assert cache.obter("aa01") == b"x" * 1000
+
+    # expirado pela data de gravação
+    antigo = time.time() - 120
+    os.utime(cache._path("bb02"), (antigo, antigo))
+    assert cache.obter("bb02") is None
+
+    # acima do limite: os mais antigos saem primeiro
+    os.utime(cache._path("aa01"), (antigo + 100, antigo + 100))
+    cache.gravar("cc03", b"z" * 1000)
+    cache.gravar("dd04", b"w" * 1000)
+    assert cache.obter("aa01") is None
+    assert cache.obter("dd04") == b"w" * 1000
+
+
+def test_cache_sobrescrita_nao_conta_duas_vezes(tmp_path):
+    cache = PDFCache(tmp_path, max_bytes=10_000, ttl_s=60)
+    cache.gravar("aa01", b"x" * 1000)
+    cache.gravar("bb02", b"y" * 1000)
+    for _ in range(20):
+        cache.gravar("aa01", b"x" * 1500)
+    assert cache._total == cache._tamanho_em_disco() == 2500
+    assert cache.obter("bb02") == b"y" * 1000
+
+
+def test_render_pdf_refaz_quando_a_renderizacao_compartilhada_e_cancelada(tmp_path, monkeypatch):
+    chamadas = []
+
+    async def fake_render(self, html, format_="A4", margin_mm=12):
+        chamadas.append(html)
+        await asyncio.sleep(0.05)
+        return b"%PDF refeito"
+
+    monkeypatch.setattr(RDQAExportService, "_cache", PDFCache(tmp_path, max_bytes=0, ttl_s=60))
+    monkeypatch.setattr(RDQAExportService, "render_pdf_from_html", fake_render)
+    svc = RDQAExportService()
+
+    async def main():
+        lider = asyncio.create_task(svc.render_pdf(html="<p>x</p>"))
+        await asyncio.sleep(0.01)
+        seguidor = asyncio.create_task(svc.render_pdf(html="<p>x</p>"))
+        await asyncio.sleep(0.01)
+        lider.cancel()
+        return await seguidor, lider.cancelled()
+
+    (pdf, _), lider_cancelado = asyncio.run(main())
+    assert lider_cancelado and pdf == b"%PDF refeito"
+    assert chamadas == ["<p>x</p>", "<p>x</p>"]
+
+
+def test_render_pdf_usa_cache_e_renderiza_uma_vez(tmp_path, monkeypatch):
+    chamadas = []
+
+    async def fake_render(self, html, format_="A4", margin_mm=12):
+        chamadas.append(html)
+        await asyncio.sleep(0.01)
+        return f"%PDF {html}".encode()
+
+    monkeypatch.setattr(RDQAExportService, "_cache", PDFCache(tmp_path, max_bytes=10_000, ttl_s=60))
+    monkeypatch.setattr(RDQAExportService, "render_pdf_from_html", fake_render)
+    svc = RDQAExportService()
+
+    async def main():
+        # requisições idênticas simultâneas compartilham a mesma renderização
+        return await asyncio.gather(*[svc.render_pdf(html="<p>x</p>") for _ in range(3)])
+
+    resultados = asyncio.run(main())
+    assert chamadas == ["<p>x</p>"]
+    assert {pdf for pdf, _ in resultados} == {b"%PDF <p>x</p>"}
+    assert sorted(hit for _, hit in resultados) == [False, True, True]
+
+    pdf, hit = asyncio.run(svc.render_pdf(html="<p>x</p>"))
+    assert hit and pdf == b"%PDF <p>x</p>"
+    assert chamadas == ["<p>x</p>"]
+
+
+def test_export_pdf_cache_hit_registra_artefato(client, tmp_path, monkeypatch):
+    from app.core.db import engine
+    from app.models.dev_lite import DevArtefatoExecucao
+    from sqlmodel import Session, SQLModel
+
+    SQLModel.metadata.create_all(bind=engine, tables=[DevArtefatoExecucao.__table__])
+
+    async def fake_render(self, html, format_="A4", margin_mm=12):
+        return b"%PDF-1.4 teste"
+
+    monkeypatch.setattr(RDQAExportService, "_cache", PDFCache(tmp_path, max_bytes=10_000, ttl_s=60))
+    monkeypatch.setattr(RDQAExportService, "render_pdf_from_html", fake_render)
+
+    payload = {"html": "<h1>RAG</h1>"}
+    primeira = client.post("/rag/export/pdf", json=payload)
+    segunda = client.post("/rag/export/pdf", json=payload)
+    assert primeira.status_code == segunda.status_code == 200
+    assert (primeira.headers["X-Cache"], segunda.headers["X-Cache"]) == ("MISS", "HIT")
+    assert primeira.headers["X-Hash"] == segunda.headers["X-Hash"]
+    assert segunda.content == b"%PDF-1.4 teste"
+    with Session(engine) as session:
+        artefato = session.get(DevArtefatoExecucao, segunda.headers["X-Exec-Id"])
+        assert artefato is not None
+        assert artefato.metadados == '{"cache": "hit"}'
+        session.delete(artefato)
+        session.delete(session.get(DevArtefatoExecucao, primeira.headers["X-Exec-Id"]))
+        session.commit()
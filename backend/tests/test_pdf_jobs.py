@@ -0,0 +1,187 @@
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.pdf_cache import PDFCache
+from app.services.rdqa_export_service import RDQAExportService
+
+
+def _preparar(tmp_path, monkeypatch, render):
+    from app.core.db import engine
+    from app.services import pdf_jobs
+    from app.models.dev_lite import DevArtefatoExecucao
+    from sqlmodel import SQLModel
+
+    SQLModel.metadata.create_all(bind=engine, tables=[DevArtefatoExecucao.__table__])
+    monkeypatch.setattr(RDQAExportService, "_cache", PDFCache(tmp_path / "cache", max_bytes=0, ttl_s=60))
+    monkeypatch.setattr(RDQAExportService, "render_pdf_from_html", render)
+    jobs = pdf_jobs.PDFJobs(tmp_path / "jobs", trabalhadores=1, fila_max=5, retencao_s=60)
+    monkeypatch.setattr(pdf_jobs, "_jobs", jobs)
+    return jobs
+
+
+def _aguardar(client, status_url, timeout=5.0):
+    fim = time.monotonic() + timeout
+    while True:
+        body = client.get(status_url).json()
+        if body["status"] in ("concluido", "erro") or time.monotonic() > fim:
+            return body
+        time.sleep(0.02)
+
+
+def _remover_artefatos(*exec_ids):
+    from app.core.db import engine
+    from app.models.dev_lite import DevArtefatoExecucao
+    from sqlmodel import Session
+
+    with Session(engine) as session:
+        for exec_id in exec_ids:
+            artefato = session.get(DevArtefatoExecucao, exec_id)
+            if artefato is not None:
+                session.delete(artefato)
+        session.commit()
+
+
+def test_job_pdf_submete_consulta_e_baixa(client, tmp_path, monkeypatch):
+    async def fake_render(self, html, format_="A4", margin_mm=12):
+        await asyncio.sleep(0.01)
+        return b"%PDF-1.4 job"
+
+    jobs = _preparar(tmp_path, monkeypatch, fake_render)
+    r = client.post("/rdqa/export/pdf/jobs", json={"html": "<h1>RDQA</h1>"})
+    assert r.status_code == 202
+    body = r.json()
+    exec_id = body["exec_id"]
+    assert r.headers["Location"] == body["status_url"] == f"/rdqa/export/jobs/{exec_id}"
+    assert body["status"] in ("pendente", "processando")
+
+    try:
+        body = _aguardar(client, body["status_url"])
+        assert body["status"] == "concluido"
+        assert body["hash"] == RDQAExportService.sha256_hex(b"%PDF-1.4 job")
+
+        pdf = client.get(body["download_url"])
+        assert pdf.status_code == 200
+        assert pdf.content == b"%PDF-1.4 job"
+        assert pdf.headers["X-Exec-Id"] == exec_id
+
+        # o job de RDQA não aparece sob /rag
+        assert client.get(f"/rag/export/jobs/{exec_id}").status_code == 404
+
+        # sem o job em memória (ex.: após reinício), o status vem do artefato
+        jobs._jobs.clear()
+        assert client.get(body["status_url"]).json()["status"] == "concluido"
+        jobs.arquivo(exec_id).unlink()
+        assert client.get(body["status_url"]).json()["status"] == "expirado"
+        assert client.get(body["download_url"]).status_code == 410
+
+        from app.core.db import engine
+        from app.models.dev_lite import DevArtefatoExecucao
+        from sqlmodel import Session
+
+        with Session(engine) as session:
+            artefato = session.get(DevArtefatoExecucao, exec_id)
+            assert artefato.tipo == "rdqa_pdf" and artefato.ok
+            assert json.loads(artefato.metadados)["status"] == "concluido"
+    finally:
+        _remover_artefatos(exec_id)
+
+
+def test_job_pdf_erro_de_renderizacao(client, tmp_path, monkeypatch):
+    async def fake_render(self, html, format_="A4", margin_mm=12):
+        raise RuntimeError("chromium indisponível")
+
+    _preparar(tmp_path, monkeypatch, fake_render)
+    r = client.post("/rag/export/pdf/jobs", json={"html": "<h1>RAG</h1>"})
+    assert r.status_code == 202
+    exec_id = r.json()["exec_id"]
+    try:
+        body = _aguardar(client, r.json()["status_url"])
+        assert body["status"] == "erro"
+        assert "chromium indisponível" in body["erro"]
+        assert client.get(body["download_url"]).status_code == 409
+    finally:
+        _remover_artefatos(exec_id)
+
+
+def test_job_pdf_valida_entrada_e_fila(client, tmp_path, monkeypatch):
+    async def fake_render(self, html, format_="A4", margin_mm=12):
+        return b"%PDF"
+
+    _preparar(tmp_path, monkeypatch, fake_render)
+    assert client.post("/rdqa/export/pdf/jobs", json={}).status_code == 400
+    assert client.get("/rdqa/export/jobs/inexistente").status_code == 404
+
+    from app.services import pdf_jobs
+
+    # sem trabalhadores, o primeiro job ocupa a única vaga da fila
+    jobs = pdf_jobs.PDFJobs(tmp_path / "jobs", trabalhadores=0, fila_max=1, retencao_s=60)
+    monkeypatch.setattr(pdf_jobs, "_jobs", jobs)
+    r = client.post("/rdqa/export/pdf/jobs", json={"html": "<p>x</p>"})
+    assert r.status_code == 202
+    try:
+        cheia = client.post("/rdqa/export/pdf/jobs", json={"html": "<p>y</p>"})
+        assert cheia.status_code == 503
+        assert cheia.headers["Retry-After"] == "5"
+        assert client.get(r.json()["status_url"]).json()["status"] == "pendente"
+    finally:
+        _remover_artefatos(r.json()["exec_id"])
+
+
+def test_job_pdf_vaga_disputada_marca_erro(client, tmp_path, monkeypatch):
+    async def fake_render(self, html, format_="A4", margin_mm=12):
+        return b"%PDF"
+
+    _preparar(tmp_path, monkeypatch, fake_render)
+    from app.services import pdf_jobs
+
+    jobs = pdf_jobs.PDFJobs(tmp_path / "jobs", trabalhadores=0, fila_max=1, retencao_s=60)
+    registrados = []
+    registrar = jobs._registrar
+    monkeypatch.setattr(jobs, "_registrar", lambda job: (registrados.append(job.exec_id), registrar(job)))
+
+    async def main():
+        # as duas passam pela checagem de fila cheia antes de qualquer uma ocupar a vaga
+        return await asyncio.gather(*[jobs.submeter(tipo="rdqa_pdf", html=f"<p>{i}</p>") for i in range(2)], return_exceptions=True)
+
+    resultados = asyncio.run(main())
+    try:
+        aceito = [r for r in resultados if isinstance(r, pdf_jobs.JobPDF)]
+        recusado = [r for r in resultados if isinstance(r, pdf_jobs.FilaCheia)]
+        assert len(aceito) == len(recusado) == 1
+        from app.core.db import engine
+        from sqlmodel import Session
+
+        with Session(engine) as session:
+            perdido = next(e for e in registrados if e != aceito[0].exec_id)
+            assert jobs.status(session, perdido)["status"] == "erro"
+            assert jobs.status(session, aceito[0].exec_id)["status"] == "pendente"
+    finally:
+        _remover_artefatos(*set(registrados))
+
+
+def test_job_pdf_interrompido_por_reinicio_vira_erro(client, tmp_path, monkeypatch):
+    async def fake_render(self, html, format_="A4", margin_mm=12):
+        return b"%PDF"
+
+    jobs = _preparar(tmp_path, monkeypatch, fake_render)
+    from app.services import pdf_jobs
+
+    antigo = pdf_jobs.JobPDF(exec_id="job-interrompido", tipo="rag_pdf", html=None, url=None, format_="A4", margin_mm=12)
+    antigo.status = pdf_jobs.PROCESSANDO
+    jobs._registrar(antigo)
+    try:
+        # novo processo: a fila em memória não conhece o job
+        novo = pdf_jobs.PDFJobs(tmp_path / "jobs", trabalhadores=1, fila_max=5, retencao_s=60)
+        assert novo.recuperar_interrompidos() == 1
+        body = client.get("/rag/export/jobs/job-interrompido").json()
+        assert body["status"] == "erro" and "reinício" in body["erro"]
+        assert novo.recuperar_interrompidos() == 0
+    finally:
+        _remover_artefatos("job-interrompido")
@@ -0,0 +1,105 @@
+import asyncio
+import io
+import json
+import sys
+import zipfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.pdf_cache import PDFCache
+from app.services.rdqa_export_service import RDQAExportService
+
+
+def test_export_pdf_lote_zip_manifest_e_artefatos(client, tmp_path, monkeypatch):
+    from app.core.db import engine
+    from app.models.dev_lite import DevArtefatoExecucao
+    from sqlmodel import Session, SQLModel
+
+    SQLModel.metadata.create_all(bind=engine, tables=[DevArtefatoExecucao.__table__])
+    ativos = {"agora": 0, "pico": 0}
+
+    async def fake_render(self, html, format_="A4", margin_mm=12):
+        ativos["agora"] += 1
+        ativos["pico"] = max(ativos["pico"], ativos["agora"])
+        await asyncio.sleep(0.01)
+        ativos["agora"] -= 1
+        if "falha" in html:
+            raise RuntimeError("conteúdo inválido")
+        return f"%PDF {html}".encode()
+
+    monkeypatch.setattr(RDQAExportService, "_cache", PDFCache(tmp_path, max_bytes=0, ttl_s=60))
+    monkeypatch.setattr(RDQAExportService, "render_pdf_from_html", fake_render)
+
+    documentos = [{"nome": "Município A", "html": f"<p>{i}</p>"} for i in range(6)] + [{"html": "<p>falha</p>"}]
+    r = client.post("/rdqa/export/pdf/lote", json={"documentos": documentos})
+    assert r.status_code == 200
+    assert r.headers["X-Documentos-Erro"] == "1"
+    assert r.headers["X-Hash"] == RDQAExportService.sha256_hex(r.content)
+    # renderizações em paralelo, limitadas à capacidade do pool
+    assert 1 < ativos["pico"] <= RDQAExportService.pool().capacidade
+
+    with zipfile.ZipFile(io.BytesIO(r.content)) as z:
+        manifest = json.loads(z.read("MANIFEST.json"))
+        docs = manifest["documentos"]
+        assert [d["arquivo"] for d in docs[:3]] == ["Município_A.pdf", "Município_A-2.pdf", "Município_A-3.pdf"]
+        assert z.read(docs[0]["arquivo"]) == b"%PDF <p>0</p>"
+        assert docs[0]["hash"] == RDQAExportService.sha256_hex(b"%PDF <p>0</p>")
+        assert not docs[-1]["ok"] and "conteúdo inválido" in docs[-1]["erro"]
+        assert docs[-1]["arquivo"] not in z.namelist()
+
+    with Session(engine) as session:
+        ids = [d["exec_id"] for d in docs] + [r.headers["X-Exec-Id"]]
+        rows = [session.get(DevArtefatoExecucao, i) for i in ids]
+        assert all(rows)
+        assert rows[0].hash_sha256 == docs[0]["hash"] and rows[0].ok
+        assert not rows[-2].ok and rows[-1].tipo == "rdqa_pdf_lote"
+        for row in rows:
+            session.delete(row)
+        session.commit()
+
+    assert client.post("/rdqa/export/pdf/lote", json={"documentos": [{"nome": "x"}]}).status_code == 400
+
+
+def test_export_pdf_lote_zip_em_disco_e_fechado(client, tmp_path, monkeypatch):
+    import tempfile
+
+    from app.core.db import engine
+    from app.models.dev_lite import DevArtefatoExecucao
+    from app.services import rdqa_export_service
+    from sqlmodel import Session, SQLModel
+
+    SQLModel.metadata.create_all(bind=engine, tables=[DevArtefatoExecucao.__table__])
+
+    async def fake_render(self, html, format_="A4", margin_mm=12):
+        return b"%PDF " + html.encode() * 200
+
+    criados = []
+    spooled = tempfile.SpooledTemporaryFile
+
+    def _registrar(*args, **kwargs):
+        criados.append(spooled(*args, **kwargs))
+        return criados[-1]
+
+    monkeypatch.setattr(RDQAExportService, "_cache", PDFCache(tmp_path, max_bytes=0, ttl_s=60))
+    monkeypatch.setattr(RDQAExportService, "render_pdf_from_html", fake_render)
+    monkeypatch.setattr(rdqa_export_service, "_ZIP_EM_MEMORIA", 1024)
+    monkeypatch.setattr(tempfile, "SpooledTemporaryFile", _registrar)
+
+    documentos = [{"html": f"<p>{i}</p>"} for i in range(20)]
+    r = client.post("/rdqa/export/pdf/lote", json={"documentos": documentos})
+    assert r.status_code == 200
+    assert r.headers["X-Hash"] == RDQAExportService.sha256_hex(r.content)
+    # o ZIP passou para o disco e o temporário foi fechado ao fim da resposta
+    assert len(criados) == 1 and criados[0]._rolled and criados[0].closed
+    with zipfile.ZipFile(io.BytesIO(r.content)) as z:
+        docs = json.loads(z.read("MANIFEST.json"))["documentos"]
+        assert [d["arquivo"] for d in docs] == [f"documento-{i + 1:04d}.pdf" for i in range(20)]
+        assert z.read("documento-0020.pdf") == b"%PDF " + b"<p>19</p>" * 200
+
+    with Session(engine) as session:
+        for exec_id in [d["exec_id"] for d in docs] + [r.headers["X-Exec-Id"]]:
+            session.delete(session.get(DevArtefatoExecucao, exec_id))
+        session.commit()
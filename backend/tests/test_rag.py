@@ -37,8 +37,99 @@ def test_rag_metas_cumprida_flag(client: TestClient):
     assert "cumprida" in rows[0]
 
 
+def test_rag_detalhes_paginados_por_keyset(client: TestClient):
+    todos = client.get("/rag/producao").json()
+    assert len(todos) >= 2
+    assert [(r["periodo"], r["territorio_id"]) for r in todos] == sorted((r["periodo"], r["territorio_id"]) for r in todos)
+
+    paginas, cursor = [], None
+    while True:
+        params = {"limit": 1, **({"cursor": cursor} if cursor else {})}
+        resp = client.get("/rag/producao", params=params)
+        assert resp.status_code == 200
+        if cursor is None:
+            assert int(resp.headers["X-Total-Count"]) == len(todos)
+            assert resp.headers["X-Total-Count-Estimated"] == "false"
+        paginas += resp.json()
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert paginas == todos
+
+    assert client.get("/rag/producao", params={"cursor": "%%%"}).status_code == 400
+
+
+def test_rag_detalhes_projecao_de_campos(client: TestClient):
+    resp = client.get("/rag/metas", params={"fields": "cumprida,indicador"})
+    assert resp.status_code == 200
+    rows = resp.json()
+    assert rows
+    assert all(list(r) == ["indicador", "cumprida"] for r in rows)
+    assert client.get("/rag/metas", params={"fields": "pago"}).status_code == 400
+
+
 def test_rag_export_pdf_requer_html_ou_url(client: TestClient):
     resp = client.post("/rag/export/pdf", json={})
     assert resp.status_code == 400
     data = resp.json()
     assert data["detail"] == "informe 'html' ou 'url'"
+
+
+def test_rag_resumo_agregado_no_banco(client: TestClient):
+    from app.core.db import engine
+    from app.models.dev_lite import DevFatoRAGFinanceiro, DevFatoRAGMeta, DevFatoRAGProducao, DevRAGResumo
+    from app.services.rag_service import RAGService
+    from sqlmodel import Session, delete
+
+    periodo = "2099"
+    modelos = (DevFatoRAGFinanceiro, DevFatoRAGProducao, DevFatoRAGMeta, DevRAGResumo)
+    with Session(engine) as session:
+        session.add_all([
+            DevFatoRAGFinanceiro(periodo=periodo, territorio_id=1, dotacao_atualizada=200.0, pago=50.0),
+            DevFatoRAGFinanceiro(periodo=periodo, territorio_id=2, dotacao_atualizada=0.0, pago=10.0),
+            DevFatoRAGProducao(periodo=periodo, territorio_id=1, tipo="a", quantidade=3),
+            DevFatoRAGProducao(periodo=periodo, territorio_id=1, tipo="b", quantidade=None),
+            DevFatoRAGProducao(periodo=periodo, territorio_id=1, tipo="c", quantidade=4),
+            DevFatoRAGMeta(periodo=periodo, territorio_id=1, indicador="x", meta_planejada=10, meta_executada=12),
+            DevFatoRAGMeta(periodo=periodo, territorio_id=1, indicador="y", meta_planejada=10, meta_executada=8),
+            DevFatoRAGMeta(periodo=periodo, territorio_id=1, indicador="z", meta_planejada=0, meta_executada=8),
+            DevFatoRAGMeta(periodo=periodo, territorio_id=3, indicador="x", meta_planejada=1, meta_executada=1),
+        ])
+        session.commit()
+    try:
+        # inserção direta nos fatos não passa pela carga: só `fresh` enxerga os dados
+        data = client.get("/rag/resumo", params={"periodo": periodo, "fresh": True}).json()
+        assert data["periodos"] == [periodo]
+        itens = {i["territorio_id"]: i for i in data["itens"]}
+        assert sorted(itens) == [1, 2, 3]
+        t1 = itens[1]
+        assert t1["execucao_percentual"] == 25.0
+        assert t1["producao_total"] == 7
+        assert (t1["metas_cumpridas"], t1["metas_total"]) == (1, 3)
+        assert t1["territorio_nome"] == "Municipio A"
+        assert itens[2]["execucao_percentual"] is None
+        # território só com metas: valores financeiros zerados
+        assert itens[3]["dotacao_atualizada"] == 0.0 and itens[3]["metas_cumpridas"] == 1
+
+        # o resumo pré-agregado, atualizado só nas partições tocadas, coincide com o recálculo
+        with Session(engine) as session:
+            assert RAGService().atualizar_resumo(session, [(periodo, 1), (periodo, 2), (periodo, 3)]) == 3
+            session.commit()
+        assert client.get("/rag/resumo", params={"periodo": periodo}).json() == data
+    finally:
+        with Session(engine) as session:
+            for Model in modelos:
+                session.exec(delete(Model).where(Model.periodo == periodo))
+            session.commit()
+
+
+def test_cursor_compartilhado_valida_aridade_e_tipos():
+    import pytest
+    from app.services.cursor import codificar_cursor, decodificar_cursor
+
+    cursor = codificar_cursor(("2024", 7, 42))
+    assert "=" not in cursor
+    assert decodificar_cursor(cursor, (str, int, int)) == ("2024", 7, 42)
+    for invalido in (codificar_cursor(("2024", 7)), codificar_cursor(("2024", "x", 1)), "%%%"):
+        with pytest.raises(ValueError, match="cursor inválido"):
+            decodificar_cursor(invalido, (str, int, int))
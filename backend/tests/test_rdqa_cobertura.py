@@ -1,14 +1,19 @@
 from fastapi.testclient import TestClient
 from backend.main import app
 from app.core.db import engine
-from sqlmodel import Session, select
+from sqlmodel import Session, SQLModel, select
 from app.models.dev_lite import DevRefIndicador, DevCalcIndicador
 
 
 client = TestClient(app)
 
 
+def _garantir_tabelas():
+    SQLModel.metadata.create_all(bind=engine, tables=[DevRefIndicador.__table__, DevCalcIndicador.__table__])
+
+
 def seed_cobertura(periodo: str = "2025-02"):
+    _garantir_tabelas()
     with Session(engine) as session:
         # limpar
         for model in (DevRefIndicador, DevCalcIndicador):
@@ -41,3 +46,67 @@ def test_rdqa_cobertura_percent_and_missing():
     faltantes = body["faltantes"]
     assert any(it["quadro"].endswith("mun=3") and it["motivo"] == "sem dados" for it in faltantes)
 
+
+
+def test_rdqa_cobertura_faltantes_paginados_por_indicador():
+    seed_cobertura()
+    with Session(engine) as session:
+        session.add_all([
+            DevRefIndicador(indicador="cov_esf", chave="mun=1", periodo="2025-02", valor=1.0),
+            DevRefIndicador(indicador="cov_esf", chave="mun=2", periodo="2025-02", valor=1.0),
+        ])
+        session.commit()
+
+    quadros, cursor = [], None
+    while True:
+        params = {"periodo": "2025-02", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/rdqa/cobertura", params=params)
+        body = r.json()
+        assert body["total"] == 5 and body["faltantes_total"] == 3
+        assert "proximo_cursor" not in body
+        quadros += [it["quadro"] for it in body["faltantes"]]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert quadros == ["cov_aps:mun=3", "cov_esf:mun=1", "cov_esf:mun=2"]
+
+    por_ind = {g["indicador"]: g for g in body["por_indicador"]}
+    assert por_ind["cov_aps"]["faltantes"] == 1
+    assert por_ind["cov_esf"]["gerados"] == 0 and por_ind["cov_esf"]["percent"] == 0.0
+
+    r = client.get("/rdqa/cobertura", params={"periodo": "2025-02", "indicador": "cov_esf"})
+    assert r.json()["total"] == 2
+    assert client.get("/rdqa/cobertura", params={"cursor": "nao-e-cursor"}).status_code == 400
+
+
+def test_rdqa_cobertura_breakdown_com_rollups():
+    seed_cobertura()
+    with Session(engine) as session:
+        session.add_all([
+            DevRefIndicador(indicador="cov_esf", chave="mun=1;eq=10", periodo="2025-02", valor=1.0),
+            DevRefIndicador(indicador="cov_esf", chave="mun=1;eq=11", periodo="2025-02", valor=1.0),
+            DevCalcIndicador(indicador="cov_esf", chave="mun=1;eq=10", periodo="2025-02", valor=1.0),
+        ])
+        session.commit()
+
+    r = client.get("/rdqa/cobertura/breakdown", params={"periodo": "2025-02"})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["niveis"] == ["indicador+territorio+periodo", "indicador", "territorio", "periodo", "total"]
+    grupos = {(g["nivel"], g["indicador"], g["territorio"], g["periodo"]): g for g in body["grupos"]}
+
+    total = grupos[("total", None, None, None)]
+    assert (total["total"], total["gerados"]) == (5, 3)
+    # território é o prefixo da chave: as duas equipes de mun=1 somam com o cov_aps mun=1
+    mun1 = grupos[("territorio", None, "mun=1", None)]
+    assert (mun1["total"], mun1["gerados"]) == (3, 2)
+    celula = grupos[("indicador+territorio+periodo", "cov_esf", "mun=1", "2025-02")]
+    assert celula["faltantes"] == 1 and abs(celula["percent"] - 50.0) < 1e-6
+
+    r = client.get("/rdqa/cobertura/breakdown", params={"periodo": "2025-02", "niveis": ["periodo,indicador", "total"]})
+    assert r.json()["niveis"] == ["indicador+periodo", "total"]
+    assert len(r.json()["grupos"]) == 3
+
+    assert client.get("/rdqa/cobertura/breakdown", params={"niveis": "uf"}).status_code == 400
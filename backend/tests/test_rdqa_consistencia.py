@@ -1,14 +1,24 @@
 from fastapi.testclient import TestClient
 from backend.main import app
 from app.core.db import engine
-from sqlmodel import Session, select
-from app.models.dev_lite import DevRefIndicador, DevCalcIndicador
+from sqlmodel import Session, SQLModel, select
+from app.models.dev_lite import DevRefIndicador, DevCalcIndicador, DevConsistenciaErro, DevConsistenciaResumo
 
 
 client = TestClient(app)
 
 
+def _garantir_tabelas():
+    SQLModel.metadata.create_all(bind=engine, tables=[
+        DevRefIndicador.__table__,
+        DevCalcIndicador.__table__,
+        DevConsistenciaErro.__table__,
+        DevConsistenciaResumo.__table__,
+    ])
+
+
 def seed_indicadores(periodo: str = "2025-01"):
+    _garantir_tabelas()
     with Session(engine) as session:
         # limpar entradas anteriores do período/indicador para tornar o teste idempotente
         for model in (DevRefIndicador, DevCalcIndicador):
@@ -47,3 +57,187 @@ def test_consistencia_mape_list_and_details():
     assert any(d["chave"] == "mun=1" and abs(d["erro_pct"] - 10.0) < 1e-6 for d in details)
     assert any(d["chave"] == "mun=2" and abs(d["erro_pct"] - 20.0) < 1e-6 for d in details)
 
+
+
+def test_consistencia_sql_equivale_ao_fallback_python():
+    from app.services.consistencia_service import ConsistenciaService
+
+    periodo = "2025-02"
+    _garantir_tabelas()
+    with Session(engine) as session:
+        for model in (DevRefIndicador, DevCalcIndicador):
+            for r in session.exec(select(model).where(model.indicador.in_(["cov_sql", "cov_vazio"]), model.periodo == periodo)).all():
+                session.delete(r)
+        session.commit()
+        session.add_all([
+            DevRefIndicador(indicador="cov_sql", chave="mun=1", periodo=periodo, valor=200.0),
+            DevRefIndicador(indicador="cov_sql", chave="mun=2", periodo=periodo, valor=0.0),    # ignorado (div/0)
+            DevRefIndicador(indicador="cov_sql", chave="mun=3", periodo=periodo, valor=10.0),   # sem cálculo
+            DevRefIndicador(indicador="cov_vazio", chave="mun=1", periodo=periodo, valor=1.0),
+            DevCalcIndicador(indicador="cov_sql", chave="mun=1", periodo=periodo, valor=150.0),  # 25%
+            DevCalcIndicador(indicador="cov_sql", chave="mun=2", periodo=periodo, valor=5.0),
+        ])
+        session.commit()
+
+        svc = ConsistenciaService()
+        via_sql = {r.indicador: r for r in svc._listar_sql(session, periodo)}
+        via_python = {r.indicador: r for r in svc._listar_python(session, periodo)}
+
+    assert via_sql.keys() == via_python.keys()
+    for ind, r in via_sql.items():
+        assert r.pares == via_python[ind].pares
+        assert (r.mape is None) == (via_python[ind].mape is None)
+    assert via_sql["cov_sql"].pares == 1
+    assert abs(via_sql["cov_sql"].mape - 25.0) < 1e-6
+    assert via_sql["cov_vazio"].mape is None and via_sql["cov_vazio"].pares == 0
+
+
+def test_consistencia_detalhes_paginados_por_cursor():
+    from app.services.consistencia_service import ConsistenciaService
+
+    periodo = "2025-03"
+    _garantir_tabelas()
+    with Session(engine) as session:
+        for model in (DevRefIndicador, DevCalcIndicador):
+            for r in session.exec(select(model).where(model.indicador == "cov_pag", model.periodo == periodo)).all():
+                session.delete(r)
+        session.commit()
+        # erros: mun=1 10%, mun=2 30%, mun=3 30%, mun=4 5%, mun=5 sem cálculo
+        refs = {"mun=1": 100.0, "mun=2": 100.0, "mun=3": 100.0, "mun=4": 100.0, "mun=5": 100.0}
+        calcs = {"mun=1": 110.0, "mun=2": 70.0, "mun=3": 130.0, "mun=4": 95.0}
+        session.add_all([DevRefIndicador(indicador="cov_pag", chave=k, periodo=periodo, valor=v) for k, v in refs.items()])
+        session.add_all([DevCalcIndicador(indicador="cov_pag", chave=k, periodo=periodo, valor=v) for k, v in calcs.items()])
+        session.commit()
+
+    chaves, cursor = [], None
+    while True:
+        params = {"periodo": periodo, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/rdqa/consistencia/cov_pag/detalhes", params=params)
+        assert r.status_code == 200
+        page = r.json()
+        assert len(page) <= 2
+        chaves += [d["chave"] for d in page]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert chaves == ["mun=2", "mun=3", "mun=1", "mun=4", "mun=5"]
+
+    r = client.get("/rdqa/consistencia/cov_pag/detalhes", params={"periodo": periodo, "min_erro_pct": 10})
+    assert [d["chave"] for d in r.json()] == ["mun=2", "mun=3", "mun=1"]
+    assert "X-Next-Cursor" not in r.headers
+
+    r = client.get("/rdqa/consistencia/cov_pag/detalhes", params={"cursor": "nao-e-um-cursor"})
+    assert r.status_code == 400
+
+    # fallback em Python (heap) produz a mesma paginação do SQL
+    svc = ConsistenciaService()
+    with Session(engine) as session:
+        sql = svc._drill_down_sql(session, "cov_pag", periodo, 3, None, None)
+        py = svc._drill_down_python(session, "cov_pag", periodo, 3, None, None)
+        assert sql.itens == py.itens
+        assert sql.proximo_cursor == py.proximo_cursor
+
+
+def test_consistencia_metricas_estendidas():
+    seed_indicadores()
+    r = client.get("/rdqa/consistencia", params={"periodo": "2025-01", "metricas": True})
+    assert r.status_code == 200
+    row = next(x for x in r.json() if x["indicador"] == "cov_aps")
+    assert abs(row["mape"] - 15.0) < 1e-6
+    assert abs(row["mae"] - 10.0) < 1e-6
+    assert abs(row["vies"] - 0.0) < 1e-6
+    assert abs(row["p50"] - 15.0) < 1e-6
+
+
+def test_consistencia_metricas_sql_e_snapshot_equivalem_ao_python():
+    from app.services.consistencia_service import ConsistenciaService
+
+    seed_indicadores()
+    svc = ConsistenciaService()
+    with Session(engine) as session:
+        svc.reconstruir_snapshot(session, "2025-01")
+        via_sql = {r.indicador: r for r in svc._metricas_sql(session, "2025-01")}
+        via_python = {r.indicador: r for r in svc._listar_python(session, "2025-01")}
+        via_snapshot = {r.indicador: r for r in svc.listar_materializado(session, "2025-01", metricas=True)}
+    assert via_sql.keys() == via_python.keys() == via_snapshot.keys()
+    for ind, r in via_sql.items():
+        for outro in (via_python[ind], via_snapshot[ind]):
+            assert r.pares == outro.pares
+            for campo in ("mape", "mae", "rmse", "vies", "p50", "p90", "p95"):
+                a, b = getattr(r, campo), getattr(outro, campo)
+                assert (a is None and b is None) or abs(a - b) < 1e-9, (ind, campo)
+
+
+def test_consistencia_listar_fallback_so_para_erro_de_dialeto(monkeypatch):
+    import pytest
+    from sqlalchemy.exc import OperationalError
+    from app.services.consistencia_service import ConsistenciaService
+
+    seed_indicadores()
+    svc = ConsistenciaService()
+
+    def _sem_janela(self, session, periodo):
+        raise OperationalError("SELECT ...", {}, Exception("no such function: percentile"))
+
+    monkeypatch.setattr(ConsistenciaService, "_listar_sql", _sem_janela)
+    with Session(engine) as session:
+        itens = {r.indicador: r for r in svc.listar_indicadores(session, "2025-01")}
+    assert abs(itens["cov_aps"].mape - 15.0) < 1e-6
+
+    def _bug(self, session, periodo):
+        raise RuntimeError("bug")
+
+    # erro que não é de dialeto não é mascarado pelo caminho Python
+    monkeypatch.setattr(ConsistenciaService, "_listar_sql", _bug)
+    with Session(engine) as session, pytest.raises(RuntimeError):
+        svc.listar_indicadores(session, "2025-01")
+
+
+def test_consistencia_drill_down_fallback_so_para_erro_de_dialeto(monkeypatch):
+    import pytest
+    from sqlalchemy.exc import OperationalError
+    from app.services.consistencia_service import ConsistenciaService
+
+    seed_indicadores()
+    svc = ConsistenciaService()
+
+    def _sem_janela(self, session, *args):
+        raise OperationalError("SELECT ...", {}, Exception("no such function: row_number"))
+
+    monkeypatch.setattr(ConsistenciaService, "_drill_down_sql", _sem_janela)
+    with Session(engine) as session:
+        pagina = svc.drill_down_pagina(session, "cov_aps", "2025-01")
+    assert [d["chave"] for d in pagina.itens] == ["mun=2", "mun=1"]
+
+    def _bug(self, session, *args):
+        raise RuntimeError("bug")
+
+    monkeypatch.setattr(ConsistenciaService, "_drill_down_sql", _bug)
+    with Session(engine) as session, pytest.raises(RuntimeError):
+        svc.drill_down_pagina(session, "cov_aps", "2025-01")
+
+
+def test_consistencia_materializado_sem_snapshot_usa_caminho_ao_vivo():
+    from sqlmodel import create_engine
+    from app.services.consistencia_service import ConsistenciaService
+
+    # banco sem as tabelas do snapshot: as leituras materializadas caem no cálculo ao vivo
+    local = create_engine("sqlite://")
+    SQLModel.metadata.create_all(bind=local, tables=[DevRefIndicador.__table__, DevCalcIndicador.__table__])
+    svc = ConsistenciaService()
+    with Session(local) as session:
+        session.add_all([
+            DevRefIndicador(indicador="cov_aps", chave="mun=1", periodo="2025-01", valor=100.0),
+            DevRefIndicador(indicador="cov_aps", chave="mun=2", periodo="2025-01", valor=50.0),
+            DevCalcIndicador(indicador="cov_aps", chave="mun=1", periodo="2025-01", valor=110.0),
+            DevCalcIndicador(indicador="cov_aps", chave="mun=2", periodo="2025-01", valor=40.0),
+        ])
+        session.commit()
+        itens = svc.listar_materializado(session, "2025-01")
+        assert [(r.indicador, r.pares) for r in itens] == [("cov_aps", 2)]
+        assert abs(itens[0].mape - 15.0) < 1e-6
+        pagina = svc.drill_down_materializado(session, "cov_aps", "2025-01", limit=1)
+        assert [d["chave"] for d in pagina.itens] == ["mun=2"]
+        assert pagina.proximo_cursor
@@ -1,7 +1,7 @@
 from fastapi.testclient import TestClient
 from backend.main import app
 from app.core.db import engine
-from sqlmodel import Session, select
+from sqlmodel import Session, SQLModel, select
 from app.models.dev_lite import DevCalcIndicador
 
 
@@ -9,6 +9,7 @@ client = TestClient(app)
 
 
 def seed_diff(indicador: str = "cov_aps", per_prev: str = "2025-01", per_curr: str = "2025-02"):
+    SQLModel.metadata.create_all(bind=engine, tables=[DevCalcIndicador.__table__])
     with Session(engine) as session:
         rows = session.exec(select(DevCalcIndicador).where(DevCalcIndicador.indicador == indicador, DevCalcIndicador.periodo.in_([per_prev, per_curr]))).all()
         for r in rows:
@@ -39,3 +40,65 @@ def test_rdqa_diff_endpoint():
     d3 = next(x for x in rows if x["chave"] == "mun=3")
     assert d3["delta"] is None
 
+
+
+def test_rdqa_diff_varios_indicadores_ordenados():
+    seed_diff(indicador="diff_b")
+    seed_diff(indicador="diff_a")
+    seed_diff(indicador="diff_so_anterior")
+    with Session(engine) as session:
+        for r in session.exec(select(DevCalcIndicador).where(DevCalcIndicador.indicador == "diff_so_anterior")).all():
+            session.delete(r)
+        session.flush()  # o DELETE precisa ir antes do INSERT da mesma chave (índice único)
+        # indicador só no período anterior não aparece sem filtro explícito
+        session.add(DevCalcIndicador(indicador="diff_so_anterior", chave="mun=1", periodo="2025-01", valor=1.0))
+        session.commit()
+
+    r = client.get("/rdqa/diff", params={"periodo_atual": "2025-02", "periodo_anterior": "2025-01", "indicadores": "diff_b,diff_a"})
+    assert r.status_code == 200
+    rows = r.json()
+    assert [(x["indicador"], x["chave"]) for x in rows] == [
+        ("diff_a", "mun=1"), ("diff_a", "mun=2"), ("diff_a", "mun=3"),
+        ("diff_b", "mun=1"), ("diff_b", "mun=2"), ("diff_b", "mun=3"),
+    ]
+    assert rows[0]["delta"] == 5.0
+
+    todos = client.get("/rdqa/diff", params={"periodo_atual": "2025-02", "periodo_anterior": "2025-01"}).json()
+    inds = {x["indicador"] for x in todos}
+    assert {"diff_a", "diff_b"} <= inds
+    assert "diff_so_anterior" not in inds
+    assert [(x["indicador"], x["chave"]) for x in todos] == sorted((x["indicador"], x["chave"]) for x in todos)
+
+
+def test_rdqa_diff_usa_get_session_e_fecha_array_em_erro(monkeypatch):
+    from app.core.db import get_session
+    from app.services.rdqa_diff_service import RDQADiffService
+
+    seed_diff(indicador="diff_sessao")
+    sessoes = []
+
+    def _sessao():
+        with Session(engine) as session:
+            sessoes.append(session)
+            yield session
+
+    app.dependency_overrides[get_session] = _sessao
+    try:
+        params = {"periodo_atual": "2025-02", "periodo_anterior": "2025-01", "indicadores": "diff_sessao"}
+        assert len(client.get("/rdqa/diff", params=params).json()) == 3
+        assert len(sessoes) == 1
+
+        original = RDQADiffService.iter_comparar
+
+        def _falha_no_meio(self, *args, **kwargs):
+            for i, linha in enumerate(original(self, *args, **kwargs)):
+                if i == 2:
+                    raise RuntimeError("conexão perdida")
+                yield linha
+
+        monkeypatch.setattr(RDQADiffService, "iter_comparar", _falha_no_meio)
+        r = client.get("/rdqa/diff", params=params)
+        rows = r.json()  # JSON válido mesmo com a falha no meio do streaming
+        assert len(rows) == 3 and "conexão perdida" in rows[-1]["erro"]
+    finally:
+        app.dependency_overrides.pop(get_session, None)
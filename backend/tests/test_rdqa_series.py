@@ -0,0 +1,56 @@
+from fastapi.testclient import TestClient
+from backend.main import app
+from app.core.db import engine
+from sqlmodel import Session, SQLModel, select
+from app.models.dev_lite import DevCalcIndicador
+
+
+client = TestClient(app)
+
+
+def seed_series(indicador: str = "serie_aps"):
+    SQLModel.metadata.create_all(bind=engine, tables=[DevCalcIndicador.__table__])
+    with Session(engine) as session:
+        for r in session.exec(select(DevCalcIndicador).where(DevCalcIndicador.indicador == indicador)).all():
+            session.delete(r)
+        session.commit()
+        valores = {"2025-01": 10.0, "2025-02": 20.0, "2025-03": 30.0, "2025-04": 60.0}
+        session.add_all([
+            DevCalcIndicador(indicador=indicador, chave="mun=1", periodo=p, valor=v) for p, v in valores.items()
+        ])
+        # mun=2 sem 2025-02: delta compara com a observação anterior existente
+        session.add_all([
+            DevCalcIndicador(indicador=indicador, chave="mun=2", periodo="2025-01", valor=5.0),
+            DevCalcIndicador(indicador=indicador, chave="mun=2", periodo="2025-03", valor=8.0),
+        ])
+        session.commit()
+
+
+def test_rdqa_series_colunar_com_janelas():
+    seed_series()
+    r = client.get("/rdqa/series", params={"indicadores": "serie_aps", "janela": 2})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["periodos"] == ["2025-01", "2025-02", "2025-03", "2025-04"]
+    s1, s2 = body["series"]
+    assert (s1["chave"], s2["chave"]) == ("mun=1", "mun=2")
+    assert s1["valores"] == [10.0, 20.0, 30.0, 60.0]
+    assert s1["delta"] == [None, 10.0, 10.0, 30.0]
+    assert s1["media_movel"] == [10.0, 15.0, 25.0, 45.0]
+    assert s2["valores"] == [5.0, None, 8.0, None]
+    assert s2["delta"] == [None, None, 3.0, None]
+
+
+def test_rdqa_series_corte_preserva_janela_anterior():
+    seed_series()
+    r = client.get(
+        "/rdqa/series",
+        params={"indicadores": "serie_aps", "chaves": "mun=1", "periodo_inicio": "2025-03", "janela": 3},
+    )
+    body = r.json()
+    assert body["periodos"] == ["2025-03", "2025-04"]
+    (s1,) = body["series"]
+    assert s1["delta"] == [10.0, 30.0]
+    assert s1["media_movel"] == [20.0, 110.0 / 3]
+
+    assert client.get("/rdqa/series", params={"indicadores": " , "}).status_code == 400
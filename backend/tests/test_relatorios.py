@@ -0,0 +1,61 @@
+import re
+
+from fastapi.testclient import TestClient
+
+
+def _sem_recursos_externos(html: str) -> bool:
+    return not re.search(r"<script|<link|<img|src=|url\(|https?://", html, re.IGNORECASE)
+
+
+def test_relatorio_rag_financeiro_html(client: TestClient):
+    resp = client.get("/rag/relatorios/financeiro", params={"territorio_id": 1})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/html")
+    html = resp.text
+    assert "<style>" in html and _sem_recursos_externos(html)
+    assert html.count("<tr>") == 1 + len(client.get("/rag/financeiro", params={"territorio_id": 1}).json())
+    assert "Território: 1" in html
+
+
+def test_relatorios_html_disponiveis(client: TestClient):
+    for path in ("/rag/relatorios/resumo", "/rag/relatorios/metas", "/rdqa/relatorios/consistencia", "/rdqa/relatorios/cobertura"):
+        resp = client.get(path, params={"periodo": "2024"})
+        assert resp.status_code == 200, path
+        assert _sem_recursos_externos(resp.text)
+    assert client.get("/rag/relatorios/desconhecido").status_code == 422
+
+
+def test_relatorio_escapa_conteudo():
+    from app.services.relatorio_service import _tabela
+
+    html = _tabela([("nome", "Nome", None), ("v", "Valor", None)], [{"nome": "<b>&</b>", "v": 1}])
+    assert "&lt;b&gt;&amp;&lt;/b&gt;" in html and "<b>" not in html
+
+
+def test_relatorio_pdf_registra_artefato(client: TestClient, tmp_path, monkeypatch):
+    from app.core.db import engine
+    from app.models.dev_lite import DevArtefatoExecucao
+    from app.services.pdf_cache import PDFCache
+    from app.services.rdqa_export_service import RDQAExportService
+    from sqlmodel import Session, SQLModel
+
+    SQLModel.metadata.create_all(bind=engine, tables=[DevArtefatoExecucao.__table__])
+    recebidos = []
+
+    async def fake_render(self, html, format_="A4", margin_mm=12):
+        recebidos.append(html)
+        return b"%PDF-1.4 relatorio"
+
+    monkeypatch.setattr(RDQAExportService, "_cache", PDFCache(tmp_path, max_bytes=0, ttl_s=60))
+    monkeypatch.setattr(RDQAExportService, "render_pdf_from_html", fake_render)
+
+    resp = client.post("/rag/relatorios/resumo/pdf", params={"periodo": "2024"})
+    assert resp.status_code == 200
+    assert resp.content == b"%PDF-1.4 relatorio"
+    assert "RAG — Resumo por território" in recebidos[0]
+    with Session(engine) as session:
+        artefato = session.get(DevArtefatoExecucao, resp.headers["X-Exec-Id"])
+        assert artefato.tipo == "rag_pdf" and artefato.periodo == "2024"
+        assert '"relatorio": "resumo"' in artefato.metadados
+        session.delete(artefato)
+        session.commit()
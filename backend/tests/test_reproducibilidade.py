@@ -1,22 +1,15 @@
+import hashlib
 import io
 import json
 import zipfile
 
-from fastapi.testclient import TestClient
-from backend.main import app
 
-
-client = TestClient(app)
-
-
-def test_export_pacote_returns_zip_and_manifest():
+def test_export_pacote_returns_zip_and_manifest(client):
     r = client.post("/rdqa/export/pacote")
     assert r.status_code == 200
     assert r.headers.get("content-type").startswith("application/zip")
     exec_id = r.headers.get("x-exec-id")
-    zip_hash = r.headers.get("x-hash")
     assert exec_id
-    assert zip_hash
 
     buf = io.BytesIO(r.content)
     with zipfile.ZipFile(buf) as z:
@@ -25,4 +18,82 @@ def test_export_pacote_returns_zip_and_manifest():
         assert any(n.startswith("data/dim_territorio") for n in names)
         mf = json.loads(z.read("MANIFEST.json").decode("utf-8"))
         assert mf.get("exec_id") == exec_id
+    _remover_artefato(exec_id)
+
+
+def test_export_pacote_ndjson_confere_com_manifesto(client):
+    r = client.post("/rdqa/export/pacote")
+    assert r.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(r.content)) as z:
+        mf = json.loads(z.read("MANIFEST.json").decode("utf-8"))
+        # NDJSON: uma linha por registro, conferida com o manifesto
+        info = next(f for f in mf["files"] if f["path"] == "data/dim_territorio.ndjson")
+        conteudo = z.read(info["path"])
+        linhas = [json.loads(l) for l in conteudo.decode("utf-8").splitlines()]
+        assert len(linhas) == info["rows"] >= 1
+        assert hashlib.sha256(conteudo).hexdigest() == info["sha256"]
+        assert "nome" in linhas[0]
+    _remover_artefato(r.headers["x-exec-id"])
+
+
+def _remover_artefato(exec_id):
+    from app.core.db import engine
+    from app.models.dev_lite import DevArtefatoExecucao
+    from sqlmodel import Session
+
+    with Session(engine) as session:
+        artefato = session.get(DevArtefatoExecucao, exec_id)
+        if artefato is not None:
+            session.delete(artefato)
+            session.commit()
+
 
+def test_export_pacote_hash_registrado_apos_streaming(client):
+    r = client.post("/rdqa/export/pacote")
+    assert r.status_code == 200
+    assert "x-hash" not in r.headers
+    zip_hash = hashlib.sha256(r.content).hexdigest()
+    verificacao = client.get(f"{r.headers['x-verificacao']}&hash={zip_hash}")
+    assert verificacao.status_code == 200
+    assert verificacao.json()["status"] == "valido"
+    _remover_artefato(r.headers["x-exec-id"])
+
+
+def test_gerar_pacote_em_blocos(client, monkeypatch):
+    from app.core.db import engine
+    from app.services import reproducibilidade_service as repro
+    from sqlmodel import Session
+
+    monkeypatch.setattr(repro, "PACOTE_CHUNK_BYTES", 16)
+    with Session(engine) as session:
+        pacote = repro.ReproducibilidadeService().pacote_stream(session)
+        blocos = list(pacote)
+    assert len(blocos) > 1
+    dados = b"".join(blocos)
+    assert pacote.sha256 == hashlib.sha256(dados).hexdigest()
+    assert zipfile.ZipFile(io.BytesIO(dados)).testzip() is None
+
+
+def test_export_pacote_verificavel_como_pendente_durante_envio(client, monkeypatch):
+    from app.core.db import engine
+    from app.services import reproducibilidade_service as repro
+    from app.services.artefato_service import ArtefatoService
+    from sqlmodel import Session
+
+    durante = []
+    iterar = repro.PacoteStream.__iter__
+
+    def _iter(self):
+        for i, bloco in enumerate(iterar(self)):
+            if i == 0:
+                with Session(engine) as outra:
+                    durante.append(ArtefatoService().verificar(outra, exec_id=self.exec_id, hash_value="x" * 64))
+            yield bloco
+
+    monkeypatch.setattr(repro.PacoteStream, "__iter__", _iter)
+    r = client.post("/rdqa/export/pacote")
+    assert r.status_code == 200
+    assert durante[0]["status"] == "pendente" and durante[0]["mensagem"] == "pacote em geração"
+    verificacao = client.get(f"{r.headers['x-verificacao']}&hash={hashlib.sha256(r.content).hexdigest()}").json()
+    assert verificacao["status"] == "valido" and verificacao["mensagem"] is None
+    _remover_artefato(r.headers["x-exec-id"])
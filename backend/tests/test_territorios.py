@@ -27,3 +27,31 @@ def test_crud_territorio(client):
     r = client.delete(f"/dw/territorios/{tid}")
     assert r.status_code == 204
 
+
+def test_cache_de_territorios_invalidado_nas_escritas(client):
+    from app.core.db import engine
+    from app.models.dev_lite import DevDimTerritorio
+    from app.repositories import dimensao_cache as dim_cache
+    from sqlmodel import Session
+
+    cache = dim_cache.territorios
+    r = client.post("/dw/territorios", json={"cod_ibge_municipio": "4300200", "nome": "Cidade Cache", "uf": "RS"})
+    assert r.status_code == 201, r.text
+    tid = r.json()["id"]
+    try:
+        with Session(engine) as session:
+            antes = cache.estatisticas()
+            assert cache.atributo(session, DevDimTerritorio, [tid], "nome") == {tid: "Cidade Cache"}
+            assert cache.atributo(session, DevDimTerritorio, [tid], "nome") == {tid: "Cidade Cache"}
+            depois = cache.estatisticas()
+            assert depois["misses"] == antes["misses"] + 1
+            assert depois["hits"] == antes["hits"] + 1
+
+            r = client.put(f"/dw/territorios/{tid}", json={"nome": "Cidade Renomeada"})
+            assert r.status_code == 200
+            assert cache.estatisticas()["versao"] == depois["versao"] + 1
+            assert cache.atributo(session, DevDimTerritorio, [tid], "nome") == {tid: "Cidade Renomeada"}
+    finally:
+        assert client.delete(f"/dw/territorios/{tid}").status_code == 204
+    with Session(engine) as session:
+        assert cache.atributo(session, DevDimTerritorio, [tid], "nome") == {}
@@ -1,4 +1,6 @@
+import hashlib
 import sys
+import uuid
 from pathlib import Path
 
 BACKEND_DIR = Path(__file__).resolve().parents[1]
@@ -59,3 +61,364 @@ def test_ingest_rdqa_payload_atualiza_tabelas(client):
 
 
 
+
+
+def _garantir_tabelas():
+    from sqlmodel import SQLModel
+    SQLModel.metadata.create_all(bind=engine, tables=[
+        DevRefIndicador.__table__,
+        DevCalcIndicador.__table__,
+        DevArtefatoExecucao.__table__,
+    ])
+
+
+def test_ingest_bulk_upsert_substitui_sem_duplicar():
+    from app.workers.ingest_rdqa import ingest_rdqa
+
+    _garantir_tabelas()
+    chaves = [f"mun={i}" for i in range(25)]
+    payload_v1 = {
+        "referencia": [{"indicador": "bulk_test", "chave": c, "periodo": "2030-01", "valor": 10.0} for c in chaves],
+        "calculado": [{"indicador": "bulk_test", "chave": c, "periodo": "2030-01", "valor": 11.0} for c in chaves]
+        + [{"indicador": "bulk_test", "chave": "mun=x"}],  # sem valor -> descartado
+    }
+    payload_v2 = {
+        "referencia": [{"indicador": "bulk_test", "chave": c, "periodo": "2030-01", "valor": 20.0} for c in chaves],
+        "calculado": [],
+    }
+    with Session(engine) as session:
+        fonte = f"t-{uuid.uuid4()}"
+        res1 = ingest_rdqa(session, payload=payload_v1, fonte=fonte, periodo_ref="2030-01", batch_size=7)
+        assert res1.referencia == 25
+        assert res1.calculado == 25
+        assert res1.descartados == 1
+        assert res1.linhas_por_s is None or res1.linhas_por_s > 0
+
+        ingest_rdqa(session, payload=payload_v2, fonte=fonte, periodo_ref="2030-01", batch_size=7)
+        refs = session.exec(
+            select(DevRefIndicador).where(DevRefIndicador.indicador == "bulk_test", DevRefIndicador.periodo == "2030-01")
+        ).all()
+        assert len(refs) == 25
+        assert all(r.valor == 20.0 for r in refs)
+
+        artefato = session.get(DevArtefatoExecucao, str(res1.exec_id))
+        assert artefato is not None
+        import json as _json
+        meta = _json.loads(artefato.metadados)
+        assert meta["modo"] == "bulk"
+        assert "linhas_por_s" in meta
+
+
+def test_json_stream_percorre_secoes_em_blocos_pequenos():
+    import io
+    import json as _json
+    from app.workers.json_stream import JSONSecoesStream
+
+    doc = {
+        "meta": {"origem": "planilha", "linhas": [1, 2, 3]},
+        "referencia": [{"indicador": "i", "chave": f"k{i}", "valor": i * 1.5, "obs": "ação"} for i in range(40)],
+        "calculado": [],
+        "total": 123456789,
+    }
+    raw = _json.dumps(doc, ensure_ascii=False, indent=1).encode("utf-8")
+    stream = JSONSecoesStream(io.BytesIO(raw), ["referencia", "calculado"], chunk_size=7)
+    itens = list(stream)
+    assert [item for secao, item in itens if secao == "referencia"] == doc["referencia"]
+    assert stream.bytes_lidos == len(raw)
+    assert stream.sha256.hexdigest() == hashlib.sha256(raw).hexdigest()
+
+
+def test_json_stream_independe_do_tamanho_do_bloco():
+    import io
+    import json as _json
+    from app.workers.json_stream import JSONSecoesStream
+
+    # números e literais compactos, sem espaço depois, caem em qualquer fronteira de bloco
+    raw = (
+        '{"referencia":[1.25,-0.5,1e+10,-3.75E-5,123456789,true,false,null,"ação",{"v":[2.5,10]}],'
+        '"meta":{"x":1.5e3},"calculado":[[0.125],-7,99.99]}'
+    ).encode("utf-8")
+    doc = _json.loads(raw)
+    esperado = [("referencia", v) for v in doc["referencia"]] + [("calculado", v) for v in doc["calculado"]]
+    for chunk_size in range(1, 65):
+        stream = JSONSecoesStream(io.BytesIO(raw), ["referencia", "calculado"], chunk_size=chunk_size)
+        assert list(stream) == esperado, chunk_size
+
+
+def test_ingest_rdqa_stream_grava_em_lotes():
+    import io
+    import json as _json
+    from app.workers.ingest_rdqa import ingest_rdqa_stream
+
+    _garantir_tabelas()
+    doc = {
+        "referencia": [{"indicador": "stream_test", "chave": f"mun={i}", "valor": 1.0} for i in range(30)],
+        "calculado": [{"indicador": "stream_test", "chave": f"mun={i}", "valor": 2.0} for i in range(30)],
+    }
+    chamadas = []
+    with Session(engine) as session:
+        res = ingest_rdqa_stream(
+            session,
+            io.BytesIO(_json.dumps(doc).encode("utf-8")),
+            fonte=f"t-{uuid.uuid4()}",
+            periodo_ref="2030-02",
+            batch_size=8,
+            chunk_size=64,
+            progresso=lambda linhas, desc: chamadas.append(linhas),
+        )
+        assert (res.referencia, res.calculado, res.modo) == (30, 30, "stream")
+        assert chamadas[-1] == 60
+        assert len(chamadas) >= 8
+        calcs = session.exec(
+            select(DevCalcIndicador).where(DevCalcIndicador.indicador == "stream_test", DevCalcIndicador.periodo == "2030-02")
+        ).all()
+        assert len(calcs) == 30
+
+
+def test_ingest_rdqa_lote_registra_resumo_e_arquivos(tmp_path):
+    import json as _json
+    from app.workers.ingest_rdqa_lote import expandir_entradas, ingest_rdqa_lote
+
+    _garantir_tabelas()
+    for n in range(3):
+        doc = {
+            "referencia": [{"indicador": "lote_test", "chave": f"mun={n}", "valor": 1.0}],
+            "calculado": [{"indicador": "lote_test", "chave": f"mun={n}", "valor": 1.5}],
+        }
+        (tmp_path / f"m{n}.json").write_text(_json.dumps(doc), encoding="utf-8")
+    (tmp_path / "quebrado.json").write_text("{", encoding="utf-8")
+
+    paths = expandir_entradas([str(tmp_path)])
+    assert len(paths) == 4
+    res = ingest_rdqa_lote(paths, fonte=f"t-{uuid.uuid4()}", periodo_ref="2030-03", workers=2, conexoes=2)
+    assert not res.ok
+    assert res.linhas == 6
+    assert sorted(a.arquivo for a in res.arquivos if not a.ok) == ["quebrado.json"]
+
+    with Session(engine) as session:
+        resumo = session.get(DevArtefatoExecucao, str(res.exec_id))
+        assert resumo is not None
+        assert resumo.tipo == "rdqa_ingest_lote"
+        assert resumo.ok is False
+        for arq in res.arquivos:
+            if arq.ok:
+                assert session.get(DevArtefatoExecucao, arq.exec_id).tipo == "rdqa_ingest"
+
+
+def test_ingest_rdqa_lote_resumo_compartilhado_entre_arquivos(tmp_path, monkeypatch):
+    import json as _json
+    from app.services.consistencia_service import ConsistenciaService
+    from app.workers.ingest_rdqa_lote import ingest_rdqa_lote
+
+    _garantir_tabelas()
+    indicador = f"lote_{uuid.uuid4().hex[:8]}"
+    periodo = "2030-08"
+    # os dois arquivos tocam o mesmo (indicador, periodo): o resumo precisa somar ambos
+    for n, calc in enumerate((110.0, 80.0)):
+        doc = {
+            "referencia": [{"indicador": indicador, "chave": f"mun={n}", "valor": 100.0}],
+            "calculado": [{"indicador": indicador, "chave": f"mun={n}", "valor": calc}],
+        }
+        (tmp_path / f"m{n}.json").write_text(_json.dumps(doc), encoding="utf-8")
+
+    # os escritores não mexem no snapshot; ele é atualizado numa única passada ao final
+    chamadas = []
+    original = ConsistenciaService.atualizar_snapshot
+    monkeypatch.setattr(
+        ConsistenciaService,
+        "atualizar_snapshot",
+        lambda self, session, chaves: chamadas.append(list(chaves)) or original(self, session, chamadas[-1]),
+    )
+    paths = sorted(tmp_path.glob("*.json"))
+    res = ingest_rdqa_lote(paths, fonte=f"t-{uuid.uuid4()}", periodo_ref=periodo, workers=2, conexoes=2)
+    assert res.ok
+    assert len(chamadas) == 1 and len(chamadas[0]) == 4  # ref e calc de mun=0 e mun=1
+
+    svc = ConsistenciaService()
+    with Session(engine) as session:
+        materializado = next(r for r in svc.listar_materializado(session, periodo) if r.indicador == indicador)
+        assert materializado.pares == 2
+        assert abs(materializado.mape - 15.0) < 1e-9  # (10 + 20) / 2
+        detalhes = svc.drill_down_materializado(session, indicador, periodo).itens
+        assert [d["chave"] for d in detalhes] == ["mun=1", "mun=0"]
+
+
+def test_ingest_rdqa_ignora_payload_identico_e_grava_so_alterados():
+    from app.workers.ingest_rdqa import ingest_rdqa
+
+    _garantir_tabelas()
+    fonte = f"t-{uuid.uuid4()}"
+    indicador = f"idem_{uuid.uuid4().hex[:8]}"
+    itens = [{"indicador": indicador, "chave": f"mun={i}", "valor": float(i)} for i in range(10)]
+    payload = {"referencia": itens, "calculado": []}
+    with Session(engine) as session:
+        primeiro = ingest_rdqa(session, payload=payload, fonte=fonte, periodo_ref="2030-04")
+        assert primeiro.alterados == 10
+
+        repetido = ingest_rdqa(session, payload=payload, fonte=fonte, periodo_ref="2030-04")
+        assert repetido.ignorado
+        assert repetido.exec_id == primeiro.exec_id
+
+        itens_v2 = [dict(it) for it in itens]
+        itens_v2[3]["valor"] = 99.0
+        parcial = ingest_rdqa(session, payload={"referencia": itens_v2, "calculado": []}, fonte=fonte, periodo_ref="2030-04")
+        assert not parcial.ignorado
+        assert parcial.referencia == 10
+        assert parcial.alterados == 1
+
+        forcado = ingest_rdqa(
+            session, payload={"referencia": itens_v2, "calculado": []}, fonte=fonte, periodo_ref="2030-04", forcar=True
+        )
+        assert not forcado.ignorado
+        assert forcado.alterados == 0
+
+
+def test_ingest_planilha_csv_formato_longo(tmp_path):
+    from app.workers.ingest_rdqa import ingest_rdqa_planilha
+    from app.workers.planilhas import MapeamentoColunas
+
+    _garantir_tabelas()
+    indicador = f"csv_{uuid.uuid4().hex[:8]}"
+    linhas = ["Indicador;Municipio;Tipo;Valor"]
+    for mun in ("4300001", "4300002"):
+        linhas.append(f"{indicador};{mun};referencia;1.234,5")
+        linhas.append(f"{indicador};{mun};calc;1.200,0")
+    linhas.append(f"{indicador};4300003;desconhecido;1")
+    arquivo = tmp_path / "rdqa.csv"
+    arquivo.write_text("\n".join(linhas), encoding="utf-8")
+    mapeamento = MapeamentoColunas(
+        indicador="Indicador", chave="Municipio", periodo=None, secao="Tipo", valor="Valor", chave_formato="mun={}"
+    )
+    with Session(engine) as session:
+        res = ingest_rdqa_planilha(session, arquivo, fonte=f"t-{uuid.uuid4()}", periodo_ref="2030-05", mapeamento=mapeamento)
+        assert (res.referencia, res.calculado, res.descartados, res.modo) == (2, 2, 1, "csv")
+        ref = session.exec(
+            select(DevRefIndicador).where(DevRefIndicador.indicador == indicador, DevRefIndicador.chave == "mun=4300001")
+        ).first()
+        assert ref is not None
+        assert ref.periodo == "2030-05"
+        assert ref.valor == 1234.5
+
+
+def test_numero_planilha_separadores():
+    import pytest
+    from app.workers.planilhas import MapeamentoColunas, _numero
+
+    # sem separador informado: vírgula é decimal; '1.234' é ambíguo e vira erro
+    assert _numero("1.234,5") == 1234.5
+    assert _numero("12,5") == 12.5
+    assert _numero("1.5") == 1.5
+    assert _numero(" 7 ") == 7.0
+    assert _numero("") is None
+    for ambiguo in ("1.234", "1.234.567"):
+        with pytest.raises(ValueError, match="ambíguo"):
+            _numero(ambiguo)
+    # separador decimal explícito
+    assert _numero("1.234", ",") == 1234.0
+    assert _numero("1.234.567", ",") == 1234567.0
+    assert _numero("1,234.5", ".") == 1234.5
+    assert _numero("1.234", ".") == 1.234
+    with pytest.raises(ValueError):
+        _numero("1.23", ",")
+    with pytest.raises(ValueError):
+        MapeamentoColunas(decimal=";")
+
+
+def test_ingest_planilha_csv_decimal_por_delimitador(tmp_path):
+    from app.workers.ingest_rdqa import ingest_rdqa_planilha
+    from app.workers.planilhas import MapeamentoColunas
+
+    _garantir_tabelas()
+    indicador = f"dec_{uuid.uuid4().hex[:8]}"
+    # ';' (layout DATASUS/SIOPS): ponto é milhar mesmo sem casas decimais
+    brasileiro = tmp_path / "br.csv"
+    brasileiro.write_text(
+        f"indicador;chave;secao;valor\n{indicador};mun=1;referencia;1.234\n{indicador};mun=2;referencia;1.234.567\n",
+        encoding="utf-8",
+    )
+    # ',' sem separador decimal no mapeamento: '1.234' é recusado em vez de valer 1.234
+    virgula = tmp_path / "us.csv"
+    virgula.write_text(
+        f"indicador,chave,secao,valor\n{indicador},mun=3,calculado,1.234\n{indicador},mun=4,calculado,12.5\n",
+        encoding="utf-8",
+    )
+    with Session(engine) as session:
+        res = ingest_rdqa_planilha(session, brasileiro, fonte=f"t-{uuid.uuid4()}", periodo_ref="2030-07")
+        assert (res.referencia, res.descartados) == (2, 0)
+        ref = session.exec(select(DevRefIndicador).where(DevRefIndicador.indicador == indicador)).all()
+        assert sorted(r.valor for r in ref) == [1234.0, 1234567.0]
+
+        res = ingest_rdqa_planilha(session, virgula, fonte=f"t-{uuid.uuid4()}", periodo_ref="2030-07")
+        assert (res.calculado, res.descartados) == (1, 1)
+        res = ingest_rdqa_planilha(
+            session, virgula, fonte=f"t-{uuid.uuid4()}", periodo_ref="2030-07", mapeamento=MapeamentoColunas(decimal=".")
+        )
+        assert (res.calculado, res.descartados) == (2, 0)
+        calc = session.exec(select(DevCalcIndicador).where(DevCalcIndicador.indicador == indicador)).all()
+        assert sorted(c.valor for c in calc) == [1.234, 12.5]
+
+
+def test_expandir_diretorio_inclui_planilhas(tmp_path):
+    from app.workers.ingest_rdqa_lote import expandir_entradas
+
+    for nome in ("a.json", "b.csv", "c.xlsx", "notas.txt"):
+        (tmp_path / nome).write_text("", encoding="utf-8")
+    assert [p.name for p in expandir_entradas([str(tmp_path)])] == ["a.json", "b.csv", "c.xlsx"]
+    assert [p.name for p in expandir_entradas([str(tmp_path)], padrao="*.csv")] == ["b.csv"]
+
+
+def test_ingest_planilha_xlsx_formato_largo(tmp_path):
+    import pytest
+    openpyxl = pytest.importorskip("openpyxl")
+    from app.workers.ingest_rdqa import ingest_rdqa_planilha
+    from app.workers.planilhas import MapeamentoColunas
+
+    _garantir_tabelas()
+    indicador = f"xlsx_{uuid.uuid4().hex[:8]}"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["indicador", "chave", "periodo", "oficial", "pipeline"])
+    ws.append([indicador, "mun=1", "2030-06", 10, 11.5])
+    ws.append([indicador, "mun=2", "2030-06", 20, None])
+    arquivo = tmp_path / "rdqa.xlsx"
+    wb.save(arquivo)
+    mapeamento = MapeamentoColunas(valor_referencia="oficial", valor_calculado="pipeline")
+    with Session(engine) as session:
+        res = ingest_rdqa_planilha(session, arquivo, fonte=f"t-{uuid.uuid4()}", periodo_ref="2030-06", mapeamento=mapeamento)
+        assert (res.referencia, res.calculado, res.descartados) == (2, 1, 0)
+        calc = session.exec(select(DevCalcIndicador).where(DevCalcIndicador.indicador == indicador)).all()
+        assert [c.valor for c in calc] == [11.5]
+
+
+def test_ingest_atualiza_snapshot_de_consistencia():
+    from app.services.consistencia_service import ConsistenciaService
+    from app.workers.ingest_rdqa import ingest_rdqa
+
+    _garantir_tabelas()
+    indicador = f"snap_{uuid.uuid4().hex[:8]}"
+    periodo = "2030-06"
+    ref = [{"indicador": indicador, "chave": f"mun={i}", "valor": 100.0} for i in range(6)]
+    calc = [{"indicador": indicador, "chave": f"mun={i}", "valor": 100.0 + i} for i in range(5)]  # mun=5 sem cálculo
+    svc = ConsistenciaService()
+    with Session(engine) as session:
+        ingest_rdqa(session, payload={"referencia": ref, "calculado": calc}, fonte=f"t-{uuid.uuid4()}", periodo_ref=periodo, batch_size=4)
+
+        resumo = next(r for r in svc.listar_materializado(session, periodo) if r.indicador == indicador)
+        assert resumo.pares == 5
+        assert abs(resumo.mape - 2.0) < 1e-9  # (0+1+2+3+4)/5
+
+        # só a chave alterada é recalculada; o resumo acompanha
+        ingest_rdqa(
+            session,
+            payload={"referencia": [], "calculado": [{"indicador": indicador, "chave": "mun=5", "valor": 110.0}]},
+            fonte=f"t-{uuid.uuid4()}",
+            periodo_ref=periodo,
+        )
+        materializado = next(r for r in svc.listar_materializado(session, periodo) if r.indicador == indicador)
+        ao_vivo = svc.calcular_mape(session, indicador, periodo)
+        assert materializado.pares == ao_vivo.pares == 6
+        assert abs(materializado.mape - ao_vivo.mape) < 1e-9
+
+        detalhes = svc.drill_down_materializado(session, indicador, periodo).itens
+        assert [d["chave"] for d in detalhes] == [d["chave"] for d in svc.drill_down(session, indicador, periodo)]
+        assert detalhes[0]["chave"] == "mun=5" and abs(detalhes[0]["erro_pct"] - 10.0) < 1e-9
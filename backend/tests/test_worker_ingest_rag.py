@@ -0,0 +1,143 @@
+import sys
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+ROOT = Path(__file__).resolve().parents[2]
+for entry in [str(BACKEND_DIR), str(ROOT)]:
+    if entry not in sys.path:
+        sys.path.insert(0, entry)
+
+from sqlmodel import Session, SQLModel, delete, select
+
+from app.core.db import engine
+from app.models.dev_lite import (
+    DevArtefatoExecucao,
+    DevDimTerritorio,
+    DevFatoRAGFinanceiro,
+    DevFatoRAGMeta,
+    DevFatoRAGProducao,
+    DevRAGResumo,
+)
+from app.workers.ingest_rag import ingest_rag_payload
+
+
+def _garantir_tabelas():
+    SQLModel.metadata.create_all(bind=engine, tables=[
+        DevDimTerritorio.__table__,
+        DevArtefatoExecucao.__table__,
+        DevFatoRAGFinanceiro.__table__,
+        DevFatoRAGProducao.__table__,
+        DevFatoRAGMeta.__table__,
+        DevRAGResumo.__table__,
+    ])
+
+
+def _territorio(session):
+    territorio = session.exec(select(DevDimTerritorio).limit(1)).first()
+    if territorio is None:
+        # mesmo seed do startup, para não alterar o cenário dos demais testes
+        session.add_all([
+            DevDimTerritorio(cod_ibge_municipio="4300000", nome="Municipio A", uf="RS"),
+            DevDimTerritorio(cod_ibge_municipio="4200000", nome="Municipio B", uf="SC"),
+        ])
+        session.commit()
+        territorio = session.exec(select(DevDimTerritorio).limit(1)).first()
+    return territorio
+
+
+def _limpar(session, periodo):
+    for Model in (DevFatoRAGFinanceiro, DevFatoRAGProducao, DevFatoRAGMeta, DevRAGResumo):
+        session.exec(delete(Model).where(Model.periodo == periodo))
+    session.commit()
+
+
+def test_ingest_rag_substitui_particoes():
+    _garantir_tabelas()
+    periodo = f"t{uuid.uuid4().hex[:6]}"
+    with Session(engine) as session:
+        territorio = _territorio(session)
+        tid = territorio.id
+        try:
+            payload_v1 = {
+                "financeiro": [{"territorio_id": tid, "dotacao_atualizada": 100, "pago": 50}],
+                "producao": [
+                    {"cod_ibge_municipio": territorio.cod_ibge_municipio, "tipo": "Consultas", "quantidade": 10},
+                    {"territorio_id": tid, "tipo": "Visitas", "quantidade": "20"},
+                    {"territorio_id": tid, "quantidade": 1},  # sem tipo -> descartado
+                ],
+                "metas": [{"territorio_id": tid, "indicador": "cobertura", "meta_planejada": 80, "meta_executada": 85}],
+            }
+            res = ingest_rag_payload(session, payload=payload_v1, fonte=f"t-{uuid.uuid4()}", periodo_ref=periodo, batch_size=1)
+            assert res.linhas == {"financeiro": 1, "producao": 2, "metas": 1}
+            assert res.descartados == 1
+            assert res.particoes["producao"] == 1
+
+            payload_v2 = {"producao": [{"territorio_id": tid, "tipo": "Consultas", "quantidade": 30}]}
+            ingest_rag_payload(session, payload=payload_v2, fonte=f"t-{uuid.uuid4()}", periodo_ref=periodo)
+
+            producao = session.exec(
+                select(DevFatoRAGProducao).where(DevFatoRAGProducao.periodo == periodo, DevFatoRAGProducao.territorio_id == tid)
+            ).all()
+            assert [(p.tipo, p.quantidade) for p in producao] == [("Consultas", 30)]
+            # seções ausentes do payload não são tocadas
+            financeiro = session.exec(select(DevFatoRAGFinanceiro).where(DevFatoRAGFinanceiro.periodo == periodo)).all()
+            assert len(financeiro) == 1
+
+            # resumo pré-agregado acompanha a partição tocada
+            session.expire_all()
+            resumo = session.get(DevRAGResumo, (periodo, tid))
+            assert resumo is not None
+            assert (resumo.dotacao_atualizada, resumo.pago, resumo.execucao_percentual) == (100.0, 50.0, 50.0)
+            assert (resumo.producao_total, resumo.metas_cumpridas, resumo.metas_total) == (30, 1, 1)
+
+            artefato = session.get(DevArtefatoExecucao, str(res.exec_id))
+            assert artefato is not None
+            assert artefato.tipo == "rag_ingest"
+        finally:
+            _limpar(session, periodo)
+
+
+def test_ingest_rag_payload_repetido_e_ignorado():
+    _garantir_tabelas()
+    periodo = f"t{uuid.uuid4().hex[:6]}"
+    fonte = f"t-{uuid.uuid4()}"
+    with Session(engine) as session:
+        tid = _territorio(session).id
+        payload = {"metas": [{"territorio_id": tid, "indicador": "cobertura", "meta_planejada": 80}]}
+        try:
+            primeiro = ingest_rag_payload(session, payload=payload, fonte=fonte, periodo_ref=periodo)
+            segundo = ingest_rag_payload(session, payload=payload, fonte=fonte, periodo_ref=periodo)
+            assert not primeiro.ignorado
+            assert segundo.ignorado
+            assert segundo.exec_id == primeiro.exec_id
+        finally:
+            _limpar(session, periodo)
+
+
+def test_ingest_rag_falha_preserva_particoes(monkeypatch):
+    import pytest
+    from app.services.rag_service import RAGService
+
+    _garantir_tabelas()
+    periodo = f"t{uuid.uuid4().hex[:6]}"
+    with Session(engine) as session:
+        tid = _territorio(session).id
+        try:
+            payload = {"producao": [{"territorio_id": tid, "tipo": "Consultas", "quantidade": 10}]}
+            ingest_rag_payload(session, payload=payload, fonte=f"t-{uuid.uuid4()}", periodo_ref=periodo)
+
+            def _falhar(self, session, particoes):
+                raise RuntimeError("falha no resumo")
+
+            monkeypatch.setattr(RAGService, "atualizar_resumo", _falhar)
+            novo = {"producao": [{"territorio_id": tid, "tipo": f"Visitas{i}", "quantidade": i} for i in range(5)]}
+            with pytest.raises(RuntimeError):
+                ingest_rag_payload(session, payload=novo, fonte=f"t-{uuid.uuid4()}", periodo_ref=periodo, batch_size=2)
+
+            # a partição antiga continua inteira: os lotes já gravados foram desfeitos
+            producao = session.exec(select(DevFatoRAGProducao).where(DevFatoRAGProducao.periodo == periodo)).all()
+            assert [(p.tipo, p.quantidade) for p in producao] == [("Consultas", 10)]
+        finally:
+            monkeypatch.undo()
+            _limpar(session, periodo)
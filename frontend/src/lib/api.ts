@@ -49,6 +49,18 @@ export async function getList<T>(path: string, params?: ListParams): Promise<T[]
   return res.data
 }
 
+// segue o cabeçalho X-Next-Cursor até a última página das rotas paginadas por cursor
+export async function getTodasPaginas<T>(path: string, params?: Record<string, unknown>): Promise<T[]> {
+  const paginas: T[] = []
+  let cursor: string | undefined
+  do {
+    const res = await api.get<T>(path, { params: { ...params, cursor } })
+    paginas.push(res.data)
+    cursor = res.headers?.['x-next-cursor'] as string | undefined
+  } while (cursor)
+  return paginas
+}
+
 export * from './types'
 import type {
   DimTempo,
@@ -107,9 +119,12 @@ export async function getRDQAConsistenciaDetalhes(indicador: string, periodo?: s
   return res.data
 }
 
-export async function getRDQACobertura(periodo?: string): Promise<{ percent: number; total: number; gerados: number; faltantes: Array<{ quadro: string; periodo: string; motivo: string }> }> {
-  const res = await api.get(routes.rdqaCobertura, { params: { periodo } })
-  return res.data
+type RDQACobertura = { percent: number; total: number; gerados: number; faltantes: Array<{ quadro: string; periodo: string; motivo: string }> }
+
+export async function getRDQACobertura(periodo?: string): Promise<RDQACobertura> {
+  // os faltantes vêm paginados: junta todas as páginas numa resposta só
+  const paginas = await getTodasPaginas<RDQACobertura>(routes.rdqaCobertura, { periodo })
+  return { ...paginas[0], faltantes: paginas.flatMap((p) => p.faltantes) }
 }
 
 export async function getRDQADiff(periodoAtual: string, periodoAnterior: string, indicadores?: string): Promise<Array<{ indicador: string; chave: string; valor_atual?: number; valor_anterior?: number; delta?: number; tendencia: string }>> {
@@ -117,10 +132,18 @@ export async function getRDQADiff(periodoAtual: string, periodoAnterior: string,
   return res.data
 }
 
+async function sha256Hex(blob: Blob): Promise<string | undefined> {
+  if (!globalThis.crypto?.subtle) return undefined
+  const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer())
+  return Array.from(new Uint8Array(digest)).map((b) => b.toString(16).padStart(2, '0')).join('')
+}
+
 export async function exportRDQAPackage(params?: { periodo?: string }): Promise<{ blob: Blob; execId?: string; hash?: string }> {
   const res = await api.post(routes.rdqaExportPackage, null, { params, responseType: 'blob' })
   const execId = res.headers?.['x-exec-id'] as string | undefined
-  const hash = res.headers?.['x-hash'] as string | undefined
+  // o pacote é enviado em streaming: o hash não vem no cabeçalho, é calculado sobre o ZIP
+  // recebido e pode ser conferido em /public/verificar (registrado pelo backend ao fim do envio)
+  const hash = (res.headers?.['x-hash'] as string | undefined) ?? (await sha256Hex(res.data as Blob))
   return { blob: res.data as Blob, execId, hash }
 }
 
@@ -130,18 +153,18 @@ export async function getRAGResumo(periodo?: string, territorioId?: number): Pro
 }
 
 export async function getRAGFinanceiro(periodo?: string, territorioId?: number): Promise<RAGFinanceiroItem[]> {
-  const res = await api.get(routes.ragFinanceiro, { params: { periodo, territorio_id: territorioId } })
-  return res.data
+  const paginas = await getTodasPaginas<RAGFinanceiroItem[]>(routes.ragFinanceiro, { periodo, territorio_id: territorioId })
+  return paginas.flat()
 }
 
 export async function getRAGProducao(periodo?: string, territorioId?: number): Promise<RAGProducaoItem[]> {
-  const res = await api.get(routes.ragProducao, { params: { periodo, territorio_id: territorioId } })
-  return res.data
+  const paginas = await getTodasPaginas<RAGProducaoItem[]>(routes.ragProducao, { periodo, territorio_id: territorioId })
+  return paginas.flat()
 }
 
 export async function getRAGMetas(periodo?: string, territorioId?: number): Promise<RAGMetaItem[]> {
-  const res = await api.get(routes.ragMetas, { params: { periodo, territorio_id: territorioId } })
-  return res.data
+  const paginas = await getTodasPaginas<RAGMetaItem[]>(routes.ragMetas, { periodo, territorio_id: territorioId })
+  return paginas.flat()
 }
 
 export async function exportRAGPdf(payload: ExportPdfPayload): Promise<{ blob: Blob; execId?: string; hash?: string }> {